@@ -0,0 +1,43 @@
+"""Archivo de pedidos cerrados: la tabla `pedidos` queda solo con el trabajo de los últimos días.
+
+Los pedidos entregados o cancelados con fecha de entrega anterior a `dias` se mueven a
+`pedidos_historicos` en una sola transacción (función SQL `archivar_pedidos`). No se archiva
+lo que la liquidación de stock todavía tiene que tocar: entregas sin liquidar y cancelaciones
+de pedidos ya liquidados. Los totales del dashboard salen del libro (`saldos_cuenta`), así que
+no cambian al archivar.
+"""
+import os
+from datetime import date, timedelta
+
+DIAS_ARCHIVO = int(os.environ.get('ERP_ARCHIVO_DIAS', 3))
+
+
+def fecha_corte(dias=DIAS_ARCHIVO, hoy=None):
+    return str((hoy or date.today()) - timedelta(days=dias))
+
+
+def archivables(db, dias=DIAS_ARCHIVO):
+    """Cuántos pedidos se moverían hoy al archivo."""
+    corte = fecha_corte(dias)
+    entregados = db.table('pedidos').select("id", count='exact').eq('estado', 'Entregado') \
+        .lt('fecha_entrega', corte).gt('liquidacion_id', 0).limit(1).execute().count or 0
+    cancelados = db.table('pedidos').select("id", count='exact').eq('estado', 'Cancelado') \
+        .lt('fecha_entrega', corte).is_('liquidacion_id', 'null').limit(1).execute().count or 0
+    return entregados + cancelados
+
+
+def archivar(db, dias=DIAS_ARCHIVO):
+    """Mueve los pedidos cerrados de más de `dias` al archivo. Devuelve cuántos movió."""
+    return db.rpc('archivar_pedidos', {"p_dias": dias}).execute().data or 0
+
+
+def buscar(db, id_pedido, columnas="*"):
+    """El pedido desde el archivo (None si no está)."""
+    filas = db.table('pedidos_historicos').select(columnas).eq('id', id_pedido).execute().data
+    return filas[0] if filas else None
+
+
+def ultimo_de_cliente(db, cliente_id, columnas="*"):
+    filas = db.table('pedidos_historicos').select(columnas).eq('cliente_id', cliente_id) \
+        .order('id', desc=True).limit(1).execute().data
+    return filas[0] if filas else None
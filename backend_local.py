@@ -0,0 +1,497 @@
+"""Backend local en memoria con la misma interfaz que el cliente de Supabase.
+
+Implementa el subconjunto de PostgREST que usa la app (select/insert/update/upsert/delete,
+filtros, orden, rango y rpc) para correr el ERP sin red: pruebas de carga, demos y
+tareas locales. Se activa con la variable de entorno ERP_BACKEND=local.
+"""
+import copy
+import fnmatch
+import itertools
+import json
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+
+class ErrorLocal(Exception):
+    pass
+
+
+class Respuesta:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Llamada:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return Respuesta(self._fn())
+
+
+class ConsultaLocal:
+    def __init__(self, backend, tabla):
+        self.backend = backend
+        self.tabla = tabla
+        self._op = 'select'
+        self._columnas = None
+        self._valores = None
+        self._on_conflict = 'id'
+        self._filtros = []
+        self._orden = []
+        self._desde = 0
+        self._hasta = None
+        self._contar = False
+
+    # --- Operaciones ---
+    def select(self, *columnas, count=None):
+        cols = ",".join(columnas).strip() or "*"
+        self._columnas = None if cols == "*" else [c.strip() for c in cols.split(",") if c.strip()]
+        self._contar = count is not None
+        return self
+
+    def insert(self, valores, **_):
+        self._op, self._valores = 'insert', valores
+        return self
+
+    def upsert(self, valores, on_conflict='id', **_):
+        self._op, self._valores, self._on_conflict = 'upsert', valores, on_conflict or 'id'
+        return self
+
+    def update(self, valores, **_):
+        self._op, self._valores = 'update', valores
+        return self
+
+    def delete(self, **_):
+        self._op = 'delete'
+        return self
+
+    # --- Filtros ---
+    def _filtro(self, col, fn):
+        self._filtros.append((col, fn))
+        return self
+
+    def eq(self, col, v): return self._filtro(col, lambda x: x == v)
+    def neq(self, col, v): return self._filtro(col, lambda x: x != v)
+    def gt(self, col, v): return self._filtro(col, lambda x: x is not None and x > v)
+    def gte(self, col, v): return self._filtro(col, lambda x: x is not None and x >= v)
+    def lt(self, col, v): return self._filtro(col, lambda x: x is not None and x < v)
+    def lte(self, col, v): return self._filtro(col, lambda x: x is not None and x <= v)
+    def in_(self, col, vs):
+        vs = set(vs)
+        return self._filtro(col, lambda x: x in vs)
+    def is_(self, col, v):
+        esperado = None if v in (None, 'null') else v
+        return self._filtro(col, lambda x: x is esperado or x == esperado)
+    def ilike(self, col, patron):
+        patron = str(patron).lower().replace('%', '*').replace('_', '?')
+        return self._filtro(col, lambda x: x is not None and fnmatch.fnmatchcase(str(x).lower(), patron))
+
+    # --- Modificadores ---
+    def order(self, col, desc=False, **_):
+        self._orden.append((col, desc))
+        return self
+
+    def limit(self, n, **_):
+        self._hasta = self._desde + n - 1
+        return self
+
+    def range(self, desde, hasta, **_):
+        self._desde, self._hasta = desde, hasta
+        return self
+
+    # --- Ejecución ---
+    def _coincide(self, fila):
+        return all(fn(fila.get(col)) for col, fn in self._filtros)
+
+    def _proyectar(self, fila):
+        if self._columnas is None: return copy.deepcopy(fila)
+        return {c: copy.deepcopy(fila.get(c)) for c in self._columnas}
+
+    def _registrar_precios(self, filas, anteriores):
+        if self.tabla == 'insumos': self.backend.registrar_precios(filas, anteriores)
+
+    def execute(self):
+        with self.backend.lock:
+            if self._op != 'select': self.backend.subir_version(self.tabla)
+            filas = self.backend.tablas[self.tabla]
+            if self._op == 'select':
+                res = [f for f in filas if self._coincide(f)]
+                for col, desc in reversed(self._orden):
+                    res.sort(key=lambda f: (f.get(col) is None, f.get(col)), reverse=desc)
+                total = len(res)
+                hasta = len(res) if self._hasta is None else self._hasta + 1
+                res = [self._proyectar(f) for f in res[self._desde:hasta]]
+                return Respuesta(res, total if self._contar else None)
+
+            if self._op == 'insert':
+                nuevas = self._valores if isinstance(self._valores, list) else [self._valores]
+                insertadas = [self.backend.insertar(self.tabla, v) for v in nuevas]
+                self._registrar_precios(insertadas, {})
+                return Respuesta([copy.deepcopy(f) for f in insertadas])
+
+            if self._op == 'upsert':
+                nuevas = self._valores if isinstance(self._valores, list) else [self._valores]
+                claves = [c.strip() for c in self._on_conflict.split(',')]
+                escritas, anteriores = [], {}
+                for v in nuevas:
+                    existente = next((f for f in filas if all(f.get(c) == v.get(c) for c in claves)), None)
+                    if existente:
+                        anteriores[existente.get('id')] = existente.get('costo_unitario')
+                        existente.update(copy.deepcopy(v))
+                    else: existente = self.backend.insertar(self.tabla, v)
+                    escritas.append(existente)
+                self._registrar_precios(escritas, anteriores)
+                return Respuesta([copy.deepcopy(f) for f in escritas])
+
+            afectadas = [f for f in filas if self._coincide(f)]
+            if self._op == 'update':
+                anteriores = {f.get('id'): f.get('costo_unitario') for f in afectadas}
+                for f in afectadas: f.update(copy.deepcopy(self._valores))
+                self._registrar_precios(afectadas, anteriores)
+                return Respuesta([copy.deepcopy(f) for f in afectadas])
+            if self._op == 'delete':
+                ids = {id(f) for f in afectadas}
+                self.backend.tablas[self.tabla] = [f for f in filas if id(f) not in ids]
+                return Respuesta([copy.deepcopy(f) for f in afectadas])
+            raise ErrorLocal(f"Operación no soportada: {self._op}")
+
+
+class BackendLocal:
+    """Base de datos en memoria. `rpc` despacha a funciones Python registradas en `FUNCIONES`."""
+
+    def __init__(self, datos=None):
+        self.lock = threading.RLock()
+        self.tablas = defaultdict(list)
+        self._ids = defaultdict(lambda: itertools.count(1))
+        for tabla, filas in (datos or {}).items():
+            for f in filas: self.insertar(tabla, f)
+        for tabla in VERSIONADAS: self.insertar('versiones_tabla', {"tabla": tabla, "version": 0})
+        # Punto de partida del historial, como el insert inicial de sql/precios.sql
+        self.registrar_precios(self.tablas['insumos'], {})
+
+    def subir_version(self, tabla):
+        # Equivale a los triggers de sql/versiones.sql
+        if tabla not in VERSIONADAS: return
+        fila = next(f for f in self.tablas['versiones_tabla'] if f['tabla'] == tabla)
+        fila['version'] += 1
+
+    def registrar_precios(self, filas, anteriores):
+        # Equivale al trigger `insumos_precio` de sql/precios.sql sobre las filas escritas: una fila
+        # de historial si es nueva (sin entrada en `anteriores`) o si su costo cambió. Con zona, como timestamptz
+        ahora = datetime.now().astimezone().isoformat()
+        nuevos = [{"insumo_id": i['id'], "costo_unitario": i['costo_unitario'], "vigente_desde": ahora}
+                  for i in filas
+                  if i.get('costo_unitario') is not None
+                  and (i['id'] not in anteriores or anteriores[i['id']] != i['costo_unitario'])]
+        for f in nuevos: self.insertar('precios_insumo', f)
+        if nuevos: self.subir_version('precios_insumo')
+
+    def insertar(self, tabla, valores):
+        fila = {**DEFECTOS.get(tabla, {}), **copy.deepcopy(valores)}
+        if fila.get('id') is None and tabla not in SIN_ID:
+            fila['id'] = next(self._ids[tabla])
+        else:
+            # Mantiene el contador por delante de los ids explícitos
+            actual = next(self._ids[tabla])
+            if isinstance(fila.get('id'), int) and fila['id'] >= actual:
+                self._ids[tabla] = itertools.count(fila['id'] + 1)
+            else:
+                self._ids[tabla] = itertools.count(actual)
+        self.tablas[tabla].append(fila)
+        return fila
+
+    def table(self, nombre):
+        return ConsultaLocal(self, nombre)
+
+    def rpc(self, funcion, params=None):
+        if funcion not in FUNCIONES: raise ErrorLocal(f"Función RPC desconocida: {funcion}")
+        if funcion in SOLO_LECTURA: return _Llamada(lambda: self._leer(FUNCIONES[funcion], params or {}))
+        return _Llamada(lambda: self._transaccion(FUNCIONES[funcion], params or {}))
+
+    def _leer(self, fn, params):
+        # Funciones `stable`: no escriben, así que ni respaldo ni cambio de versiones
+        with self.lock:
+            return fn(self, **params)
+
+    def _transaccion(self, fn, params):
+        # Todo o nada: si la función falla se restaura el estado anterior
+        with self.lock:
+            respaldo = copy.deepcopy(dict(self.tablas))
+            try:
+                res = fn(self, **params)
+                # Las funciones escriben directo en `tablas`: se invalidan todas las versionadas
+                for tabla in VERSIONADAS: self.subir_version(tabla)
+                return res
+            except Exception:
+                self.tablas = defaultdict(list, respaldo)
+                raise
+
+
+# Tablas con clave primaria propia (sin columna id autoincremental)
+SIN_ID = {'saldos_cuenta', 'cuentas', 'versiones_tabla'}
+
+# Tablas con trigger de versión (sql/versiones.sql)
+VERSIONADAS = ('insumos', 'productos', 'variaciones', 'pedidos', 'clientes', 'usuarios', 'saldos_cuenta', 'precios_insumo')
+
+# Funciones de solo lectura (`stable` en SQL)
+SOLO_LECTURA = {'resumen_insumos'}
+
+# Valores por defecto de columnas (los `default` de la carpeta sql/)
+DEFECTOS = {
+    'pedidos': {'version': 1, 'liquidacion_id': None},
+}
+
+
+# --- EQUIVALENTES DE LAS FUNCIONES SQL (carpeta sql/) ---
+
+def _registrar_asientos(db, p_asientos):
+    registrados = 0
+    refs = {a.get('referencia') for a in db.tablas['asientos']}
+    for a in p_asientos:
+        debe = sum(l.get('debe') or 0 for l in a['lineas'])
+        haber = sum(l.get('haber') or 0 for l in a['lineas'])
+        if abs(debe - haber) > 1e-9:
+            raise ErrorLocal(f"Asiento descuadrado ({a.get('descripcion')}): debe {debe} / haber {haber}")
+        if a.get('referencia') and a['referencia'] in refs: continue
+        fila = db.insertar('asientos', {"fecha": a['fecha'], "descripcion": a.get('descripcion'),
+                                        "referencia": a.get('referencia'), "creado_en": datetime.now().isoformat()})
+        refs.add(a.get('referencia'))
+        mes = str(a['fecha'])[:7]
+        for l in a['lineas']:
+            db.insertar('movimientos', {"asiento_id": fila['id'], "cuenta": l['cuenta'], "fecha": a['fecha'],
+                                        "debe": l.get('debe') or 0, "haber": l.get('haber') or 0})
+            saldo = next((s for s in db.tablas['saldos_cuenta'] if s['cuenta'] == l['cuenta'] and s['mes'] == mes), None)
+            if not saldo: saldo = db.insertar('saldos_cuenta', {"cuenta": l['cuenta'], "mes": mes, "debe": 0, "haber": 0})
+            saldo['debe'] += l.get('debe') or 0
+            saldo['haber'] += l.get('haber') or 0
+        registrados += 1
+    return registrados
+
+
+def _recalcular_saldos(db):
+    saldos = {}
+    for m in db.tablas['movimientos']:
+        clave = (m['cuenta'], str(m['fecha'])[:7])
+        s = saldos.setdefault(clave, {"cuenta": clave[0], "mes": clave[1], "debe": 0, "haber": 0})
+        s['debe'] += m['debe']
+        s['haber'] += m['haber']
+    db.tablas['saldos_cuenta'] = list(saldos.values())
+    return len(saldos)
+
+
+def _aplicar_liquidacion(db, p):
+    liq = db.insertar('liquidaciones', {"creada_en": datetime.now().isoformat(), "pedidos": len(p['pedidos']),
+                                        "reversos": len(p['reversos']), "costo": 0, "detalle": p['consumo']})
+    pedidos = {f['id']: f for f in db.tablas['pedidos']}
+    for i in p['pedidos']:
+        f = pedidos.get(i)
+        if not f or f['estado'] != 'Entregado' or f.get('liquidacion_id') is not None:
+            raise ErrorLocal("Hay pedidos que ya se liquidaron o cambiaron de estado: vuelve a correr la liquidación")
+        f['liquidacion_id'] = liq['id']
+    for i in p['reversos']:
+        f = pedidos.get(i)
+        if not f or f['estado'] != 'Cancelado' or f.get('liquidacion_id') is None:
+            raise ErrorLocal("Hay devoluciones que ya se revirtieron: vuelve a correr la liquidación")
+        f['liquidacion_id'] = None
+    fifo = p.get('metodo') == 'fifo'
+    costo_total = sum(_consumir_stock(db, c['insumo_id'], c['cantidad'], fifo)
+                      for c in sorted(p['consumo'], key=lambda c: c['insumo_id']))
+    liq['costo'] = round(costo_total, 2)
+    return {"id": liq['id'], "costo": liq['costo']}
+
+
+def _insumo(db, p_insumo_id):
+    f = next((f for f in db.tablas['insumos'] if f['id'] == p_insumo_id), None)
+    if not f: raise ErrorLocal(f"Insumo {p_insumo_id} no existe")
+    return f
+
+
+def _registrar_compra(db, p_insumo_id, p_cantidad, p_costo_total, p_fecha=None):
+    f = _insumo(db, p_insumo_id)
+    costo = f.get('costo_unitario') or 0
+    if p_cantidad <= 0: return costo
+    db.insertar('lotes_insumo', {"insumo_id": f['id'], "fecha": p_fecha or datetime.now().isoformat(),
+                                 "cantidad": p_cantidad, "restante": p_cantidad, "costo_unitario": p_costo_total / p_cantidad})
+    previo = max(f.get('stock_actual') or 0, 0)
+    f.update(stock_actual=(f.get('stock_actual') or 0) + p_cantidad, ultimo_precio=p_costo_total / p_cantidad,
+             costo_unitario=(previo * costo + p_costo_total) / (previo + p_cantidad))
+    db.registrar_precios([f], {f['id']: costo})
+    return f['costo_unitario']
+
+
+def _consumir_stock(db, p_insumo_id, p_cantidad, p_fifo):
+    f = next((f for f in db.tablas['insumos'] if f['id'] == p_insumo_id), None)
+    if not f: return 0.0
+    costo, costo_total = f.get('costo_unitario') or 0, 0.0
+    if p_cantidad > 0 and p_fifo:
+        # Misma regla que en sql/costeo.sql: stock sin lote, lotes más antiguos, exceso al costo mantenido
+        abiertos = sorted((l for l in db.tablas['lotes_insumo'] if l['insumo_id'] == f['id'] and l['restante'] > 0),
+                          key=lambda l: (str(l['fecha']), l['id']))
+        usado = min(max(f['stock_actual'] - sum(l['restante'] for l in abiertos), 0), p_cantidad)
+        costo_total += usado * costo
+        pendiente = p_cantidad - usado
+        for l in abiertos:
+            if pendiente <= 0: break
+            usado = min(l['restante'], pendiente)
+            l['restante'] -= usado
+            costo_total += usado * l['costo_unitario']
+            pendiente -= usado
+        costo_total += pendiente * costo
+        en_lotes = sum(l['restante'] for l in abiertos if l['restante'] > 0)
+        valor = sum(l['restante'] * l['costo_unitario'] for l in abiertos if l['restante'] > 0)
+        sin_lote = max(f['stock_actual'] - p_cantidad - en_lotes, 0)
+        f['costo_unitario'] = (valor + sin_lote * costo) / (en_lotes + sin_lote) if en_lotes + sin_lote > 0 else costo
+        db.registrar_precios([f], {f['id']: costo})
+    elif p_cantidad > 0:
+        costo_total += p_cantidad * costo
+    f['stock_actual'] -= p_cantidad
+    return costo_total
+
+
+def _ajustar_stock(db, p_insumo_id, p_cantidad, p_fijar, p_metodo='promedio'):
+    f = _insumo(db, p_insumo_id)
+    stock = f.get('stock_actual') or 0
+    delta = p_cantidad - stock if p_fijar else p_cantidad
+    if delta > 0:
+        db.insertar('lotes_insumo', {"insumo_id": f['id'], "fecha": datetime.now().isoformat(), "cantidad": delta,
+                                     "restante": delta, "costo_unitario": f.get('costo_unitario') or 0})
+        f['stock_actual'] = stock + delta
+    elif delta < 0:
+        _consumir_stock(db, f['id'], -delta, p_metodo == 'fifo')
+    return stock + delta
+
+
+def _actualizar_precios(db, p_filas):
+    precios = {f['id']: f['ultimo_precio'] for f in p_filas}
+    filas = [i for i in db.tablas['insumos'] if i['id'] in precios]
+    for i in filas: i['ultimo_precio'] = precios[i['id']]
+    return len(filas)
+
+
+def _pedido_vigente(db, p_id, p_estado, p_version):
+    f = next((f for f in db.tablas['pedidos'] if f['id'] == p_id), None)
+    return f, bool(f and f['estado'] == p_estado and f.get('version', 1) == p_version)
+
+
+def _asiento_pedido(db, f, descripcion, referencia, debe, haber):
+    _registrar_asientos(db, [{"fecha": str(date.today()), "descripcion": f"{descripcion} Pedido #{f['id']} - {f.get('cliente_nombre')}",
+                              "referencia": f"{referencia}:{f['id']}",
+                              "lineas": [{"cuenta": debe, "debe": f['total_pedido']}, {"cuenta": haber, "haber": f['total_pedido']}]}])
+
+
+def _entregar_pedido(db, p_id, p_estado, p_version):
+    f, ok = _pedido_vigente(db, p_id, p_estado, p_version)
+    if not ok: return {"conflicto": True, "pedido": copy.deepcopy(f)}
+    if f['estado'] != 'Listo': raise ErrorLocal(f"Pedido #{p_id}: no se puede pasar de '{f['estado']}' a 'Entregado'")
+    f.update(estado='Entregado', version=f.get('version', 1) + 1)
+    _asiento_pedido(db, f, "Venta", "pedido", 'caja', 'ventas')
+    return {"conflicto": False, "pedido": copy.deepcopy(f)}
+
+
+def _cancelar_pedido(db, p_id, p_estado, p_version):
+    f, ok = _pedido_vigente(db, p_id, p_estado, p_version)
+    if not ok: return {"conflicto": True, "pedido": copy.deepcopy(f)}
+    if f['estado'] == 'Cancelado': raise ErrorLocal(f"Pedido #{p_id}: ya está cancelado")
+    era_entregado = f['estado'] == 'Entregado'
+    f.update(estado='Cancelado', version=f.get('version', 1) + 1)
+    if era_entregado: _asiento_pedido(db, f, "Devolución", "devolucion", 'ventas', 'caja')
+    return {"conflicto": False, "pedido": copy.deepcopy(f)}
+
+
+def _archivar_pedidos(db, p_dias):
+    corte = str(date.today() - timedelta(days=p_dias))
+    quedan, movidos = [], []
+    for f in db.tablas['pedidos']:
+        cerrado = ((f['estado'] == 'Entregado' and f.get('liquidacion_id') is not None)
+                   or (f['estado'] == 'Cancelado' and f.get('liquidacion_id') is None))
+        (movidos if cerrado and str(f.get('fecha_entrega') or '9999') < corte else quedan).append(f)
+    ahora = datetime.now().isoformat()
+    db.tablas['pedidos_historicos'].extend({**f, "archivado_en": ahora} for f in movidos)
+    db.tablas['pedidos'] = quedan
+    return len(movidos)
+
+
+def _resumen_insumos(db, p_buscar, p_unidad, p_stock_max, p_umbral_bajo):
+    patron = (p_buscar or '').lower()
+    filas = [f for f in db.tablas['insumos']
+             if patron in (f.get('nombre') or '').lower()
+             and (p_unidad is None or f.get('unidad_medida') == p_unidad)
+             and (p_stock_max is None or (f.get('stock_actual') or 0) <= p_stock_max)]
+    return {
+        "filas": len(filas),
+        "valor": sum(max(f.get('stock_actual') or 0, 0) * (f.get('costo_unitario') or 0) for f in filas),
+        "bajo_stock": sum(1 for f in filas if (f.get('stock_actual') or 0) <= p_umbral_bajo),
+    }
+
+
+def _restaurar_tablas(db, p_restauracion, p_tablas, p_con_id):
+    subidas = [f for f in db.tablas['restauracion_filas'] if f['restauracion'] == p_restauracion]
+    for tabla in p_tablas: db.tablas[tabla] = []
+    res = {}
+    for tabla in p_tablas:
+        filas = [f['fila'] for f in subidas if f['tabla'] == tabla]
+        # `insertar` directo, sin registrar_precios: el historial viene en el respaldo (ver sql/respaldos.sql)
+        for f in filas: db.insertar(tabla, f)
+        res[tabla] = len(filas)
+    db.tablas['restauracion_filas'] = [f for f in db.tablas['restauracion_filas'] if f['restauracion'] != p_restauracion]
+    _sincronizar_secuencias(db, p_con_id)
+    return res
+
+
+def _sincronizar_secuencias(db, p_tablas):
+    # Los contadores del backend local ya avanzan con cada id explícito (ver BackendLocal.insertar)
+    return len(p_tablas)
+
+
+FUNCIONES = {
+    'registrar_asientos': _registrar_asientos,
+    'recalcular_saldos': _recalcular_saldos,
+    'aplicar_liquidacion': _aplicar_liquidacion,
+    'registrar_compra': _registrar_compra,
+    'consumir_stock': _consumir_stock,
+    'ajustar_stock': _ajustar_stock,
+    'actualizar_precios': _actualizar_precios,
+    'entregar_pedido': _entregar_pedido,
+    'cancelar_pedido': _cancelar_pedido,
+    'archivar_pedidos': _archivar_pedidos,
+    'sincronizar_secuencias': _sincronizar_secuencias,
+    'restaurar_tablas': _restaurar_tablas,
+    'resumen_insumos': _resumen_insumos,
+}
+
+
+# --- DATOS DE DEMOSTRACIÓN ---
+
+def datos_demo():
+    """Catálogo mínimo para probar la app: un usuario admin/admin, insumos, una torta y pedidos."""
+    hoy = str(date.today())
+    ingredientes = [
+        {"nombre": "Harina", "cantidad": 500, "unidad": "gr", "costo": 600, "insumo_id": 1},
+        {"nombre": "Azúcar", "cantidad": 300, "unidad": "gr", "costo": 390, "insumo_id": 2},
+        {"nombre": "Huevos", "cantidad": 6, "unidad": "unidades", "costo": 1200, "insumo_id": 3},
+        {"nombre": "Crema de Leche", "cantidad": 400, "unidad": "ml", "costo": 1600, "insumo_id": 4},
+    ]
+    return {
+        'usuarios': [{"id": 1, "nombre": "Administrador", "username": "admin", "password": "admin", "rol": "Admin"}],
+        'insumos': [
+            {"id": 1, "nombre": "Harina", "unidad_medida": "kg", "stock_actual": 25.0, "costo_unitario": 1200.0},
+            {"id": 2, "nombre": "Azúcar", "unidad_medida": "kg", "stock_actual": 20.0, "costo_unitario": 1300.0},
+            {"id": 3, "nombre": "Huevos", "unidad_medida": "unidades", "stock_actual": 180.0, "costo_unitario": 200.0},
+            {"id": 4, "nombre": "Crema de Leche", "unidad_medida": "lt", "stock_actual": 10.0, "costo_unitario": 4000.0},
+        ],
+        'productos': [{"id": 1, "nombre": "Torta Bizcocho", "categoria": "Tortas", "imagen_url": ""}],
+        'variaciones': [
+            {"id": 1, "producto_id": 1, "nombre": "Tradicional - 20 Personas", "precio": 28000,
+             "ingredientes_json": json.dumps(ingredientes), "rendimiento": 1.0},
+        ],
+        'clientes': [{"id": 1, "nombre": "Cliente Demo", "telefono": "+56912345678"}],
+        'pedidos': [
+            {"id": 1, "cliente_id": 1, "cliente_nombre": "Cliente Demo", "cliente_contacto": "+56912345678",
+             "fecha_entrega": hoy, "hora_entrega": "12:00:00", "variacion_id": 1,
+             "nombre_producto_snapshot": "Torta Bizcocho - Tradicional - 20 Personas", "cantidad": 1,
+             "precio_unitario_final": 28000, "total_pedido": 28000, "estado": "Pendiente", "notas": ""},
+        ],
+    }
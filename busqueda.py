@@ -0,0 +1,111 @@
+"""Índice de búsqueda en memoria: trigramas sin tildes + prefijos de palabra.
+
+Tolera tildes, mayúsculas, palabras omitidas o en otro orden y errores de tipeo
+("crema leche" encuentra "Crema de Leche"). Se actualiza de forma incremental.
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+PALABRAS_VACIAS = {'de', 'del', 'la', 'el', 'los', 'las', 'y', 'con', 'en', 'para'}
+
+
+def plegar(texto):
+    """Minúsculas, sin tildes ni signos, espacios simples."""
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    texto = re.sub(r'[^a-z0-9 ]+', ' ', texto.lower())
+    return ' '.join(texto.split())
+
+
+def palabras(plegado):
+    return [p for p in plegado.split() if p not in PALABRAS_VACIAS] or plegado.split()
+
+
+def trigramas(plegado):
+    tris = set()
+    for p in palabras(plegado):
+        p = f" {p} "
+        tris.update(p[i:i + 3] for i in range(len(p) - 2))
+    return tris
+
+
+class IndiceBusqueda:
+    def __init__(self):
+        self._etiquetas = {}               # clave -> etiqueta visible
+        self._plegados = {}                # clave -> texto plegado
+        self._tri = defaultdict(set)       # trigrama -> claves
+        self._palabras = []                # lista ordenada de (palabra, clave) para prefijos
+        self._orden = None                 # claves en orden alfabético, se recalcula al cambiar
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._etiquetas)
+
+    def etiqueta(self, clave):
+        return self._etiquetas.get(clave, str(clave))
+
+    def _agregar(self, clave, etiqueta):
+        plegado = plegar(etiqueta)
+        self._etiquetas[clave] = etiqueta
+        self._plegados[clave] = plegado
+        for t in trigramas(plegado): self._tri[t].add(clave)
+        for p in set(palabras(plegado)): bisect.insort(self._palabras, (p, clave))
+
+    def _quitar(self, clave):
+        plegado = self._plegados.pop(clave)
+        del self._etiquetas[clave]
+        for t in trigramas(plegado):
+            self._tri[t].discard(clave)
+            if not self._tri[t]: del self._tri[t]
+        for p in set(palabras(plegado)):
+            i = bisect.bisect_left(self._palabras, (p, clave))
+            if i < len(self._palabras) and self._palabras[i] == (p, clave): del self._palabras[i]
+
+    def actualizar(self, items):
+        """Sincroniza con `items` ({clave: etiqueta}) tocando solo lo que cambió."""
+        with self._lock:
+            cambios = len(items) != len(self._etiquetas) or any(self._etiquetas.get(c) != e for c, e in items.items())
+            if not cambios: return
+            self._orden = None
+            for clave in [c for c in self._etiquetas if c not in items]:
+                self._quitar(clave)
+            for clave, etiqueta in items.items():
+                actual = self._etiquetas.get(clave)
+                if actual == etiqueta: continue
+                if actual is not None: self._quitar(clave)
+                self._agregar(clave, etiqueta)
+
+    def _por_prefijo(self, prefijo):
+        i = bisect.bisect_left(self._palabras, (prefijo,))
+        while i < len(self._palabras) and self._palabras[i][0].startswith(prefijo):
+            yield self._palabras[i][1]
+            i += 1
+
+    def buscar(self, consulta, limite=20):
+        """Claves ordenadas por relevancia. Sin consulta devuelve las primeras por orden alfabético."""
+        q = plegar(consulta or '')
+        with self._lock:
+            if not q:
+                if self._orden is None: self._orden = sorted(self._etiquetas, key=lambda c: self._plegados[c])
+                return self._orden[:limite]
+
+            tris = trigramas(q)
+            pal = palabras(q)
+            coincidencias = Counter()
+            for t in tris: coincidencias.update(self._tri.get(t, ()))
+            prefijos = Counter()
+            # Cada palabra de la consulta que sea prefijo de una palabra del texto suma
+            for p in pal: prefijos.update(set(self._por_prefijo(p)))
+
+            def puntaje(clave):
+                s = coincidencias[clave] / len(tris) + prefijos[clave] / len(pal)
+                return s + 1.0 if self._plegados[clave].startswith(q) else s
+
+            candidatos = set(coincidencias) | set(prefijos)
+            mejores = heapq.nlargest(limite * 2, ((puntaje(c), c) for c in candidatos), key=lambda x: x[0])
+            mejores.sort(key=lambda x: (-x[0], self._plegados[x[1]]))
+            mejores = [(c, s) for s, c in mejores]
+            return [c for c, s in mejores if s >= 0.3][:limite]
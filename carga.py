@@ -0,0 +1,200 @@
+"""Prueba de carga: N sesiones simuladas recorren erp.py al mismo tiempo.
+
+Cada sesión es un `AppTest` de Streamlit (sin navegador) contra el backend en memoria
+(ERP_BACKEND=local), así que no toca Supabase. El recorrido es el de un turno:
+ingresar, tomar un pedido, avanzarlo en el tablero hasta entregarlo y registrar una compra.
+
+Uso:
+    python carga.py --sesiones 1 2 4 8 --vueltas 3
+
+Por cada cantidad de sesiones informa p50/p95/p99 de la latencia de rerun, CPU del
+proceso (segundos por sesión y % de un núcleo) y memoria residente por sesión.
+
+AppTest cambia estado global de Streamlit en cada corrida (Runtime, config), así que dos
+reruns no pueden ejecutarse a la vez en el mismo proceso: las sesiones se turnan y la
+latencia incluye la espera en la cola. Es lo que ve un usuario cuando el servidor está
+ocupado (con el GIL los reruns de Python tampoco corren en paralelo), pero no modela
+esperas de red solapadas.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+os.environ.setdefault('ERP_BACKEND', 'local')
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'erp.py')
+TIMEOUT_RERUN = 60
+_sleep = time.sleep
+_turno = threading.Lock()
+
+
+def _sin_pausas_ui(segundos):
+    # Las pausas de erp.py solo dejan leer un aviso antes del rerun: no son latencia del servidor
+    if sys._getframe(1).f_code.co_filename == APP: return
+    _sleep(segundos)
+
+
+def memoria_residente():
+    """RSS actual del proceso en MB (Linux); en otros sistemas el pico."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 2**20 if sys.platform == 'darwin' else pico / 1024
+
+
+# --- RECORRIDO DE UNA SESIÓN ---
+
+class Sesion:
+    def __init__(self, numero):
+        self.numero = numero
+        self.at = AppTest.from_file(APP, default_timeout=TIMEOUT_RERUN)
+        self.latencias = []
+
+    def rerun(self):
+        t = time.perf_counter()
+        with _turno:
+            self.at.run()
+        self.latencias.append(time.perf_counter() - t)
+        if self.at.exception:
+            raise RuntimeError(f"Sesión {self.numero}: {self.at.exception[0].message}")
+
+    def _por_etiqueta(self, elementos, etiqueta):
+        return next(e for e in elementos if e.label == etiqueta)
+
+    def _clave(self, elementos, clave):
+        return next((e for e in elementos if e.key == clave), None)
+
+    def ingresar(self, usuario, clave):
+        self.rerun()
+        self._por_etiqueta(self.at.text_input, "Usuario").input(usuario)
+        self._por_etiqueta(self.at.text_input, "Contraseña").input(clave)
+        self._por_etiqueta(self.at.button, "Ingresar").click()
+        self.rerun()
+        if not self.at.session_state['authenticated']:
+            raise RuntimeError(f"Sesión {self.numero}: no pudo ingresar")
+
+    def ir_a(self, menu):
+        self.at.sidebar.radio[0].set_value(menu)
+        self.rerun()
+
+    def elegir(self, clave, busqueda, opcion=None):
+        """Usa un `selector_busqueda`: escribe, espera la lista corta y elige (la primera si no se indica)."""
+        self._clave(self.at.text_input, f"{clave}_q").input(busqueda)
+        self.rerun()
+        caja = self._clave(self.at.selectbox, clave)
+        if not caja.options: raise RuntimeError(f"Sesión {self.numero}: '{busqueda}' no aparece en {clave}")
+        caja.select(opcion if opcion is not None else caja.options[0])
+        self.rerun()
+
+    def tomar_pedido(self, vuelta):
+        self.ir_a("📌 Pedidos")
+        self._clave(self.at.text_input, "cli_nom").input(f"Carga {self.numero}-{vuelta}")
+        self._clave(self.at.text_input, "cli_tel").input(f"9{self.numero:04d}{vuelta:04d}")
+        self.elegir("new_base_sel", "torta")
+        variedad = self._clave(self.at.selectbox, "new_var_sel")
+        variedad.select(variedad.options[0])
+        self.rerun()
+        self._por_etiqueta(self.at.button, "💾 Confirmar Pedido").click()
+        self.rerun()
+
+    def avanzar_tablero(self, pasos=3):
+        """Avanza la primera tarjeta que tenga acción (Horno → Listo → Entregar)."""
+        for _ in range(pasos):
+            boton = next((b for b in self.at.button if b.key and b.key[:2] in ('h_', 'l_', 'e_')), None)
+            if boton is None: return
+            boton.click()
+            self.rerun()
+
+    def registrar_compra(self):
+        self.ir_a("📦 Inventario")
+        self.elegir("c_sel_ins", "harina")
+        self._clave(self.at.number_input, "c_c").set_value(1.0)
+        self._clave(self.at.number_input, "c_p").set_value(1200)
+        self._por_etiqueta(self.at.button, "✅ Ingresar Stock").click()
+        self.rerun()
+
+    def recorrer(self, vueltas, usuario, clave):
+        self.ingresar(usuario, clave)
+        for v in range(vueltas):
+            self.tomar_pedido(v)
+            self.avanzar_tablero()
+            self.registrar_compra()
+        return self.latencias
+
+
+# --- MEDICIÓN ---
+
+def medir(n_sesiones, vueltas, usuario='admin', clave='admin'):
+    rss_antes = memoria_residente()
+    cpu_antes, t_antes = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sesiones, thread_name_prefix="sesion") as pool:
+        sesiones = [Sesion(i) for i in range(n_sesiones)]
+        futuros = [pool.submit(s.recorrer, vueltas, usuario, clave) for s in sesiones]
+        latencias = [lat for f in futuros for lat in f.result()]
+    cpu = time.process_time() - cpu_antes
+    pared = time.perf_counter() - t_antes
+    # La memoria se toma con las sesiones aún vivas (cada una guarda su session_state)
+    rss = memoria_residente()
+    del sesiones
+    ms = np.array(latencias) * 1000
+    return {
+        "sesiones": n_sesiones,
+        "reruns": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+        "cpu_s_por_sesion": round(cpu / n_sesiones, 2),
+        "cpu_pct": round(cpu / pared * 100, 1),
+        "rss_mb": round(rss, 1),
+        "rss_mb_por_sesion": round(max(rss - rss_antes, 0) / n_sesiones, 2),
+    }
+
+
+def imprimir(resultados):
+    columnas = list(resultados[0].keys())
+    anchos = [max(len(c), *(len(str(r[c])) for r in resultados)) for c in columnas]
+    print("  ".join(c.rjust(a) for c, a in zip(columnas, anchos)))
+    for r in resultados:
+        print("  ".join(str(r[c]).rjust(a) for c, a in zip(columnas, anchos)))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Prueba de carga multi-sesión de erp.py (backend en memoria).")
+    p.add_argument('--sesiones', type=int, nargs='+', default=[1, 2, 4, 8], help="cantidades de sesiones a probar")
+    p.add_argument('--vueltas', type=int, default=3, help="pedidos + compras por sesión")
+    p.add_argument('--usuario', default='admin')
+    p.add_argument('--clave', default='admin')
+    p.add_argument('--con-pausas', action='store_true', help="respetar los time.sleep de la interfaz")
+    p.add_argument('--json', help="guardar los resultados en este archivo")
+    args = p.parse_args(argv)
+
+    if not args.con_pausas: time.sleep = _sin_pausas_ui
+    try:
+        # Calentamiento: importaciones y cachés de Streamlit no cuentan en la primera medición
+        Sesion(-1).ingresar(args.usuario, args.clave)
+        resultados = []
+        for n in args.sesiones:
+            resultados.append(medir(n, args.vueltas, args.usuario, args.clave))
+            print(f"✔ {n} sesiones", file=sys.stderr)
+    finally:
+        time.sleep = _sleep
+
+    imprimir(resultados)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
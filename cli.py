@@ -0,0 +1,195 @@
+"""Tareas del ERP por línea de comandos (sin Streamlit), pensadas para cron.
+
+Ejemplos:
+    python cli.py entregar 42
+    python cli.py liquidar
+    python cli.py archivar --dias 3
+    python cli.py recostear
+    python cli.py saldos
+    python cli.py exportar pedidos --salida pedidos.csv
+    python cli.py respaldar
+
+La conexión se toma de SUPABASE_URL / SUPABASE_KEY o de .streamlit/secrets.toml.
+"""
+import argparse
+import math
+import sys
+
+import archivo
+import clientes
+import compras
+import libro
+import pronostico
+import respaldos
+import servicios
+from conexion import cliente_desde_entorno
+
+
+def cmd_entregar(db, args):
+    pedido = servicios.obtener_pedido(db, args.id)
+    if 'Entregado' not in servicios.TRANSICIONES[pedido['estado']]:
+        print(f"Pedido #{args.id} está {pedido['estado']}, no se puede entregar.")
+        return 1
+    servicios.entregar_pedido(db, pedido)
+    print(f"Pedido #{args.id} entregado, venta registrada.")
+
+
+def cmd_cancelar(db, args):
+    pedido = servicios.obtener_pedido(db, args.id)
+    msg = servicios.cambiar_estado_pedido(db, args.id, 'Cancelado', pedido)
+    print(f"Pedido #{args.id} cancelado{msg}")
+
+
+def cmd_liquidar(db, args):
+    res = servicios.liquidar_stock(db, args.metodo)
+    if res is None:
+        print("Nada que liquidar.")
+        return
+    print(f"Liquidación #{res['id']}: {len(res['pedidos'])} entregas, {len(res['reversos'])} devoluciones, "
+          f"costo ${res['costo']:,.0f}")
+    for c in res['consumo']:
+        print(f"- {c['nombre']}: {c['cantidad']:.3f}")
+
+
+def cmd_archivar(db, args):
+    print(f"{archivo.archivar(db, args.dias)} pedidos cerrados movidos al archivo "
+          f"(entrega anterior a {archivo.fecha_corte(args.dias)}).")
+
+
+def cmd_pronostico(db, args):
+    df = pronostico.Pronosticador().pronostico(db, args.dias)
+    total = df.groupby('variacion_id')[['unidades', 'reservado']].sum()
+    for vid, fila in total.sort_values('unidades', ascending=False).iterrows():
+        print(f"{vid:>5}  {fila['unidades']:>8.1f} unidades  (ya reservadas {fila['reservado']:.0f})")
+
+
+def cmd_compras(db, args):
+    lista, total = compras.lista_compras(compras.faltantes(db), compras.envases(db))
+    for f in lista.itertuples(index=False):
+        nota = "  (estimado)" if f.estimado else ""
+        print(f"{f.insumo[:30]:<30}  {f.cantidad:>8g} × {f.envase:<16}  ${f.costo:>10,.0f}{nota}")
+    print(f"Total: ${total:,.0f}")
+
+
+def cmd_recostear(db, args):
+    for fila in servicios.recostear(db):
+        margen = "-" if fila['margen_bruto'] is None else f"{fila['margen_bruto']}%"
+        print(f"{fila['id']:>5}  {fila['nombre'][:40]:<40}  costo ${fila['costo_ingredientes']:>10,.0f}  "
+              f"precio ${fila['precio']:>10,.0f}  margen {margen}")
+
+
+def cmd_costos(db, args):
+    # Fin del día indicado: incluye los cambios de costo de ese día
+    for f in servicios.costos_a_fecha(db, f"{args.fecha}T23:59:59").itertuples(index=False):
+        cambio = "-" if math.isnan(f.cambio_pct) else f"{f.cambio_pct:+.1f}%"
+        print(f"{f.id:>5}  {f.variacion[:40]:<40}  ${f.costo_entonces:>10,.0f}  →  ${f.costo_hoy:>10,.0f}  {cambio}")
+
+
+def cmd_saldos(db, args):
+    print(f"Saldos recalculados: {servicios.recalcular_saldos(db)} filas.")
+
+
+def cmd_exportar(db, args):
+    destino = args.salida or servicios.nombre_exportacion(args.tabla)
+    n = servicios.exportar(db, args.tabla, destino, args.columnas)
+    print(f"{n} filas de '{args.tabla}' exportadas a {destino}")
+
+
+def cmd_reclasificar_gastos(db, args):
+    print(f"{libro.reclasificar_gastos(db)} movimientos traspasados al libro.")
+
+
+def cmd_migrar_clientes(db, args):
+    n_cli, n_ped = clientes.migrar_clientes(db)
+    print(f"{n_cli} clientes, {n_ped} pedidos enlazados.")
+
+
+def cmd_respaldar(db, args):
+    carpeta = respaldos.crear(db, args.motivo, args.tablas)
+    man = respaldos.manifiesto(carpeta)
+    print(f"Respaldo en {carpeta}: {sum(t['filas'] for t in man['tablas'].values())} filas, "
+          f"{len(man['tablas'])} tablas" + (f", omitidas: {', '.join(man['omitidas'])}" if man['omitidas'] else ""))
+
+
+def cmd_respaldos(db, args):
+    for carpeta, man in respaldos.listar():
+        problemas = respaldos.verificar(carpeta) if args.verificar else []
+        estado = f"  ⚠ {len(problemas)} problemas" if problemas else ""
+        print(f"{carpeta.name:<45} {man['motivo']:<30} {sum(t['filas'] for t in man['tablas'].values()):>8} filas{estado}")
+
+
+def cmd_restaurar(db, args):
+    restauradas, previo = servicios.restaurar_respaldo(db, args.carpeta, args.tablas)
+    for tabla, n in restauradas.items():
+        print(f"{tabla}: {n} filas")
+    print(f"Respaldo previo en {previo}")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Tareas programadas del ERP TV Repostería")
+    parser.add_argument('--metodo', choices=['promedio', 'fifo'], default='promedio', help="Método de costeo de insumos")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p = sub.add_parser('entregar', help="Marca un pedido como entregado y registra la venta")
+    p.add_argument('id', type=int)
+    p.set_defaults(func=cmd_entregar)
+
+    p = sub.add_parser('cancelar', help="Cancela un pedido (devuelve stock si ya estaba entregado)")
+    p.add_argument('id', type=int)
+    p.set_defaults(func=cmd_cancelar)
+
+    sub.add_parser('liquidar', help="Descuenta el stock de todos los pedidos entregados sin liquidar (fin de día)") \
+        .set_defaults(func=cmd_liquidar)
+
+    p = sub.add_parser('archivar', help="Mueve los pedidos cerrados antiguos al archivo (después de liquidar)")
+    p.add_argument('--dias', type=int, default=archivo.DIAS_ARCHIVO, help="días que se mantienen en la tabla activa")
+    p.set_defaults(func=cmd_archivar)
+
+    sub.add_parser('compras', help="Lista de compras de costo mínimo para los pedidos abiertos").set_defaults(func=cmd_compras)
+
+    p = sub.add_parser('pronostico', help="Unidades esperadas por variación para los próximos días")
+    p.add_argument('--dias', type=int, default=14)
+    p.set_defaults(func=cmd_pronostico)
+
+    sub.add_parser('recostear', help="Recalcula el costo de todas las recetas").set_defaults(func=cmd_recostear)
+    p = sub.add_parser('costos', help="Costo de cada variación con los costos de insumos de una fecha, contra hoy")
+    p.add_argument('--fecha', required=True, help="AAAA-MM-DD")
+    p.set_defaults(func=cmd_costos)
+    sub.add_parser('saldos', help="Reconstruye los saldos mensuales del dashboard").set_defaults(func=cmd_saldos)
+
+    p = sub.add_parser('exportar', help="Exporta una tabla a CSV")
+    p.add_argument('tabla')
+    p.add_argument('--salida')
+    p.add_argument('--columnas', default="*")
+    p.set_defaults(func=cmd_exportar)
+
+    p = sub.add_parser('respaldar', help="Respalda las tablas en Parquet comprimido")
+    p.add_argument('--motivo', default="manual")
+    p.add_argument('--tablas', nargs='+', help="solo estas tablas")
+    p.set_defaults(func=cmd_respaldar)
+
+    p = sub.add_parser('respaldos', help="Lista los respaldos")
+    p.add_argument('--verificar', action='store_true', help="verificar checksums")
+    p.set_defaults(func=cmd_respaldos)
+
+    p = sub.add_parser('restaurar', help="Restaura un respaldo (antes respalda lo actual)")
+    p.add_argument('carpeta')
+    p.add_argument('--tablas', nargs='+', help="solo estas tablas")
+    p.set_defaults(func=cmd_restaurar)
+
+    sub.add_parser('reclasificar-gastos', help="Traspasa la tabla 'gastos' al libro").set_defaults(func=cmd_reclasificar_gastos)
+    sub.add_parser('migrar-clientes', help="Crea clientes desde los pedidos antiguos").set_defaults(func=cmd_migrar_clientes)
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    try:
+        return args.func(cliente_desde_entorno(), args) or 0
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Directorio de clientes: uno por teléfono normalizado, con acceso rápido a su último pedido."""
+import re
+
+import archivo
+from conexion import leer_paginado, tabla_inexistente
+
+# Columnas del pedido que se copian al repetirlo
+COLUMNAS_REPETIR = "id, variacion_id, cantidad, precio_unitario_final, notas"
+
+
+def normalizar_telefono(telefono):
+    """Deja solo dígitos y unifica los celulares chilenos como +569XXXXXXXX. '' si no hay número."""
+    digitos = re.sub(r'\D', '', str(telefono or ''))
+    if len(digitos) == 11 and digitos.startswith('56'): digitos = digitos[2:]
+    if len(digitos) == 8: digitos = '9' + digitos          # número antiguo sin el 9 inicial
+    if len(digitos) == 9: return '+56' + digitos
+    return digitos
+
+
+def etiqueta(cliente):
+    return f"{cliente['nombre']} · {cliente['telefono']}"
+
+
+def registrar(db, nombre, telefono):
+    """Crea o actualiza el cliente del teléfono y devuelve su id (None si no hay teléfono válido)."""
+    tel = normalizar_telefono(telefono)
+    if not tel or not nombre: return None
+    fila = db.table('clientes').upsert({"nombre": nombre.strip(), "telefono": tel}, on_conflict='telefono').execute().data
+    return fila[0]['id'] if fila else None
+
+
+def ultimo_pedido(db, cliente_id):
+    """Último pedido del cliente (usa el índice por cliente_id, id desc); si no hay, lo busca en el archivo."""
+    filas = db.table('pedidos').select(COLUMNAS_REPETIR).eq('cliente_id', cliente_id) \
+        .order('id', desc=True).limit(1).execute().data
+    return filas[0] if filas else archivo.ultimo_de_cliente(db, cliente_id, COLUMNAS_REPETIR)
+
+
+def migrar_clientes(db, lote=500):
+    """Crea los clientes a partir del texto libre de los pedidos antiguos y los enlaza.
+
+    Recorre `pedidos` y también `pedidos_historicos` (si existe), página por página; los
+    pedidos archivados quedan enlazados en el archivo. El nombre que queda es el del pedido
+    más reciente de cada teléfono. Se puede repetir.
+    """
+    pedidos = []
+    for tabla in ('pedidos', 'pedidos_historicos'):
+        try:
+            pedidos += [{**p, "tabla": tabla}
+                        for p in leer_paginado(db, tabla, "id, cliente_nombre, cliente_contacto, cliente_id")]
+        except Exception as e:
+            # Sin archivo todavía (ver sql/archivo.sql)
+            if tabla == 'pedidos' or not tabla_inexistente(e): raise
+    pedidos.sort(key=lambda p: p['id'])
+    por_tel = {}
+    for p in pedidos:
+        tel = normalizar_telefono(p.get('cliente_contacto'))
+        if tel and p.get('cliente_nombre'):
+            por_tel.setdefault(tel, {"pedidos": [], "nombre": None})
+            por_tel[tel]["pedidos"].append(p)
+            por_tel[tel]["nombre"] = p['cliente_nombre'].strip()
+    filas = [{"nombre": d["nombre"], "telefono": tel} for tel, d in por_tel.items()]
+    ids_cliente = {}
+    for i in range(0, len(filas), lote):
+        for c in db.table('clientes').upsert(filas[i:i + lote], on_conflict='telefono').execute().data:
+            ids_cliente[c['telefono']] = c['id']
+    enlazados = 0
+    for tel, d in por_tel.items():
+        if tel not in ids_cliente: continue
+        for tabla in ('pedidos', 'pedidos_historicos'):
+            ids = [p['id'] for p in d["pedidos"] if p['tabla'] == tabla and not p.get('cliente_id')]
+            for i in range(0, len(ids), lote):
+                db.table(tabla).update({"cliente_id": ids_cliente[tel]}).in_('id', ids[i:i + lote]).execute()
+            enlazados += len(ids)
+    return len(filas), enlazados
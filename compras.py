@@ -0,0 +1,172 @@
+"""Envases de compra por insumo y lista de compras de costo mínimo.
+
+Cada compra o actualización de precio guarda el envase (contenido y precio) en
+`envases_insumo`, uno por insumo y tamaño (sql/compras.sql). La lista de compras toma lo
+que piden los pedidos abiertos (más las entregas que la liquidación todavía no descontó),
+le resta el stock y elige para cada insumo la combinación de envases más barata que cubre
+el faltante, para toda la lista a la vez con NumPy.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import liquidacion
+
+ESTADOS_ABIERTOS = ['Pendiente', 'En Horno', 'Listo']
+MAX_ENVASES = 4       # tamaños por insumo que entran a la optimización (los de mejor precio por unidad)
+ESCALA = 1000         # resolución: milésimas de la unidad base
+MAX_PASOS = 10000     # pasos de la programación dinámica por fila
+
+
+def guardar_envase(db, insumo_id, contenido, precio, cantidad_envase=None, unidad_envase=None):
+    """Guarda (o actualiza el precio de) un envase. `contenido` va en la unidad base del insumo."""
+    if not contenido or contenido <= 0 or not precio or precio <= 0: return None
+    return db.table('envases_insumo').upsert({
+        "insumo_id": insumo_id, "contenido": round(float(contenido), 6), "precio": float(precio),
+        "cantidad_envase": cantidad_envase, "unidad_envase": unidad_envase,
+        "actualizado_en": datetime.now().isoformat(),
+    }, on_conflict='insumo_id,contenido').execute().data
+
+
+def envases(db):
+    return pd.DataFrame(db.table('envases_insumo').select("id, insumo_id, contenido, precio, cantidad_envase, unidad_envase")
+                        .execute().data, columns=['id', 'insumo_id', 'contenido', 'precio', 'cantidad_envase', 'unidad_envase'])
+
+
+def faltantes(db):
+    """Insumos cuyo stock no alcanza para los pedidos abiertos: insumo_id, nombre, unidad, requerido, stock, faltante."""
+    cols = liquidacion.COLUMNAS_PEDIDO
+    abiertos = db.table('pedidos').select(cols).in_('estado', ESTADOS_ABIERTOS).execute().data
+    # Entregados sin liquidar: ya salieron de la cocina pero el stock aún no los descuenta
+    sin_liquidar, _ = liquidacion.pendientes(db)
+    neto, insumos = liquidacion.consumo(db, abiertos + sin_liquidar)
+    df = neto.rename(columns={'cantidad': 'requerido'}).merge(
+        insumos[['id', 'unidad_medida', 'stock_actual', 'costo_unitario']].rename(columns={'id': 'insumo_id'}), on='insumo_id')
+    df['stock'] = df['stock_actual'].astype(float).clip(lower=0)
+    df['faltante'] = (df['requerido'] - df['stock']).clip(lower=0)
+    df = df[df['faltante'] > 1e-9].rename(columns={'unidad_medida': 'unidad'})
+    return df[['insumo_id', 'nombre', 'unidad', 'requerido', 'stock', 'faltante', 'costo_unitario']].reset_index(drop=True)
+
+
+def _matrices(ids, env):
+    """Tamaños y precios (insumos × MAX_ENVASES), NaN donde no hay envase; los de mejor precio por unidad primero."""
+    n = len(ids)
+    tam = np.full((n, MAX_ENVASES), np.nan)
+    pre = np.full((n, MAX_ENVASES), np.nan)
+    if env.empty: return tam, pre
+    env = env.assign(por_unidad=env['precio'] / env['contenido']).sort_values(['insumo_id', 'por_unidad'])
+    env = env.assign(col=env.groupby('insumo_id').cumcount())
+    env = env[env['col'] < MAX_ENVASES]
+    fila = pd.Index(ids).get_indexer(env['insumo_id'])
+    ok = fila >= 0
+    tam[fila[ok], env['col'].to_numpy()[ok]] = env['contenido'].to_numpy(dtype=float)[ok]
+    pre[fila[ok], env['col'].to_numpy()[ok]] = env['precio'].to_numpy(dtype=float)[ok]
+    return tam, pre
+
+
+def optimizar(necesidad, tamanos, precios, max_pasos=MAX_PASOS):
+    """Combinación de envases (enteros) más barata que cubre `necesidad` en cada fila.
+
+    Programación dinámica de mochila sin límite sobre la cantidad discretizada, avanzando
+    todas las filas juntas: costo[q] = min_j costo[q - tamaño_j] + precio_j. La unidad de cada
+    fila es el MCD de sus tamaños (en milésimas de la unidad base); si eso da más de
+    `max_pasos` pasos se usa una unidad más gruesa y los tamaños se redondean hacia abajo,
+    así lo comprado nunca queda bajo la necesidad (a lo más se paga un poco de más).
+    `tamanos`/`precios`: (filas × K), NaN donde no hay envase.
+    Devuelve (conteos filas × K, costo por fila; NaN si la fila no tiene envases).
+    """
+    necesidad = np.maximum(np.asarray(necesidad, dtype=float), 0)
+    n, k = tamanos.shape
+    if not n: return np.zeros((0, k)), np.zeros(0)
+    milesimas = np.round(np.nan_to_num(tamanos) * ESCALA).astype(np.int64)
+    validos = (milesimas > 0) & ~np.isnan(precios)
+    milesimas = np.where(validos, milesimas, 0)
+    paso = np.gcd.reduce(milesimas, axis=1)
+    sin_envase = paso == 0
+    paso[sin_envase] = 1
+    req_m = np.ceil(necesidad * ESCALA - 1e-6).astype(np.int64)
+    # Si la necesidad no cabe en `max_pasos` pasos, lo que sobra va entero en el envase de
+    # mejor precio por unidad y la DP decide el resto (al menos dos envases grandes)
+    barato = np.argmin(np.where(validos, precios / np.where(validos, tamanos, 1), np.inf), axis=1)
+    t_mejor = np.maximum(milesimas[np.arange(n), barato], 1)
+    resto = np.maximum(max_pasos * paso - milesimas.max(axis=1), 2 * milesimas.max(axis=1))
+    base = np.maximum((req_m - resto) // t_mejor, 0) * ~sin_envase
+    req_m = req_m - base * t_mejor
+    alcance = req_m + milesimas.max(axis=1)
+    paso = np.maximum(paso, -(-alcance // max_pasos))
+    u = milesimas // paso[:, None]
+    validos &= u > 0
+    req = -(-req_m // paso)
+    tope = np.where(sin_envase, 0, req + np.where(validos, u, 0).max(axis=1))
+    q_max = int(tope.max()) if n else 0
+
+    filas = np.arange(n)
+    p = np.where(validos, precios, np.inf)
+    # Tabla de costos por fila, una a continuación de otra (cada fila mide lo que necesita).
+    # Las filas van de mayor a menor `tope`: en cada q solo se avanza el prefijo que lo alcanza.
+    orden = np.argsort(-tope, kind='stable')
+    tope_o, u_o, val_o, p_o = tope[orden], u[orden], validos[orden], p[orden]
+    inicio = np.concatenate([[0], np.cumsum(tope_o + 1)[:-1]]).astype(np.int64)
+    costo = np.full(int((tope_o + 1).sum()), np.inf)
+    costo[inicio] = 0
+    eleccion = np.full(len(costo), -1, dtype=np.int8)
+    for q in range(1, q_max + 1):
+        m = int(np.searchsorted(-tope_o, -q, side='right'))
+        ini, pos = inicio[:m], inicio[:m] + q
+        previo = q - u_o[:m]
+        cand = np.where(val_o[:m] & (previo >= 0), costo[ini[:, None] + np.maximum(previo, 0)] + p_o[:m], np.inf)
+        j = np.argmin(cand, axis=1)
+        costo[pos] = cand[np.arange(m), j]
+        eleccion[pos] = j
+
+    # La compra más barata con cantidad entre la necesidad y necesidad + el envase más grande
+    fila = np.repeat(np.arange(n), tope_o + 1)
+    q_fila = np.arange(len(costo)) - inicio[fila]
+    en_rango = np.where(q_fila >= req[orden][fila], costo, np.inf)
+    minimo = np.minimum.reduceat(en_rango, inicio)
+    primero = np.flatnonzero(en_rango == minimo[fila])
+    _, cual = np.unique(fila[primero], return_index=True)
+    q_fin_o = np.zeros(n, dtype=np.int64)
+    q_fin_o[fila[primero[cual]]] = q_fila[primero[cual]]
+    q_fin = np.empty(n, dtype=np.int64)
+    q_fin[orden] = q_fin_o
+    total = np.empty(n)
+    total[orden] = minimo
+
+    conteos = np.zeros((n, k))
+    conteos[filas, barato] = base
+    total = total + base * np.where(sin_envase, 0, p[filas, barato])
+    q = np.where(np.isfinite(total), q_fin, 0)
+    pos_fila = np.empty(n, dtype=np.int64)
+    pos_fila[orden] = inicio
+    while (q > 0).any():
+        activas = np.nonzero(q > 0)[0]
+        j = eleccion[pos_fila[activas] + q[activas]]
+        conteos[activas, j] += 1
+        q[activas] -= u[activas, j]
+    return conteos, np.where(sin_envase | ~np.isfinite(total), np.nan, total)
+
+
+def lista_compras(falt, env):
+    """Lista de compras: una fila por insumo y tamaño de envase a comprar.
+
+    Los insumos sin envases registrados salen con el faltante a granel y un costo estimado
+    con su costo unitario. Devuelve (DataFrame, gasto total).
+    """
+    ids = falt['insumo_id'].to_numpy()
+    tam, pre = _matrices(ids, env)
+    conteos, costos = optimizar(falt['faltante'].to_numpy(dtype=float), tam, pre)
+    filas = []
+    for i, f in enumerate(falt.itertuples(index=False)):
+        if np.isnan(costos[i]):
+            filas.append({"insumo": f.nombre, "faltante": f.faltante, "envase": f"a granel ({f.unidad})",
+                          "cantidad": f.faltante, "comprado": f.faltante, "costo": f.faltante * (f.costo_unitario or 0),
+                          "estimado": True})
+            continue
+        for j in np.nonzero(conteos[i])[0]:
+            filas.append({"insumo": f.nombre, "faltante": f.faltante, "envase": f"{tam[i, j]:g} {f.unidad}",
+                          "cantidad": int(conteos[i, j]), "comprado": conteos[i, j] * tam[i, j],
+                          "costo": conteos[i, j] * pre[i, j], "estimado": False})
+    df = pd.DataFrame(filas, columns=['insumo', 'faltante', 'envase', 'cantidad', 'comprado', 'costo', 'estimado'])
+    return df, float(df['costo'].sum())
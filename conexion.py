@@ -0,0 +1,248 @@
+"""Cliente Supabase resiliente: timeouts por consulta, reintentos y circuit breaker.
+
+El timeout de cada consulta lo impone el cliente HTTP (`crear_cliente`): así una consulta
+lenta termina con error en su propio hilo en vez de quedar colgada ocupando un hilo de un pool.
+No depende de Streamlit, así que sirve tanto para la app como para tareas programadas.
+"""
+import os
+import random
+import threading
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+
+# --- PARÁMETROS POR DEFECTO ---
+TIMEOUT_CONSULTA = 8       # segundos máximos por consulta (timeout HTTP)
+REINTENTOS = 2             # reintentos extra para lecturas (idempotentes)
+BACKOFF_BASE = 0.25        # segundos, se duplica en cada intento
+BACKOFF_MAX = 2.0
+UMBRAL_FALLOS = 3          # fallos seguidos para abrir el circuito
+ENFRIAMIENTO = 30          # segundos con el circuito abierto antes de probar de nuevo
+MAX_LECTURAS_PARALELAS = 4  # lecturas simultáneas por sección
+SIN_TABLA = ('PGRST205', '42P01')  # PostgREST / Postgres: la tabla no existe en el esquema
+PAGINA = 1000              # filas por página (PostgREST corta las respuestas en max-rows)
+
+
+class CircuitoAbierto(Exception):
+    """El backend se considera caído y no se intenta la consulta."""
+
+
+def tabla_inexistente(error):
+    """True si `error` dice que la tabla no existe (p. ej. sin aplicar todavía un script de sql/)."""
+    return getattr(error, 'code', None) in SIN_TABLA or 'does not exist' in str(error)
+
+
+def paginas(db, tabla, columnas="*", filtro=None, orden=('id',), pagina=PAGINA):
+    """Páginas (listas de filas) de `tabla` con `filtro(builder)` aplicado, en el orden de `orden`.
+
+    Ordenando solo por `id` (y con `id` entre las columnas) pagina por clave (id > último),
+    sin OFFSET; con otro orden usa `range`.
+    """
+    orden = (orden,) if isinstance(orden, str) else tuple(orden)
+    cols = [c.strip() for c in columnas.split(',')]
+    por_id = orden == ('id',) and (cols == ['*'] or 'id' in cols)
+    ultimo, desde = None, 0
+    while True:
+        q = db.table(tabla).select(columnas)
+        if filtro: q = filtro(q)
+        if por_id:
+            if ultimo is not None: q = q.gt('id', ultimo)
+            q = q.order('id').limit(pagina)
+        else:
+            for c in orden: q = q.order(c)
+            q = q.range(desde, desde + pagina - 1)
+        filas = q.execute().data
+        if filas: yield filas
+        if len(filas) < pagina: return
+        if por_id: ultimo = filas[-1]['id']
+        desde += pagina
+
+
+def leer_paginado(db, tabla, columnas="*", pagina=PAGINA, orden='id', filtro=None):
+    """Itera las filas de `tabla` página por página (memoria acotada). Ver `paginas`."""
+    for filas in paginas(db, tabla, columnas, filtro, orden, pagina):
+        yield from filas
+
+
+class Resultado:
+    """Datos de una lectura. Si `obsoleto` es True vienen del último dato bueno en memoria."""
+
+    def __init__(self, data, obsoleto=False, error=None, guardado_en=None):
+        self.data = data
+        self.obsoleto = obsoleto
+        self.error = error
+        self.guardado_en = guardado_en
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class Circuito:
+    """Circuit breaker clásico: cerrado → abierto tras N fallos → semiabierto tras enfriar."""
+
+    def __init__(self, umbral=UMBRAL_FALLOS, enfriamiento=ENFRIAMIENTO):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self.fallos = 0
+        self.abierto_desde = None
+        self._probando = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        if self.abierto_desde is None: return "cerrado"
+        if time.monotonic() - self.abierto_desde >= self.enfriamiento: return "semiabierto"
+        return "abierto"
+
+    def permite(self):
+        with self._lock:
+            estado = self.estado
+            if estado == "cerrado": return True
+            if estado == "semiabierto" and not self._probando:
+                # Solo una consulta de prueba a la vez mientras está semiabierto
+                self._probando = True
+                return True
+            return False
+
+    def exito(self):
+        with self._lock:
+            self.fallos = 0
+            self.abierto_desde = None
+            self._probando = False
+
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self._probando or self.fallos >= self.umbral:
+                self.abierto_desde = time.monotonic()
+            self._probando = False
+
+
+class ClienteResiliente:
+    """Envuelve el cliente de Supabase.
+
+    Las escrituras (`table`, `rpc`) pasan directo al cliente original. Las lecturas se
+    hacen con `leer()`, que aplica timeout, reintentos con backoff y circuit breaker, y
+    cuando el backend no responde devuelve el último resultado bueno marcado como obsoleto.
+    """
+
+    def __init__(self, cliente, timeout=TIMEOUT_CONSULTA, reintentos=REINTENTOS, circuito=None):
+        self.cliente = cliente
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.circuito = circuito or Circuito()
+        self._ultimo_bueno = {}
+        self._lock = threading.Lock()
+        self._pool_lecturas = ThreadPoolExecutor(max_workers=MAX_LECTURAS_PARALELAS, thread_name_prefix="lecturas")
+
+    def table(self, nombre):
+        return self.cliente.table(nombre)
+
+    def rpc(self, funcion, params=None):
+        return self.cliente.rpc(funcion, params or {})
+
+    def _ejecutar(self, tabla, consulta):
+        query = self.cliente.table(tabla)
+        query = consulta(query) if consulta else query.select("*")
+        return query.execute().data
+
+    def _espera(self, intento):
+        # Backoff exponencial con "full jitter" para no sincronizar reintentos entre sesiones
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** intento)))
+
+    def _respaldo(self, clave, error, respaldo):
+        if respaldo:
+            with self._lock:
+                guardado = self._ultimo_bueno.get(clave)
+            if guardado:
+                data, ts = guardado
+                return Resultado(data, obsoleto=True, error=error, guardado_en=ts)
+        return Resultado([], error=error)
+
+    def leer(self, tabla, consulta=None, clave=None, respaldo=True, limite=None):
+        """Lee `tabla` aplicando `consulta(builder)` (por defecto `select("*")`).
+
+        `clave` identifica la consulta en la caché de último dato bueno; debe cambiar si
+        cambian los filtros. Con `respaldo=False` nunca se sirven datos guardados.
+        `limite` es un instante (time.monotonic) después del cual no se empieza otro intento;
+        cada intento dura a lo más el timeout HTTP del cliente.
+        """
+        clave = clave or tabla
+        if not self.circuito.permite():
+            return self._respaldo(clave, CircuitoAbierto(f"Backend no disponible ({tabla})"), respaldo)
+
+        error = None
+        for intento in range(self.reintentos + 1):
+            if limite is not None and limite <= time.monotonic():
+                error = error or TimeoutError(f"Sin tiempo para leer '{tabla}'")
+                break
+            try:
+                data = self._ejecutar(tabla, consulta)
+            except Exception as e:
+                error = e
+                if intento < self.reintentos:
+                    espera = self._espera(intento)
+                    if limite is not None: espera = min(espera, max(0, limite - time.monotonic()))
+                    time.sleep(espera)
+                continue
+            self.circuito.exito()
+            if respaldo:
+                with self._lock:
+                    self._ultimo_bueno[clave] = (data, time.time())
+            return Resultado(data)
+
+        self.circuito.fallo()
+        return self._respaldo(clave, error, respaldo)
+
+    def leer_varios(self, consultas, timeout=None):
+        """Ejecuta en paralelo varias lecturas independientes con un plazo común.
+
+        `consultas` es un dict `{nombre: (tabla, consulta, clave)}` (consulta y clave pueden
+        omitirse). Devuelve `{nombre: Resultado}`; la página tarda lo que la lectura más lenta,
+        que no empieza intentos pasado el plazo y corta cada uno con el timeout HTTP.
+        """
+        limite = time.monotonic() + (timeout or self.timeout)
+        specs = {}
+        for nombre, spec in consultas.items():
+            if isinstance(spec, str): spec = (spec,)
+            tabla, consulta, clave = (tuple(spec) + (None, None))[:3]
+            specs[nombre] = (tabla, consulta, clave or nombre)
+
+        futuros = {
+            nombre: self._pool_lecturas.submit(self.leer, tabla, consulta, clave=clave, limite=limite)
+            for nombre, (tabla, consulta, clave) in specs.items()
+        }
+        return {nombre: fut.result() for nombre, fut in futuros.items()}
+
+
+def crear_cliente(url, key, timeout=TIMEOUT_CONSULTA):
+    """Crea el cliente de Supabase con timeout HTTP y lo envuelve en `ClienteResiliente`."""
+    import httpx
+    from supabase import ClientOptions, create_client
+    cliente = create_client(url, key, options=ClientOptions(postgrest_client_timeout=httpx.Timeout(timeout)))
+    return ClienteResiliente(cliente, timeout=timeout)
+
+
+def backend_local_activo():
+    return os.environ.get('ERP_BACKEND', '').lower() == 'local'
+
+
+def crear_cliente_local(datos=None):
+    """Cliente contra el backend en memoria (`backend_local.py`), con los datos de demostración por defecto."""
+    from backend_local import BackendLocal, datos_demo
+    return ClienteResiliente(BackendLocal(datos_demo() if datos is None else datos))
+
+
+def cliente_desde_entorno(ruta_secrets='.streamlit/secrets.toml'):
+    """Cliente para tareas fuera de Streamlit: usa SUPABASE_URL / SUPABASE_KEY o el secrets.toml de la app.
+
+    Con ERP_BACKEND=local usa el backend en memoria.
+    """
+    if backend_local_activo(): return crear_cliente_local()
+    url, key = os.environ.get('SUPABASE_URL'), os.environ.get('SUPABASE_KEY')
+    if not (url and key):
+        with open(ruta_secrets, 'rb') as f:
+            conf = tomllib.load(f)['supabase']
+        url, key = conf['url'], conf['key']
+    return crear_cliente(url, key)
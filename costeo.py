@@ -0,0 +1,44 @@
+"""Motor de costeo de insumos: promedio ponderado móvil con capas FIFO opcionales.
+
+`costo_unitario` de `insumos` pasa a ser el costo mantenido (valor del stock / cantidad),
+no el precio de la última compra, que queda en `ultimo_precio`.
+"""
+import numpy as np
+
+from unidades import convertir
+
+METODOS = ('promedio', 'fifo')
+
+
+# --- PERSISTENCIA ---
+# Stock, lotes y costo mantenido se calculan en la base sobre la fila bloqueada (sql/costeo.sql):
+# el cliente solo manda cantidades, así dos escrituras al mismo tiempo no se pisan.
+
+def registrar_compra(db, insumo_id, cantidad, costo_total, fecha=None):
+    """Ingresa una compra: guarda el lote, suma el stock y devuelve el costo mantenido nuevo."""
+    return db.rpc('registrar_compra', {"p_insumo_id": insumo_id, "p_cantidad": cantidad, "p_costo_total": costo_total,
+                                       "p_fecha": fecha}).execute().data
+
+
+def ajustar_stock(db, insumo_id, cantidad, fijar=False, metodo='promedio'):
+    """Ajuste manual: suma `cantidad` (o fija el stock en ella) moviendo también los lotes.
+
+    Devuelve el stock nuevo.
+    """
+    if metodo not in METODOS: raise ValueError(f"Método de costeo desconocido: {metodo}")
+    return db.rpc('ajustar_stock', {"p_insumo_id": insumo_id, "p_cantidad": cantidad,
+                                    "p_fijar": fijar, "p_metodo": metodo}).execute().data
+
+
+def costo_lineas(lineas, insumos):
+    """Costo de cada línea de receta ({nombre, cantidad, unidad}) al costo actual del insumo.
+
+    `insumos`: {nombre: fila con unidad_medida y costo_unitario}. Devuelve un arreglo con
+    NaN donde el insumo ya no existe y 0 donde la unidad no es convertible.
+    """
+    filas = [insumos.get(l['nombre']) for l in lineas]
+    cantidades = convertir([l['cantidad'] for l in lineas], [l['unidad'] for l in lineas],
+                           [f['unidad_medida'] if f else '' for f in filas])
+    costos = np.array([f['costo_unitario'] if f else np.nan for f in filas], dtype=float)
+    return np.nan_to_num(cantidades) * costos
+
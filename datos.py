@@ -0,0 +1,103 @@
+"""Carga tipada y proyectada de tablas.
+
+Cada pantalla declara en `VISTAS` solo las columnas que usa; el resultado se arma como
+DataFrame columna a columna desde arreglos NumPy, con tipos compactos (categorías para
+estados y unidades, float para montos, datetime para fechas) en vez de `object`.
+"""
+import numpy as np
+import pandas as pd
+
+# Tipo de cada columna conocida: int, float, cat, str, fecha, bool
+ESQUEMA = {
+    'insumos': {
+        'id': 'int', 'nombre': 'str', 'unidad_medida': 'cat', 'stock_actual': 'float',
+        'costo_unitario': 'float', 'ultimo_precio': 'float',
+    },
+    'productos': {'id': 'int', 'nombre': 'str', 'categoria': 'cat', 'imagen_url': 'str'},
+    'variaciones': {
+        'id': 'int', 'producto_id': 'int', 'nombre': 'str', 'precio': 'float',
+        'ingredientes_json': 'str', 'rendimiento': 'float',
+    },
+    'pedidos': {
+        'id': 'int', 'cliente_nombre': 'str', 'cliente_contacto': 'str', 'fecha_entrega': 'fecha',
+        'hora_entrega': 'str', 'variacion_id': 'int', 'nombre_producto_snapshot': 'str',
+        'cantidad': 'int', 'precio_unitario_final': 'float', 'total_pedido': 'float',
+        'estado': 'cat', 'notas': 'str', 'detalle_json': 'str', 'cliente_id': 'int', 'version': 'int',
+    },
+    'clientes': {'id': 'int', 'nombre': 'str', 'telefono': 'str'},
+    'usuarios': {'nombre': 'str', 'username': 'str', 'rol': 'cat'},
+    'saldos_cuenta': {'cuenta': 'cat', 'mes': 'str', 'debe': 'float', 'haber': 'float'},
+}
+
+# Vistas por pantalla: nombre -> (tabla, columnas, orden)
+VISTAS = {
+    'dashboard.saldos': ('saldos_cuenta', ['cuenta', 'mes', 'debe', 'haber'], None),
+    'pedidos.productos': ('productos', ['id', 'nombre'], 'nombre'),
+    'pedidos.variaciones': ('variaciones', ['id', 'producto_id', 'nombre', 'precio'], None),
+    'pedidos.clientes': ('clientes', ['id', 'nombre', 'telefono'], 'nombre'),
+    'pedidos.kanban': ('pedidos', ['id', 'fecha_entrega', 'cliente_nombre', 'nombre_producto_snapshot',
+                                   'cantidad', 'total_pedido', 'estado', 'notas', 'version'], 'fecha_entrega'),
+    'productos.insumos': ('insumos', ['id', 'nombre', 'unidad_medida', 'costo_unitario'], 'nombre'),
+    'productos.productos': ('productos', ['id', 'nombre', 'categoria', 'imagen_url'], 'nombre'),
+    'productos.variaciones': ('variaciones', ['id', 'producto_id', 'nombre', 'precio',
+                                              'ingredientes_json', 'rendimiento'], 'nombre'),
+    'inventario.insumos': ('insumos', ['id', 'nombre', 'unidad_medida', 'stock_actual',
+                                       'costo_unitario', 'ultimo_precio'], 'nombre'),
+    'config.usuarios': ('usuarios', ['nombre', 'username', 'rol'], None),
+}
+
+
+def seleccion(vista):
+    """Texto para `select()` con las columnas de la vista."""
+    return ", ".join(VISTAS[vista][1])
+
+
+def consulta(vista, filtro=None):
+    """Función para `ClienteResiliente.leer` que proyecta, filtra y ordena según la vista."""
+    _, _, orden = VISTAS[vista]
+    def aplicar(q):
+        q = q.select(seleccion(vista))
+        if filtro: q = filtro(q)
+        return q.order(orden) if orden else q
+    return aplicar
+
+
+def _columna(filas, col, tipo):
+    n = len(filas)
+    if tipo == 'float':
+        return np.fromiter((np.nan if f.get(col) is None else f[col] for f in filas), dtype=np.float64, count=n)
+    if tipo == 'int':
+        valores = [f.get(col) for f in filas]
+        if any(v is None for v in valores): return pd.array(valores, dtype='Int64')
+        return np.fromiter(valores, dtype=np.int64, count=n)
+    if tipo == 'bool':
+        return np.fromiter((bool(f.get(col)) for f in filas), dtype=bool, count=n)
+    if tipo == 'cat':
+        return pd.Categorical([f.get(col) for f in filas])
+    if tipo == 'fecha':
+        return pd.to_datetime(pd.Series([f.get(col) for f in filas], dtype=object), errors='coerce').to_numpy()
+    return np.array([f.get(col) for f in filas], dtype=object)
+
+
+def a_frame(filas, tabla, columnas):
+    """Arma un DataFrame tipado desde las filas (lista de dicts) de `tabla`."""
+    tipos = ESQUEMA.get(tabla, {})
+    filas = filas or []
+    return pd.DataFrame({c: _columna(filas, c, tipos.get(c, 'str')) for c in columnas})
+
+
+def frame_vista(filas, vista):
+    tabla, columnas, _ = VISTAS[vista]
+    return a_frame(filas, tabla, columnas)
+
+
+def registros(df):
+    """Filas del frame como dicts con tipos nativos de Python (listos para JSON/Supabase)."""
+    out = df.copy()
+    for c in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[c]):
+            out[c] = out[c].dt.strftime('%Y-%m-%d')
+        if isinstance(out[c].dtype, pd.CategoricalDtype) or str(out[c].dtype) == 'Int64':
+            out[c] = out[c].astype(object)
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict('records')
@@ -1,13 +1,33 @@
 import streamlit as st
-try:
-    from supabase import create_client, Client
-except ImportError:
-    from supabase import create_client
 import pandas as pd
 import time
 import json 
 import altair as alt
 from datetime import datetime
+from conexion import crear_cliente, crear_cliente_local, backend_local_activo
+import unidades
+from unidades import convertir_uno
+import lista_precios
+import costeo
+import libro
+import clientes
+import servicios
+import liquidacion
+import escenarios
+import pronostico
+import precios
+import graficos
+import grillas
+import respaldos
+import archivo
+import compras
+import datos
+from datos import registros
+from imagenes import CacheMiniaturas
+from busqueda import IndiceBusqueda
+from versiones import CacheVersionada
+import perfil
+from collections import deque
 
 # --- CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(
@@ -61,10 +81,12 @@ st.markdown("""
 # --- CONEXIÓN A SUPABASE ---
 @st.cache_resource
 def init_connection():
+    # ERP_BACKEND=local: base en memoria con datos de demostración (pruebas de carga, demos sin red)
+    if backend_local_activo(): return crear_cliente_local()
     try:
         url = st.secrets["supabase"]["url"]
         key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
+        return crear_cliente(url, key)
     except Exception as e:
         # ¡ESTO MOSTRARÁ LA CAUSA REAL DEL FALLO EN LA PANTALLA!
         st.error(f"¡ERROR FATAL DE CONEXIÓN! Detalle: {e}") 
@@ -72,6 +94,55 @@ def init_connection():
 
 supabase = init_connection()
 
+# Método de costeo de insumos: "promedio" (ponderado móvil) o "fifo"
+try: METODO_COSTEO = st.secrets.get("costeo", {}).get("metodo", "promedio")
+except Exception: METODO_COSTEO = "promedio"
+
+# --- IMÁGENES (MINIATURAS EN CACHÉ LOCAL) ---
+LOGO_URL = "https://i.postimg.cc/fy8vC6RP/172582480-314301286701036-2832058173383995414-n-waifu2x-art-noise1-scale.png"
+
+@st.cache_resource
+def init_miniaturas():
+    return CacheMiniaturas()
+
+def miniatura(origen, ancho):
+    """Miniatura local para `st.image` (el doble del ancho mostrado, por pantallas retina). Si falla, la URL original."""
+    return init_miniaturas().miniatura(origen, ancho * 2) or origen
+
+# --- PRONÓSTICO DE DEMANDA (modelo compartido, se pone al día solo) ---
+@st.cache_resource
+def init_pronostico():
+    return pronostico.Pronosticador()
+
+# --- GRÁFICOS (series agregadas, ver graficos.py) ---
+@st.cache_resource
+def init_graficos():
+    return graficos.CacheGraficos()
+
+# --- BUSCADORES ---
+@st.cache_resource
+def init_indices():
+    return {}
+
+def indice_busqueda(nombre, opciones):
+    """Índice compartido entre sesiones; al cambiar la tabla solo se reindexa lo que cambió.
+
+    `opciones` es una lista de nombres o un dict {clave: etiqueta}.
+    """
+    indice = init_indices().setdefault(nombre, IndiceBusqueda())
+    indice.actualizar(opciones if isinstance(opciones, dict) else {o: o for o in opciones})
+    return indice
+
+def selector_busqueda(label, nombre_indice, opciones, key, limite=25, on_change=None):
+    """Buscador + lista corta: al navegador solo viajan las mejores coincidencias."""
+    indice = indice_busqueda(nombre_indice, opciones)
+    texto = st.text_input(label, key=f"{key}_q", placeholder="🔎 Escribe para buscar (sin tildes, con errores)...")
+    resultados = indice.buscar(texto, limite)
+    if texto and not resultados: st.caption("Sin coincidencias.")
+    return st.selectbox(label, resultados, index=0 if texto and len(resultados) == 1 else None, key=key,
+                        label_visibility="collapsed", placeholder="Elige de la lista...",
+                        format_func=indice.etiqueta, on_change=on_change)
+
 # --- GESTIÓN DE SESIÓN ---
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
@@ -80,110 +151,248 @@ if 'usuario_actual' not in st.session_state:
 if 'rol_actual' not in st.session_state:
     st.session_state.rol_actual = None
 
-# --- LÓGICA DE NEGOCIO ---
+# --- PERFILADOR (opcional: ⚙️ Configuración o ?perfil=1 / ?perfil=muestreo en la URL) ---
+HISTORIAL_PERFIL = 20
+
+def modo_perfil():
+    q = st.query_params.get('perfil')
+    if q: return 'muestreo' if q == 'muestreo' else 'secciones'
+    return st.session_state.get('perfil_modo')
+
+def perfilador():
+    return st.session_state.get('_perfilador', perfil.NULO)
+
+def seccion(nombre):
+    """Bloque medido por el perfilador (no hace nada si está apagado)."""
+    return perfilador().seccion(nombre)
+
+# --- CACHÉ DE LECTURAS (se invalida por versión de tabla, ver versiones.py) ---
+@st.cache_resource
+def init_cache_lecturas():
+    return CacheVersionada()
+
+# Versiones de las tablas en este rerun (se leen una vez, en el arranque)
+VERSIONES = None
+
+# --- LECTURAS RESILIENTES ---
+def avisar_lectura(tabla, res):
+    if res.obsoleto:
+        hora = datetime.fromtimestamp(res.guardado_en).strftime('%H:%M:%S')
+        st.warning(f"⚠️ Sin conexión con la base de datos: '{tabla}' muestra datos guardados a las {hora} (pueden estar desactualizados).")
+    elif res.error:
+        st.error(f"❌ No se pudo leer '{tabla}': {res.error}")
+
+def leer(tabla, consulta=None, clave=None, respaldo=True):
+    """Lee con timeout y reintentos. Si la BD no responde, muestra los últimos datos buenos avisando que están desactualizados."""
+    if not supabase: return []
+    cache = init_cache_lecturas()
+    guardado = cache.obtener(clave or tabla, tabla, VERSIONES)
+    if guardado is not None: return guardado
+    with seccion(f"BD {tabla}"):
+        res = supabase.leer(tabla, consulta, clave=clave, respaldo=respaldo)
+    avisar_lectura(tabla, res)
+    if res.ok: cache.guardar(clave or tabla, tabla, VERSIONES, res.data)
+    return res.data or []
+
+def leer_varios(consultas):
+    """Lanza en paralelo las lecturas independientes de una sección. `consultas`: {nombre: (tabla, consulta)}."""
+    if not supabase: return {nombre: [] for nombre in consultas}
+    cache = init_cache_lecturas()
+    tablas = {nombre: spec if isinstance(spec, str) else spec[0] for nombre, spec in consultas.items()}
+    claves = {nombre: (spec[2] if not isinstance(spec, str) and len(spec) > 2 and spec[2] else nombre)
+              for nombre, spec in consultas.items()}
+    filas = {}
+    for nombre, tabla in tablas.items():
+        guardado = cache.obtener(claves[nombre], tabla, VERSIONES)
+        if guardado is not None: filas[nombre] = guardado
+    faltan = {nombre: spec for nombre, spec in consultas.items() if nombre not in filas}
+    if faltan:
+        with seccion("BD " + ", ".join(faltan)):
+            resultados = supabase.leer_varios(faltan)
+        for nombre, res in resultados.items():
+            avisar_lectura(tablas[nombre], res)
+            if res.ok: cache.guardar(claves[nombre], tablas[nombre], VERSIONES, res.data)
+            filas[nombre] = res.data or []
+    return filas
+
+def leer_vista(vista, filtro=None, clave=None):
+    """DataFrame tipado con solo las columnas que declara la vista (ver datos.VISTAS)."""
+    tabla = datos.VISTAS[vista][0]
+    return datos.frame_vista(leer(tabla, datos.consulta(vista, filtro), clave=clave or vista), vista)
+
+def leer_vistas(*vistas):
+    """Varias vistas independientes en paralelo. Devuelve {vista: DataFrame}."""
+    filas = leer_varios({v: (datos.VISTAS[v][0], datos.consulta(v)) for v in vistas})
+    return {v: datos.frame_vista(filas[v], v) for v in vistas}
+
+# --- GRILLAS PAGINADAS EN LA BASE (ver grillas.py) ---
+def leer_resumen_insumos(filtro):
+    """Totales del filtro calculados en la base; cacheados hasta que cambie `insumos`."""
+    vacio = {"filas": 0, "valor": 0, "bajo_stock": 0}
+    if not supabase: return vacio
+    cache = init_cache_lecturas()
+    clave = grillas.clave('insumos.resumen', filtro)
+    guardado = cache.obtener(clave, 'insumos', VERSIONES)
+    if guardado is not None: return guardado
+    try:
+        with seccion("BD resumen_insumos"):
+            res = grillas.resumen(supabase, filtro)
+    except Exception as e:
+        st.warning(f"⚠️ No se pudieron calcular los totales: {e}")
+        return vacio
+    cache.guardar(clave, 'insumos', VERSIONES, res)
+    return res
+
+def grilla_insumos(nombre, columnas, column_config=None):
+    """Grilla de insumos: filtro, orden y página se aplican en la consulta; solo se trae la página visible.
+    Devuelve los totales del filtro."""
+    c_bus, c_uni, c_bajo = st.columns([2, 1, 1])
+    buscar = c_bus.text_input("Buscar", key=f"{nombre}_buscar", placeholder="Nombre del insumo")
+    unidad = c_uni.selectbox("Unidad", ["Todas", "kg", "gr", "lt", "ml", "unidades"], key=f"{nombre}_unidad")
+    bajo = c_bajo.toggle(f"Stock bajo (≤ {grillas.STOCK_BAJO:g})", key=f"{nombre}_bajo")
+    filtro = grillas.Filtro(buscar, None if unidad == "Todas" else unidad, grillas.STOCK_BAJO if bajo else None)
+    resumen = leer_resumen_insumos(filtro)
+
+    c_ord, c_dir, c_tam, c_pag = st.columns([1.5, 1, 1, 1])
+    orden = grillas.ORDENES[c_ord.selectbox("Ordenar por", list(grillas.ORDENES), key=f"{nombre}_orden")]
+    desc = c_dir.toggle("Descendente", key=f"{nombre}_desc")
+    tam = c_tam.selectbox("Filas", grillas.TAMANOS, key=f"{nombre}_tam")
+    total_pags = grillas.paginas(resumen['filas'], tam)
+    # Si el filtro achica el resultado, la página guardada puede quedar fuera de rango
+    if st.session_state.get(f"{nombre}_pag", 1) > total_pags: st.session_state[f"{nombre}_pag"] = total_pags
+    pagina = c_pag.number_input(f"Página (de {total_pags})", min_value=1, max_value=total_pags, step=1, key=f"{nombre}_pag")
+
+    filas = leer('insumos', grillas.consulta(columnas, filtro, orden, desc, pagina - 1, tam),
+                 clave=grillas.clave(nombre, filtro, orden, desc, pagina, tam), respaldo=False)
+    st.dataframe(datos.a_frame(filas, 'insumos', columnas), hide_index=True, use_container_width=True,
+                 column_config=column_config)
+    st.caption(f"{resumen['filas']} insumos · {resumen['bajo_stock']} con stock bajo")
+    return resumen
+
+# --- HISTORIAL DE COSTOS (ver precios.py) ---
+def leer_historial_precios():
+    """Historial de costos en arreglos ordenados; se vuelve a leer solo si cambió `precios_insumo`."""
+    if not supabase: return precios.HistorialPrecios([])
+    cache = init_cache_lecturas()
+    guardado = cache.obtener('precios.historial', 'precios_insumo', VERSIONES)
+    if guardado is not None: return guardado
+    try:
+        with seccion("BD precios_insumo"):
+            historial = precios.HistorialPrecios(precios.leer_historial(supabase))
+    except Exception as e:
+        st.warning(f"⚠️ No se pudo leer el historial de costos: {e}")
+        return precios.HistorialPrecios([])
+    cache.guardar('precios.historial', 'precios_insumo', VERSIONES, historial)
+    return historial
+
+# --- LÓGICA DE NEGOCIO (ver servicios.py) ---
 
 def registrar_gasto(monto, descripcion, fecha=None):
     """Registra una compra de insumos en el libro financiero."""
-    if not fecha: fecha = str(datetime.now().date())
     if supabase:
         try:
-            supabase.table('gastos').insert({
-                "fecha": fecha, "monto": monto, "descripcion": descripcion, "tipo": "Compra Insumo"
-            }).execute()
+            servicios.registrar_gasto(supabase, monto, descripcion, fecha)
             return True
         except Exception as e:
             st.error(f"Error registrando gasto: {e}")
             return False
 
-def descontar_stock_automatico(pedido):
-    """Resta stock al entregar."""
-    if not supabase: return []
+def liquidar_stock():
+    """Liquidación de fin de día (ver liquidacion.py)."""
+    if supabase: return servicios.liquidar_stock(supabase, METODO_COSTEO)
+
+def respaldar_antes(motivo, tablas=None):
+    """Respaldo automático antes de borrar algo. Si falla, no se debe borrar."""
     try:
-        if not pedido.get('detalle_json'): return []
-        detalle = json.loads(pedido['detalle_json'])
-        log = []
-        insumos_db = supabase.table('insumos').select("*").execute().data
-        insumos_map = {i['nombre']: i for i in insumos_db}
-        
-        for item in detalle:
-            nombre_prod = item['producto']
-            cant_vendida = item['cantidad']
-            receta = supabase.table('recetas').select("ingredientes_json").eq('nombre', nombre_prod).execute().data
-            
-            if receta and receta[0]['ingredientes_json']:
-                ings = json.loads(receta[0]['ingredientes_json'])
-                for ing in ings:
-                    nombre_ing = ing['nombre']
-                    cant_ing_unitaria = ing['cantidad']
-                    total_desc = cant_ing_unitaria * cant_vendida
-                    if nombre_ing in insumos_map:
-                        stock_actual = insumos_map[nombre_ing]['stock_actual']
-                        nuevo = stock_actual - total_desc
-                        supabase.table('insumos').update({"stock_actual": nuevo}).eq('nombre', nombre_ing).execute()
-                        log.append(f"- {nombre_ing}: {stock_actual} → {nuevo}")
-        return log
+        carpeta = respaldos.crear(supabase, motivo, tablas)
+        st.toast(f"💾 Respaldo guardado: {carpeta.name}")
+        return True
     except Exception as e:
-        print(f"Error descontando stock: {e}")
-        return []
+        st.error(f"No se pudo respaldar, no se borró nada: {e}")
+        return False
 
-def reponer_stock_automatico(pedido):
-    """Devuelve stock al cancelar una entrega (Devolución)."""
-    if not supabase: return []
+# --- TABLERO DE COCINA ---
+def mover_pedido(p, nuevo_estado):
+    """Transición condicional (ver servicios.transicion). Si otro dispositivo se adelantó,
+    la tarjeta pasa a mostrar el pedido vigente con un aviso."""
     try:
-        if not pedido.get('detalle_json'): return []
-        detalle = json.loads(pedido['detalle_json'])
-        log = []
-        insumos_db = supabase.table('insumos').select("*").execute().data
-        insumos_map = {i['nombre']: i for i in insumos_db}
-        
-        for item in detalle:
-            nombre_prod = item['producto']
-            cant_vendida = item['cantidad']
-            receta = supabase.table('recetas').select("ingredientes_json").eq('nombre', nombre_prod).execute().data
-            
-            if receta and receta[0]['ingredientes_json']:
-                ings = json.loads(receta[0]['ingredientes_json'])
-                for ing in ings:
-                    nombre_ing = ing['nombre']
-                    total_reponer = ing['cantidad'] * cant_vendida
-                    if nombre_ing in insumos_map:
-                        stock_actual = insumos_map[nombre_ing]['stock_actual']
-                        nuevo = stock_actual + total_reponer
-                        supabase.table('insumos').update({"stock_actual": nuevo}).eq('nombre', nombre_ing).execute()
-                        log.append(f"⬆️ {nombre_ing}: {stock_actual} → {nuevo}")
-        return log
+        if nuevo_estado == 'Entregado':
+            # Entrega + Venta en el libro (cuenta de ventas, no de compras)
+            fila = servicios.entregar_pedido(supabase, p)
+            st.toast("¡Pedido Entregado y Venta Registrada!")
+        elif nuevo_estado == 'Cancelado':
+            fila = servicios.cancelar_pedido(supabase, p)
+        else:
+            fila = servicios.transicion(supabase, p, nuevo_estado)
+        st.session_state.tarjetas[p['id']] = fila
+    except servicios.ConflictoPedido as c:
+        st.session_state.tarjetas[p['id']] = c.actual or {**p, 'estado': 'Cancelado'}
+        st.session_state.avisos_tarjeta[p['id']] = str(c)
+    except servicios.TransicionInvalida as e:
+        st.session_state.avisos_tarjeta[p['id']] = str(e)
     except Exception as e:
-        print(f"Error reponiendo stock: {e}")
-        return []
+        # Red o RPC: la tarjeta queda como estaba y muestra el error en vez de un traceback
+        st.session_state.avisos_tarjeta[p['id']] = f"No se pudo pasar a {nuevo_estado}: {e}"
 
-def cambiar_estado_pedido(id_pedido, nuevo_estado, datos_pedido=None):
-    if supabase:
-        supabase.table('pedidos').update({'estado': nuevo_estado}).eq('id', id_pedido).execute()
+@st.fragment
+def tarjeta_pedido(p):
+    """Tarjeta del tablero. Sus botones solo vuelven a dibujar esta tarjeta, no el tablero entero."""
+    st.session_state.setdefault('tarjetas', {})
+    st.session_state.setdefault('avisos_tarjeta', {})
+    fresca = st.session_state.tarjetas.get(p['id'])
+    if fresca and fresca.get('version', 1) >= p.get('version', 1): p = fresca
+
+    with st.container():
+        aviso = st.session_state.avisos_tarjeta.pop(p['id'], None)
+        if aviso: st.warning(f"⚠️ {aviso}")
+        if p['estado'] in ('Entregado', 'Cancelado'):
+            st.caption(f"🆔 #{p['id']} · {p['cliente_nombre']} → **{p['estado']}**")
+            st.divider()
+            return
+
+        st.markdown(f"""
+        <div class="kanban-card">
+            <div style="display:flex; justify-content:space-between;">
+                <span>🆔 <b>#{p['id']}</b></span>
+                <span>📅 <b>{p['fecha_entrega']}</b></span>
+            </div>
+            <h4 style="margin:5px 0">{p['cliente_nombre']}</h4>
+            <p style="color:#666">🍰 {p['nombre_producto_snapshot']} (x{p['cantidad']})</p>
+            <p><i>Nota: {p.get('notas') or 'Sin notas'}</i></p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col_state, col_btns = st.columns([2, 3])
         
-        msg = ""
-        # Lógica de Stock Completa (Entrada y Salida)
-        if nuevo_estado == "Entregado" and datos_pedido:
-            log = descontar_stock_automatico(datos_pedido)
-            if log: msg = " | 📉 Stock descontado"
+        with col_state:
+            st.caption("Estado Actual:")
+            if p['estado'] == 'Pendiente': st.warning("🟡 Pendiente")
+            elif p['estado'] == 'En Horno': st.info("🔵 En Horno")
+            elif p['estado'] == 'Listo': st.success("🟢 Listo para Retiro")
+        
+        with col_btns:
+            st.caption("Acciones:")
+            c_b1, c_b2, c_b3 = st.columns(3)
             
-        elif nuevo_estado == "Cancelado":
-            # Si estaba entregado y se cancela -> Devolución
-            if datos_pedido and datos_pedido['estado'] == 'Entregado':
-                log = reponer_stock_automatico(datos_pedido)
-                if log: msg = " | 🔄 Stock devuelto"
-            else:
-                msg = " | Pedido cerrado"
-
-        st.toast(f"Estado: {nuevo_estado}{msg}", icon="✅")
-        time.sleep(1)
-        st.rerun()
+            # Botones según las transiciones permitidas desde el estado actual
+            permitidas = servicios.TRANSICIONES[p['estado']]
+            if 'En Horno' in permitidas:
+                c_b1.button("🔥 Horno", key=f"h_{p['id']}", on_click=mover_pedido, args=(p, 'En Horno'))
+            if 'Listo' in permitidas:
+                c_b2.button("✅ Listo", key=f"l_{p['id']}", on_click=mover_pedido, args=(p, 'Listo'))
+            if 'Entregado' in permitidas:
+                c_b3.button("🚚 Entregar", key=f"e_{p['id']}", on_click=mover_pedido, args=(p, 'Entregado'))
+            
+            # Botón cancelar siempre disponible
+            st.button("❌ Cancelar", key=f"c_{p['id']}", on_click=mover_pedido, args=(p, 'Cancelado'))
+        st.divider()
 
 # --- PANTALLA DE LOGIN ---
 def login_screen():
     col1, col2, col3 = st.columns([1, 1, 1])
     with col2:
         st.markdown("<br><br>", unsafe_allow_html=True)
-        st.image("https://i.postimg.cc/fy8vC6RP/172582480-314301286701036-2832058173383995414-n-waifu2x-art-noise1-scale.png", width=150)
+        st.image(miniatura(LOGO_URL, 150), width=150)
         st.markdown("<h2 style='text-align: center; color: #1c120d;'>TV Repostería</h2>", unsafe_allow_html=True)
         st.markdown("<p style='text-align: center; color: #9c6549;'>Sistema ERP v6.1</p>", unsafe_allow_html=True)
         
@@ -192,8 +401,10 @@ def login_screen():
             pwd = st.text_input("Contraseña", type="password")
             if st.form_submit_button("Ingresar", use_container_width=True):
                 if supabase:
-                    res = supabase.table('usuarios').select("*").eq('username', user).eq('password', pwd).execute()
-                    if res.data:
+                    res = supabase.leer('usuarios', lambda q: q.select("*").eq('username', user).eq('password', pwd), respaldo=False)
+                    if res.error:
+                        st.error(f"Error de conexión DB: {res.error}")
+                    elif res.data:
                         st.session_state.authenticated = True
                         st.session_state.usuario_actual = res.data[0]['nombre']
                         st.session_state.rol_actual = res.data[0]['rol']
@@ -208,10 +419,11 @@ def login_screen():
 # --- APLICACIÓN PRINCIPAL ---
 def main_app():
     # Sidebar
-    with st.sidebar:
+    with st.sidebar, seccion("Barra lateral"):
+        logo_sidebar = init_miniaturas().data_uri(LOGO_URL, 200)
         st.markdown(f"""
             <div style="text-align: center; padding-bottom: 20px;">
-                <img src="https://i.postimg.cc/fy8vC6RP/172582480-314301286701036-2832058173383995414-n-waifu2x-art-noise1-scale.png" 
+                <img src="{logo_sidebar}" 
                      style="width: 100px; border-radius: 50%; border: 4px solid #f2590d; padding: 2px;">
                 <h2 style="margin-top: 10px; font-size: 18px;">TV Repostería</h2>
                 <p style="color: #9c6549; font-size: 12px;">ERP v6.1 Full Stack</p>
@@ -241,6 +453,8 @@ def main_app():
             st.session_state.rol_actual = None
             st.rerun()
 
+    perfilador().abrir(menu)
+
     # ==========================================
     # 📊 FINANZAS
     # ==========================================
@@ -250,61 +464,79 @@ def main_app():
 
         ventas_tot = 0
         gastos_tot = 0
-        df_v = pd.DataFrame()
-        df_g = pd.DataFrame()
+        df_saldos = libro.saldos_mensuales([])
 
         if supabase:
-            # Ventas
-            try:
-                pr = supabase.table('pedidos').select("fecha_entrega, total_pedido, estado").execute().data
-                if pr:
-                    dfp = pd.DataFrame(pr)
-                    if 'total_pedido' in dfp.columns and not dfp.empty:
-                        ventas_tot = dfp[dfp['estado'] == 'Entregado']['total_pedido'].sum()
-                        dfp['fecha'] = pd.to_datetime(dfp['fecha_entrega'])
-                        dfp['tipo'] = 'Venta'
-                        dfp = dfp.rename(columns={'total_pedido': 'monto'})
-                        df_v = dfp[dfp['estado'] == 'Entregado'][['fecha', 'monto', 'tipo']]
-            except: pass
-            
-            # Gastos
-            try:
-                gr = supabase.table('gastos').select("*").execute().data
-                if gr:
-                    dfg = pd.DataFrame(gr)
-                    if 'monto' in dfg.columns:
-                        gastos_tot = dfg['monto'].sum()
-                        dfg['fecha'] = pd.to_datetime(dfg['fecha'])
-                        dfg['tipo'] = 'Gasto'
-                        df_g = dfg[['fecha', 'monto', 'tipo']]
-            except: pass
+            # Saldos por cuenta y mes ya consolidados en el libro: no se recorren los movimientos
+            df_saldos = libro.saldos_mensuales(leer_vista('dashboard.saldos'))
+            ventas_tot = df_saldos.loc[df_saldos['cuenta'] == 'ventas', 'saldo'].sum()
+            gastos_tot = df_saldos.loc[df_saldos['cuenta'].isin(['compras', 'ajustes']), 'saldo'].sum()
 
         balance = ventas_tot - gastos_tot
         
         c1, c2, c3 = st.columns(3)
-        c1.metric("Ingresos Totales (Ventas)", f"${ventas_tot:,.0f}", help="Solo pedidos entregados")
-        c2.metric("Egresos Totales (Compras)", f"${gastos_tot:,.0f}", help="Compras registradas")
+        c1.metric("Ingresos Totales (Ventas)", f"${ventas_tot:,.0f}", help="Ventas registradas al entregar pedidos")
+        c2.metric("Egresos Totales (Compras)", f"${gastos_tot:,.0f}", help="Compras de insumos y ajustes")
         c3.metric("Balance Neto (Ganancia)", f"${balance:,.0f}", delta="Rentable" if balance > 0 else "Pérdida")
 
         st.write("")
-        st.subheader("📈 Evolución Mensual")
+        st.subheader("📈 Evolución")
         
-        if not df_v.empty or not df_g.empty:
-            df_full = pd.concat([df_v, df_g])
-            df_full['Mes'] = df_full['fecha'].dt.strftime('%Y-%m')
-            chart_data = df_full.groupby(['Mes', 'tipo'])['monto'].sum().reset_index()
+        if not df_saldos.empty:
+            c_rango, c_gran = st.columns([3, 1])
+            opcion_rango = c_rango.radio("Rango", ["3 meses", "12 meses", "3 años", "Todo"], index=1, horizontal=True, label_visibility="collapsed")
+            primer_mes = datetime.strptime(df_saldos['mes'].min() + '-01', '%Y-%m-%d').date()
+            desde_g, hasta_g = graficos.rango(opcion_rango, primer_mes)
+            gran = graficos.granularidad(desde_g, hasta_g)
+            c_gran.caption(f"Agrupado por **{gran}**")
+            # Agregado una vez por versión del libro; el gráfico solo lleva la URL del JSON publicado
+            version_libro = (VERSIONES or {}).get('saldos_cuenta')
+            calcular = lambda: graficos.serie_financiera(supabase, desde_g, hasta_g, gran)
+            if version_libro is None:
+                chart_data, url_datos = calcular(), None
+            else:
+                chart_data, url_datos = init_graficos().obtener(('finanzas', version_libro, str(desde_g), str(hasta_g), gran), calcular)
+            fuente = alt.UrlData(url_datos, format=alt.DataFormat(type='json')) if url_datos and st.get_option('server.enableStaticServing') else chart_data
             
-            chart = alt.Chart(chart_data).mark_bar().encode(
-                x='Mes',
-                y='monto',
-                color=alt.Color('tipo', scale=alt.Scale(domain=['Venta', 'Gasto'], range=['#22c55e', '#ef4444'])),
-                tooltip=['Mes', 'tipo', 'monto']
+            chart = alt.Chart(fuente).mark_bar().encode(
+                x=alt.X('periodo:T', title=None),
+                y=alt.Y('monto:Q', title="Monto"),
+                xOffset='tipo:N',
+                color=alt.Color('tipo:N', scale=alt.Scale(domain=['Venta', 'Gasto'], range=['#22c55e', '#ef4444'])),
+                tooltip=['periodo:T', 'tipo:N', alt.Tooltip('monto:Q', format=',.0f')]
             ).interactive()
             
             st.altair_chart(chart, use_container_width=True)
         else:
             st.info("Aún no hay suficientes movimientos para generar gráficos.")
 
+        st.write("")
+        st.subheader("🔮 Demanda Esperada")
+        if supabase:
+            dias_pron = st.slider("Días a pronosticar", 7, 42, 14, step=7)
+            try:
+                with seccion("Pronóstico"):
+                    df_pron = init_pronostico().pronostico(supabase, dias_pron)
+                if df_pron.empty:
+                    st.info("Aún no hay pedidos con variación para pronosticar.")
+                else:
+                    cat_pron = leer_vistas('productos.variaciones', 'inventario.insumos')
+                    vars_pron = registros(cat_pron['productos.variaciones'])
+                    nombres_var = {v['id']: v['nombre'] for v in vars_pron}
+                    df_pron['variacion'] = df_pron['variacion_id'].map(nombres_var).fillna("(eliminada)")
+                    por_dia = df_pron.groupby('fecha', as_index=False)[['unidades', 'reservado']].sum()
+                    st.altair_chart(alt.Chart(por_dia.melt('fecha', var_name='serie', value_name='cantidad')).mark_line(point=True).encode(
+                        x='fecha:T', y='cantidad:Q', color=alt.Color('serie', title=None), tooltip=['fecha:T', 'serie', 'cantidad:Q']
+                    ), use_container_width=True)
+                    top = df_pron.groupby('variacion', as_index=False)[['unidades', 'reservado']].sum().sort_values('unidades', ascending=False)
+                    st.dataframe(top.round(1), hide_index=True, use_container_width=True)
+                    with st.expander("🛒 Insumos para cubrir la demanda"):
+                        insumos_pron = registros(cat_pron['inventario.insumos'])
+                        st.dataframe(pronostico.necesidades(df_pron, escenarios.Recetas(vars_pron, insumos_pron), insumos_pron).round(2),
+                                     hide_index=True, use_container_width=True)
+            except Exception as e:
+                st.error(f"No se pudo calcular el pronóstico: {e}")
+
     # ==========================================
     # 🛒 PEDIDOS (V5: FUNCIONAL CON NUEVA BD)
     # ==========================================
@@ -315,24 +547,22 @@ def main_app():
         mapa_productos_base = {}
         todas_variaciones = []
         lista_bases_nombres = []
+        mapa_clientes = {}
         
         if supabase:
-            try:
-                # Cargar Bases
-                data_p = supabase.table('productos').select("*").order('nombre').execute().data
-                if data_p:
-                    mapa_productos_base = {p['nombre']: p for p in data_p}
-                    lista_bases_nombres = list(mapa_productos_base.keys())
-
-                # Cargar Variaciones (Hijos)
-                todas_variaciones = supabase.table('variaciones').select("*").execute().data
-            except Exception as e:
-                st.error(f"Error conectando al catálogo: {e}")
+            # Bases y Variaciones (Hijos) en paralelo
+            catalogo = leer_vistas('pedidos.productos', 'pedidos.variaciones', 'pedidos.clientes')
+            data_p = registros(catalogo['pedidos.productos'])
+            if data_p:
+                mapa_productos_base = {p['nombre']: p for p in data_p}
+                lista_bases_nombres = list(mapa_productos_base.keys())
+            todas_variaciones = registros(catalogo['pedidos.variaciones'])
+            mapa_clientes = {c['id']: c for c in registros(catalogo['pedidos.clientes'])}
 
         tab_nuevo, tab_tablero = st.tabs(["➕ Nuevo Pedido", "📋 Tablero de Cocina"])
 
         # --- TAB: NUEVO PEDIDO ---
-        with tab_nuevo:
+        with tab_nuevo, seccion("Nuevo Pedido"):
             st.subheader("Ingresar Orden de Cliente")
             
             if not lista_bases_nombres:
@@ -340,8 +570,36 @@ def main_app():
             else:
                 col_cliente, col_prod = st.columns([1, 2])
                 
+                def elegir_cliente():
+                    c = mapa_clientes.get(st.session_state.get("cli_sel"))
+                    if c:
+                        st.session_state.cli_nom = c['nombre']
+                        st.session_state.cli_tel = c['telefono']
+
+                def repetir_ultimo_pedido(cliente_id):
+                    # Se ejecuta antes del rerun, así puede rellenar los widgets del formulario
+                    ult = clientes.ultimo_pedido(supabase, cliente_id)
+                    var = next((v for v in todas_variaciones if ult and v['id'] == ult['variacion_id']), None)
+                    if not var:
+                        st.session_state.aviso_repetir = "Este cliente no tiene pedidos anteriores disponibles."
+                        return
+                    base = next((n for n, b in mapa_productos_base.items() if b['id'] == var['producto_id']), None)
+                    st.session_state.new_base_sel_q = base
+                    st.session_state.new_base_sel = base
+                    st.session_state.new_var_sel = var['nombre']
+                    st.session_state.new_cant = int(ult['cantidad'] or 1)
+                    st.session_state.new_notas = ult.get('notas') or ""
+
                 with col_cliente:
                     st.markdown("##### 👤 Cliente")
+                    cli_sel = selector_busqueda("Buscar Cliente Frecuente", 'clientes',
+                                                {cid: clientes.etiqueta(c) for cid, c in mapa_clientes.items()},
+                                                key="cli_sel", on_change=elegir_cliente)
+                    if cli_sel:
+                        st.button("🔁 Repetir Último Pedido", key="cli_repetir", use_container_width=True,
+                                  on_click=repetir_ultimo_pedido, args=(cli_sel,))
+                    if st.session_state.get("aviso_repetir"):
+                        st.info(st.session_state.pop("aviso_repetir"))
                     cliente_nombre = st.text_input("Nombre Cliente", key="cli_nom")
                     cliente_contacto = st.text_input("Teléfono / WhatsApp", key="cli_tel")
                     
@@ -353,7 +611,7 @@ def main_app():
                     st.markdown("##### 🎂 Selección de Producto")
                     
                     # 1. Selector de BASE (Masa)
-                    base_selec = st.selectbox("1. Tipo de Masa / Base", lista_bases_nombres, index=None, key="new_base_sel", placeholder="Selecciona masa...")
+                    base_selec = selector_busqueda("1. Tipo de Masa / Base", 'productos', lista_bases_nombres, key="new_base_sel")
                     
                     variacion_data = None
                     precio_sugerido = 0
@@ -380,18 +638,19 @@ def main_app():
                     st.divider()
                     
                     c_cant, c_precio = st.columns(2)
-                    cantidad = c_cant.number_input("Cantidad", 1, 50, 1)
+                    cantidad = c_cant.number_input("Cantidad", 1, 50, 1, key="new_cant")
                     precio_final = c_precio.number_input("Precio Final Unitario ($)", value=int(precio_sugerido), step=500)
                     
                     total_calc = cantidad * precio_final
                     st.markdown(f"<h2 style='text-align:right; color:#f2590d'>Total: ${total_calc:,.0f}</h2>", unsafe_allow_html=True)
                     
-                    notas = st.text_area("📝 Notas Especiales (Dedicatoria, Alergias, Diseño)")
+                    notas = st.text_area("📝 Notas Especiales (Dedicatoria, Alergias, Diseño)", key="new_notas")
 
                     if st.button("💾 Confirmar Pedido", type="primary", use_container_width=True):
                         if cliente_nombre and variacion_data:
                             try:
-                                datos = {
+                                nuevo_pedido = {
+                                    "cliente_id": clientes.registrar(supabase, cliente_nombre, cliente_contacto),
                                     "cliente_nombre": cliente_nombre,
                                     "cliente_contacto": cliente_contacto,
                                     "fecha_entrega": str(fecha_entrega),
@@ -404,7 +663,7 @@ def main_app():
                                     "estado": "Pendiente",
                                     "notas": notas
                                 }
-                                supabase.table('pedidos').insert(datos).execute()
+                                supabase.table('pedidos').insert(nuevo_pedido).execute()
                                 st.balloons()
                                 st.success("¡Pedido enviado a cocina!")
                                 time.sleep(1.5)
@@ -415,72 +674,23 @@ def main_app():
                             st.error("Faltan datos del cliente o seleccionar producto.")
 
         # --- TAB: KANBAN ---
-        with tab_tablero:
+        with tab_tablero, seccion("Tablero de Cocina"):
             st.subheader("📋 Tablero de Producción")
             
             # Cargar pedidos activos
             pedidos_activos = []
             if supabase:
-                try:
-                    # Traemos todo lo que no esté Cancelado ni Entregado (histórico)
-                    pedidos_activos = supabase.table('pedidos').select("*").neq('estado', 'Cancelado').neq('estado', 'Entregado').order('fecha_entrega').execute().data
-                except: pass
+                # Traemos todo lo que no esté Cancelado ni Entregado (histórico)
+                pedidos_activos = registros(leer_vista('pedidos.kanban', lambda q: q.neq('estado', 'Cancelado').neq('estado', 'Entregado')))
             
             if not pedidos_activos:
                 st.info("🎉 No hay pedidos pendientes. ¡Todo al día!")
             else:
+                # Las tarjetas ya recargadas desde la BD no necesitan la copia local
+                ids = {p['id'] for p in pedidos_activos}
+                st.session_state.tarjetas = {k: v for k, v in st.session_state.get('tarjetas', {}).items() if k in ids}
                 for p in pedidos_activos:
-                    # Tarjeta de Pedido
-                    with st.container():
-                        st.markdown(f"""
-                        <div class="kanban-card">
-                            <div style="display:flex; justify-content:space-between;">
-                                <span>🆔 <b>#{p['id']}</b></span>
-                                <span>📅 <b>{p['fecha_entrega']}</b></span>
-                            </div>
-                            <h4 style="margin:5px 0">{p['cliente_nombre']}</h4>
-                            <p style="color:#666">🍰 {p['nombre_producto_snapshot']} (x{p['cantidad']})</p>
-                            <p><i>Nota: {p.get('notas') or 'Sin notas'}</i></p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        col_state, col_btns = st.columns([2, 3])
-                        
-                        with col_state:
-                            st.caption("Estado Actual:")
-                            if p['estado'] == 'Pendiente': st.warning("🟡 Pendiente")
-                            elif p['estado'] == 'En Horno': st.info("🔵 En Horno")
-                            elif p['estado'] == 'Listo': st.success("🟢 Listo para Retiro")
-                        
-                        with col_btns:
-                            st.caption("Acciones:")
-                            c_b1, c_b2, c_b3 = st.columns(3)
-                            
-                            # Lógica de Botones según estado
-                            if p['estado'] == 'Pendiente':
-                                if c_b1.button("🔥 Horno", key=f"h_{p['id']}"):
-                                    supabase.table('pedidos').update({'estado': 'En Horno'}).eq('id', p['id']).execute()
-                                    st.rerun()
-                            
-                            if p['estado'] == 'En Horno':
-                                if c_b2.button("✅ Listo", key=f"l_{p['id']}"):
-                                    supabase.table('pedidos').update({'estado': 'Listo'}).eq('id', p['id']).execute()
-                                    st.rerun()
-                                    
-                            if p['estado'] == 'Listo':
-                                if c_b3.button("🚚 Entregar", key=f"e_{p['id']}"):
-                                    supabase.table('pedidos').update({'estado': 'Entregado'}).eq('id', p['id']).execute()
-                                    # Registrar Venta en Gastos (Ingreso positivo)
-                                    registrar_gasto(p['total_pedido'] * 1, f"Venta Pedido #{p['id']} - {p['cliente_nombre']}")
-                                    st.toast("¡Pedido Entregado y Venta Registrada!")
-                                    time.sleep(1.5)
-                                    st.rerun()
-                            
-                            # Botón cancelar siempre disponible
-                            if st.button("❌ Cancelar", key=f"c_{p['id']}"):
-                                supabase.table('pedidos').update({'estado': 'Cancelado'}).eq('id', p['id']).execute()
-                                st.rerun()
-                        st.divider()
+                    tarjeta_pedido(p)
 
     # ==========================================
     # 🧁 PRODUCTOS Y VARIACIONES (V11: DECIMALES LIMPIOS)
@@ -489,49 +699,9 @@ def main_app():
         st.title("🧁 Catálogo Maestro")
         st.markdown("Gestiona tus masas base y crea sus variaciones con calculadora de costos avanzada.")
 
-        # --- HELPER: Conversión para Recetas ---
-        def convertir_a_base(cantidad, unidad_receta, unidad_inventario):
-            if unidad_receta == unidad_inventario: return cantidad
-            factor_cdta = 5
-            factor_cda = 15
-
-            if unidad_inventario == 'kg':
-                if unidad_receta == 'gr': return cantidad / 1000
-                if unidad_receta == 'cdta': return (cantidad * factor_cdta) / 1000 
-                if unidad_receta == 'cda': return (cantidad * factor_cda) / 1000
-            
-            if unidad_inventario == 'gr':
-                if unidad_receta == 'kg': return cantidad * 1000
-                if unidad_receta == 'cdta': return cantidad * factor_cdta
-                if unidad_receta == 'cda': return cantidad * factor_cda
-            
-            if unidad_inventario == 'lt':
-                if unidad_receta in ['ml', 'cc']: return cantidad / 1000
-                if unidad_receta == 'cdta': return (cantidad * factor_cdta) / 1000
-                if unidad_receta == 'cda': return (cantidad * factor_cda) / 1000
-            
-            if unidad_inventario in ['ml', 'cc']:
-                if unidad_receta == 'lt': return cantidad * 1000
-                if unidad_receta == 'cdta': return cantidad * factor_cdta
-                if unidad_receta == 'cda': return cantidad * factor_cda
-            return 0 
-
-        def calcular_precio_final(costo_insumos, p_merma, p_ops, costo_mo, p_maq, p_margen, costo_empaque):
-            val_merma = costo_insumos * (p_merma / 100)
-            sub1 = costo_insumos + val_merma
-            val_ops = sub1 * (p_ops / 100)
-            sub2 = sub1 + val_ops
-            sub3 = sub2 + costo_mo
-            val_maq = sub3 * (p_maq / 100)
-            sub4 = sub3 + val_maq
-            val_ganancia = sub4 * (p_margen / 100)
-            sub5 = sub4 + val_ganancia
-            final = sub5 + costo_empaque
-            
-            return final, {
-                "insumos": costo_insumos, "merma": val_merma, "ops": val_ops,
-                "mo": costo_mo, "maq": val_maq, "ganancia": val_ganancia, "empaque": costo_empaque
-            }
+        def calcular_precio_final(costo_insumos, p_merma, p_ops, costo_mo, p_maq, p_margen, costo_empaque, rendimiento=1):
+            # La misma fórmula que usa el simulador de escenarios para todo el catálogo
+            return escenarios.desglose(costo_insumos, p_merma, p_ops, costo_mo, p_maq, p_margen, costo_empaque, rendimiento)
         
         def mostrar_cantidad(valor):
             if valor == int(valor): return str(int(valor))
@@ -542,18 +712,19 @@ def main_app():
         lista_productos_base = []
         mapa_productos_base = {}
 
+        all_vars = []
+
         if supabase:
-            try:
-                data_i = supabase.table('insumos').select("*").order('nombre').execute().data
-                mapa_insumos = {i['nombre']: i for i in data_i}
-                data_p = supabase.table('productos').select("*").order('nombre').execute().data
-                lista_productos_base = [p['nombre'] for p in data_p]
-                mapa_productos_base = {p['nombre']: p for p in data_p}
-            except: pass
+            datos_cat = leer_vistas('productos.insumos', 'productos.productos', 'productos.variaciones')
+            mapa_insumos = {i['nombre']: i for i in registros(datos_cat['productos.insumos'])}
+            data_p = registros(datos_cat['productos.productos'])
+            lista_productos_base = [p['nombre'] for p in data_p]
+            mapa_productos_base = {p['nombre']: p for p in data_p}
+            all_vars = registros(datos_cat['productos.variaciones'])
         
-        tab_catalogo, tab_base, tab_variacion, tab_editor = st.tabs(["📖 Ver Catálogo", "✨ 1. Crear Masa Base", "🍰 2. Crear Variación", "✏️ Editor de Recetas"])
+        tab_catalogo, tab_base, tab_variacion, tab_editor, tab_simulador = st.tabs(["📖 Ver Catálogo", "✨ 1. Crear Masa Base", "🍰 2. Crear Variación", "✏️ Editor de Recetas", "🧮 Simulador de Precios"])
         
-        with tab_editor:
+        with tab_editor, seccion("Editor de Recetas"):
             st.subheader("✏️ Editor de Recetas")
             if 'edit_var_id' not in st.session_state: st.session_state.edit_var_id = None
                 
@@ -567,24 +738,19 @@ def main_app():
                 
                 with col_e1:
                     st.markdown("##### 🥣 Ingredientes")
-                    insumo_k = st.selectbox("Agregar Insumo", list(mapa_insumos.keys()), index=None, key="edit_sel_ins")
+                    insumo_k = selector_busqueda("Agregar Insumo", 'insumos', list(mapa_insumos.keys()), key="edit_sel_ins")
                     if insumo_k:
                         d_ins = mapa_insumos[insumo_k]
                         u_base = d_ins['unidad_medida']
                         cc1, cc2 = st.columns(2)
                         v_cant = cc1.number_input("Cant.", min_value=0.0, value=1.0, format="%.2f", step=0.1, key="edit_cant")
                         
-                        opts = [u_base]
-                        if u_base == 'kg': opts = ['gr', 'kg', 'cdta', 'cda']
-                        elif u_base == 'gr': opts = ['gr', 'kg', 'cdta', 'cda']
-                        elif u_base == 'lt': opts = ['ml', 'lt', 'cc', 'cdta', 'cda']
-                        elif u_base in ['ml', 'cc']: opts = ['ml', 'lt', 'cc', 'cdta', 'cda']
+                        opts = unidades.opciones(u_base, 'receta')
                         v_uni = cc2.selectbox("Unidad", opts, key="edit_uni")
                         
                         if st.button("➕ Añadir", key="edit_add_btn"):
                             if v_cant > 0:
-                                cant_norm = convertir_a_base(v_cant, v_uni, u_base)
-                                costo_linea = cant_norm * d_ins['costo_unitario']
+                                costo_linea = (convertir_uno(v_cant, v_uni, u_base) or 0) * d_ins['costo_unitario']
                                 st.session_state.edit_ingredientes.append({
                                     "nombre": insumo_k, "cantidad": v_cant, "unidad": v_uni, 
                                     "costo": costo_linea, "insumo_id": d_ins['id']
@@ -594,12 +760,10 @@ def main_app():
                     st.divider()
                     st.caption("Lista de Ingredientes:")
                     total_receta_edit = 0
+                    # Costo de todas las líneas en una pasada (NaN = el insumo ya no existe, queda el costo guardado)
+                    costos_edit = costeo.costo_lineas(st.session_state.edit_ingredientes, mapa_insumos)
                     for idx, ing in enumerate(st.session_state.edit_ingredientes):
-                        costo_actual = ing['costo']
-                        if ing['nombre'] in mapa_insumos:
-                            d_actual = mapa_insumos[ing['nombre']]
-                            cant_norm = convertir_a_base(ing['cantidad'], ing['unidad'], d_actual['unidad_medida'])
-                            costo_actual = cant_norm * d_actual['costo_unitario']
+                        costo_actual = ing['costo'] if pd.isna(costos_edit[idx]) else float(costos_edit[idx])
                         ing['costo'] = costo_actual
                         total_receta_edit += costo_actual
                         
@@ -612,7 +776,9 @@ def main_app():
 
                 with col_e2:
                     st.markdown("##### 💰 Estructura de Costos")
+                    rend_edit = var_data.get('rendimiento') or 1
                     st.info(f"Costo Ingredientes Base: **${total_receta_edit:,.0f}**")
+                    if rend_edit > 1: st.caption(f"💡 Receta por lote: rinde {mostrar_cantidad(rend_edit)} unidades; mano de obra y empaque son del lote completo.")
                     
                     with st.expander("⚙️ Configuración Avanzada de Costos", expanded=True):
                         ep1, ep2 = st.columns(2)
@@ -626,7 +792,7 @@ def main_app():
                         costo_empaque = st.number_input("Costo Empaque ($)", value=3000, step=500, key="ed_empaque")
 
                     precio_sug_edit, breakdown = calcular_precio_final(
-                        total_receta_edit, p_merma, p_ops, costo_mo, p_maq, p_margen, costo_empaque
+                        total_receta_edit, p_merma, p_ops, costo_mo, p_maq, p_margen, costo_empaque, rend_edit
                     )
                     
                     st.markdown("---")
@@ -656,7 +822,7 @@ def main_app():
                         st.session_state.edit_var_id = None
                         st.rerun()
 
-        with tab_base:
+        with tab_base, seccion("Crear Masa Base"):
             st.subheader("Paso 1: Definir Tipo de Masa")
             c1, c2 = st.columns([2, 1])
             pb_nombre = c1.text_input("Nombre de la Base", placeholder="Ej: Torta Bizcocho")
@@ -675,7 +841,7 @@ def main_app():
                             st.rerun()
                     except Exception as e: st.error(f"Error: {e}")
 
-        with tab_variacion:
+        with tab_variacion, seccion("Crear Variación"):
             st.subheader("Paso 2: Receta Específica")
             if not lista_productos_base:
                 st.warning("Primero crea una Base en la pestaña anterior.")
@@ -712,7 +878,7 @@ def main_app():
                         if 'var_ingredientes' not in st.session_state: 
                             st.session_state.var_ingredientes = []
                         
-                        insumo_k = st.selectbox("Insumo", list(mapa_insumos.keys()), index=None, placeholder="Buscar...")
+                        insumo_k = selector_busqueda("Insumo", 'insumos', list(mapa_insumos.keys()), key="var_sel_ins")
                         if insumo_k:
                             d_ins = mapa_insumos[insumo_k]
                             u_base = d_ins['unidad_medida']
@@ -722,18 +888,14 @@ def main_app():
                             label_cant = "Cantidad LOTE" if usar_lote else "Cantidad UNIDAD"
                             v_cant = cc1.number_input(label_cant, min_value=0.0, value=1.0, format="%.2f", step=0.1)
                             
-                            opts = [u_base]
-                            if u_base == 'kg': opts = ['gr', 'kg', 'cdta', 'cda']
-                            elif u_base == 'gr': opts = ['gr', 'kg', 'cdta', 'cda']
-                            elif u_base == 'lt': opts = ['ml', 'lt', 'cc', 'cdta', 'cda']
-                            elif u_base in ['ml', 'cc']: opts = ['ml', 'lt', 'cc', 'cdta', 'cda']
+                            opts = unidades.opciones(u_base, 'receta')
                             
                             v_uni = cc2.selectbox("Unidad", opts)
                             
                             if st.button("⬇️ Agregar"):
                                 if v_cant > 0:
                                     # 1. Normalizar a unidad base del sistema
-                                    cant_norm_sistema = convertir_a_base(v_cant, v_uni, u_base)
+                                    cant_norm_sistema = convertir_uno(v_cant, v_uni, u_base) or 0
                                     
                                     # 2. Calcular costo (SIEMPRE con la cantidad normalizada completa)
                                     costo_linea = cant_norm_sistema * d_ins['costo_unitario']
@@ -758,13 +920,10 @@ def main_app():
                         else:
                             st.caption(f"Ficha Técnica ({var_tamano}):")
                         
+                        # Recalcular costo actualizado por si cambió el precio del insumo
+                        costos_var = costeo.costo_lineas(st.session_state.var_ingredientes, mapa_insumos)
                         for i, item in enumerate(st.session_state.var_ingredientes):
-                            # Recalcular costo actualizado por si cambió el precio del insumo
-                            if item['nombre'] in mapa_insumos:
-                                d_actual = mapa_insumos[item['nombre']]
-                                cant_norm = convertir_a_base(item['cantidad'], item['unidad'], d_actual['unidad_medida'])
-                                costo_actual = cant_norm * d_actual['costo_unitario']
-                                item['costo'] = costo_actual
+                            if not pd.isna(costos_var[i]): item['costo'] = float(costos_var[i])
                             
                             total_receta += item['costo']
                             
@@ -828,17 +987,11 @@ def main_app():
                             
                             if usar_lote:
                                 # MODO LOTE: Calcular sobre el lote completo
-                                val_merma = total_ingredientes_lote * (p_merma / 100)
-                                sub1 = total_ingredientes_lote + val_merma
-                                val_ops = sub1 * (p_ops / 100)
-                                sub2 = sub1 + val_ops
-                                sub3 = sub2 + costo_mo
-                                val_maq = sub3 * (p_maq / 100)
-                                sub4 = sub3 + val_maq
-                                costo_produccion_lote = sub4
-                                val_ganancia = costo_produccion_lote * (p_margen / 100)
-                                sub5 = costo_produccion_lote + val_ganancia
-                                precio_total_lote = sub5 + costo_empaque
+                                precio_total_lote, bd = calcular_precio_final(
+                                    total_ingredientes_lote, p_merma, p_ops, costo_mo, p_maq, p_margen, costo_empaque
+                                )
+                                val_merma, val_ops, val_maq, val_ganancia = bd['merma'], bd['ops'], bd['maq'], bd['ganancia']
+                                costo_produccion_lote = precio_total_lote - val_ganancia - bd['empaque']
                                 precio_unitario_sug = precio_total_lote / factor_div
                                 
                                 st.markdown(f"""
@@ -899,18 +1052,16 @@ def main_app():
                             # Botón deshabilitado visualmente
                             st.markdown('<p style="color:#999; font-size:14px;">💾 Guardar Receta (Agrega ingredientes primero)</p>', unsafe_allow_html=True)
 
-        with tab_catalogo:
+        with tab_catalogo, seccion("Ver Catálogo"):
             st.subheader("Catálogo")
             if lista_productos_base:
-                try: all_vars = supabase.table('variaciones').select("*").order('nombre').execute().data
-                except: all_vars = []
                 for p_nombre in lista_productos_base:
                     p_data = mapa_productos_base[p_nombre]
                     variaciones_p = [v for v in all_vars if v['producto_id'] == p_data['id']]
                     with st.expander(f"🎂 {p_nombre} ({len(variaciones_p)} var)"):
                         col_img, col_info, col_actions = st.columns([2, 3, 1])
                         with col_img:
-                            if p_data.get('imagen_url'): st.image(p_data['imagen_url'], width=300)
+                            if p_data.get('imagen_url'): st.image(miniatura(p_data['imagen_url'], 300), width=300)
                             else: st.markdown("🖼️")
                         with col_info:
                             st.caption(f"Categoría: **{p_data.get('categoria', 'General')}**")
@@ -928,8 +1079,9 @@ def main_app():
                                                 except: st.session_state.edit_ingredientes = []
                                                 st.toast("Cargado en Editor ➡️")
                                             if st.button("🗑️", key=f"del_v_{v['id']}"):
-                                                supabase.table('variaciones').delete().eq('id', v['id']).execute()
-                                                st.rerun()
+                                                if respaldar_antes(f"antes de borrar variacion {v['id']}", ['variaciones']):
+                                                    supabase.table('variaciones').delete().eq('id', v['id']).execute()
+                                                    st.rerun()
                                         with st.popover("Ver ingredientes"):
                                             try:
                                                 ings = json.loads(v['ingredientes_json'])
@@ -945,25 +1097,90 @@ def main_app():
                                     supabase.table('productos').update({"nombre": new_name_b, "categoria": new_cat_b, "imagen_url": new_img_b}).eq('id', p_data['id']).execute()
                                     st.rerun()
                             if st.button("🗑️ Borrar", key=f"del_b_{p_data['id']}"):
-                                supabase.table('productos').delete().eq('id', p_data['id']).execute()
-                                st.rerun()
+                                if respaldar_antes(f"antes de borrar producto {p_data['id']}", ['productos', 'variaciones']):
+                                    supabase.table('productos').delete().eq('id', p_data['id']).execute()
+                                    st.rerun()
             else: st.info("Crea una masa base primero.")
 
+        with tab_simulador, seccion("Simulador de Precios"):
+            st.subheader("🧮 Simulador de Precios del Catálogo")
+            st.caption("Evalúa todas las combinaciones de parámetros sobre todas las variaciones a la vez. "
+                       "El margen es el margen bruto si se mantiene el precio de venta actual. En las recetas por lote "
+                       "la mano de obra y el empaque son del lote completo, como en el editor.")
+
+            def lista_numeros(texto):
+                return [float(x) for x in texto.replace(';', ',').split(',') if x.strip()]
+
+            with st.form("form_simulador"):
+                s1, s2, s3 = st.columns(3)
+                sim_merma = s1.multiselect("Merma (%)", list(range(0, 16)), default=[5])
+                sim_ops = s2.multiselect("Gastos Ops (%)", list(range(0, 31)), default=[15])
+                sim_maq = s3.multiselect("Mantención Maq. (%)", list(range(0, 21)), default=[5])
+                s4, s5, s6 = st.columns(3)
+                sim_margen = s4.multiselect("Margen Ganancia (%)", list(range(10, 101, 5)), default=[60])
+                sim_mo = s5.text_input("Mano de Obra $ (separados por coma)", "6400")
+                sim_emp = s6.text_input("Empaque $ (separados por coma)", "3000")
+                s7, s8, s9 = st.columns(3)
+                sim_ins = s7.multiselect("Insumos que suben", list(mapa_insumos.keys()))
+                sim_alza = s8.number_input("Alza (%)", value=20, step=5)
+                sim_obj = s9.slider("Margen objetivo (%)", 0, 80, escenarios.MARGEN_OBJETIVO)
+                simular = st.form_submit_button("🧮 Simular", type="primary")
+
+            if simular:
+                try:
+                    alzas = [{}] + ([{n: 1 + sim_alza / 100 for n in sim_ins}] if sim_ins else [])
+                    esc = escenarios.grilla(alzas=alzas, merma=sim_merma or [escenarios.DEFECTOS['merma']],
+                                            ops=sim_ops or [escenarios.DEFECTOS['ops']],
+                                            maquinaria=sim_maq or [escenarios.DEFECTOS['maquinaria']],
+                                            margen=sim_margen or [escenarios.DEFECTOS['margen']],
+                                            mano_obra=lista_numeros(sim_mo) or [escenarios.DEFECTOS['mano_obra']],
+                                            empaque=lista_numeros(sim_emp) or [escenarios.DEFECTOS['empaque']])
+                    recetas_sim = escenarios.Recetas(all_vars, list(mapa_insumos.values()))
+                    res_sim = escenarios.evaluar(recetas_sim, esc, sim_obj)
+                    st.session_state.simulacion = (recetas_sim, esc, res_sim)
+                except ValueError as e:
+                    st.error(f"Valores inválidos: {e}")
+
+            if st.session_state.get('simulacion'):
+                recetas_sim, esc, res_sim = st.session_state.simulacion
+                tabla_esc = escenarios.resumen(recetas_sim, esc, res_sim)
+                st.markdown(f"**{len(esc)} escenarios × {len(recetas_sim)} variaciones**")
+                st.dataframe(tabla_esc, hide_index=True, use_container_width=True)
+                n_esc = st.selectbox("Ver escenario", range(len(esc)), key="sim_esc",
+                                     format_func=lambda i: f"#{i} · " + ", ".join(f"{p}={esc.iloc[i][p]:g}" for p in escenarios.PARAMETROS) + f" · {esc.iloc[i]['alza']}")
+                det = escenarios.detalle(recetas_sim, res_sim, n_esc)
+                st.caption(f"{int(det['bajo_objetivo'].sum())} variaciones quedan bajo el margen objetivo en este escenario.")
+                st.dataframe(det, hide_index=True, use_container_width=True)
+
+            st.divider()
+            st.subheader("⏪ Costo a una Fecha")
+            st.caption("Costo de ingredientes por unidad de cada variación con los costos de insumos vigentes en esa fecha "
+                       "(recetas actuales), comparado con hoy.")
+            with st.form("form_costo_fecha"):
+                f1, f2 = st.columns([2, 1])
+                fecha_costo = f1.date_input("Fecha", value=datetime.now().date(), max_value=datetime.now().date())
+                calcular_fecha = f2.form_submit_button("⏪ Calcular", use_container_width=True)
+            if calcular_fecha:
+                historial = leer_historial_precios()
+                recetas_fecha = escenarios.Recetas(all_vars, list(mapa_insumos.values()))
+                # Fin del día elegido en hora local (precios.py la pasa a UTC): incluye los cambios de ese día
+                st.session_state.costo_fecha = (fecha_costo, precios.deriva(
+                    recetas_fecha, historial, datetime.combine(fecha_costo, datetime.max.time())))
+            if st.session_state.get('costo_fecha'):
+                fecha_costo, deriva = st.session_state.costo_fecha
+                st.markdown(f"**Costos al {fecha_costo:%d-%m-%Y} vs hoy**")
+                st.dataframe(deriva, hide_index=True, use_container_width=True, column_config={
+                    "costo_entonces": st.column_config.NumberColumn("Costo entonces", format="$%.0f"),
+                    "costo_hoy": st.column_config.NumberColumn("Costo hoy", format="$%.0f"),
+                    "cambio_pct": st.column_config.NumberColumn("Cambio", format="%.1f%%"),
+                })
+
     # ==========================================
     # 📦 INVENTARIO (V10: DECIMALES LIMPIOS)
     # ==========================================
     elif menu == "📦 Inventario":
         st.title("📦 Inventario y Costos")
 
-        # --- HELPER CONVERSIÓN ---
-        def normalizar_cantidad(cantidad, unidad_origen, unidad_destino):
-            if unidad_origen == unidad_destino: return cantidad
-            if unidad_destino == 'kg' and unidad_origen == 'gr': return cantidad / 1000
-            if unidad_destino == 'gr' and unidad_origen == 'kg': return cantidad * 1000
-            if unidad_destino == 'lt' and (unidad_origen == 'ml' or unidad_origen == 'cc'): return cantidad / 1000
-            if (unidad_destino == 'ml' or unidad_destino == 'cc') and unidad_origen == 'lt': return cantidad * 1000
-            return None
-        
         def mostrar_cantidad(valor, unidad=None):
             if unidad == 'unidades': return str(int(valor))
             if valor == int(valor): return str(int(valor))
@@ -972,48 +1189,44 @@ def main_app():
         # Carga de datos
         insumos_existentes = []
         mapa_insumos = {}
+        df_insumos = datos.frame_vista([], 'inventario.insumos')
         if supabase:
-            try:
-                data = supabase.table('insumos').select("*").order('nombre').execute().data
-                insumos_existentes = [i['nombre'] for i in data]
-                mapa_insumos = {i['nombre']: i for i in data}
-            except Exception as e:
-                st.error(f"Error cargando inventario: {e}")
+            df_insumos = leer_vista('inventario.insumos')
+            insumos_existentes = df_insumos['nombre'].tolist()
+            mapa_insumos = {i['nombre']: i for i in registros(df_insumos)}
 
         # TABS
-        tab_compra, tab_nuevo, tab_precios, tab_stock = st.tabs([
+        tab_compra, tab_nuevo, tab_precios, tab_stock, tab_lista = st.tabs([
             "🛒 Registrar Compra", 
             "✨ Crear Nuevo Insumo", 
             "💲 Actualizar Precios Mercado", 
-            "📋 Ver y Ajustar Stock"
+            "📋 Ver y Ajustar Stock",
+            "🧾 Lista de Compras"
         ])
 
         # ---------------------------------------------------------
         # TAB 1: REGISTRAR COMPRA
         # ---------------------------------------------------------
-        with tab_compra:
+        with tab_compra, seccion("Registrar Compra"):
             st.subheader("Ingreso de Stock Real (Compras)")
             if not insumos_existentes:
                 st.warning("Crea insumos primero.")
             else:
                 c_sel, c_info = st.columns([2, 2])
                 with c_sel:
-                    insumo_selec = st.selectbox("Producto Comprado", insumos_existentes, index=None, placeholder="Buscar...")
+                    insumo_selec = selector_busqueda("Producto Comprado", 'insumos', insumos_existentes, key="c_sel_ins")
                 
                 if insumo_selec:
-                    datos = mapa_insumos[insumo_selec]
-                    u_base = datos['unidad_medida']
+                    datos_ins = mapa_insumos[insumo_selec]
+                    u_base = datos_ins['unidad_medida']
                     with c_info:
-                        st.info(f"Precio Ref: **${datos['costo_unitario']:,.0f} / {u_base}**")
+                        st.info(f"Costo Promedio: **${datos_ins['costo_unitario']:,.0f} / {u_base}**")
+                        if datos_ins.get('ultimo_precio'):
+                            st.caption(f"Último precio: ${datos_ins['ultimo_precio']:,.0f} / {u_base}")
 
                     c1, c2, c3 = st.columns(3)
                     
-                    opts = [u_base]
-                    if u_base == 'kg': opts = ['kg', 'gr']
-                    elif u_base == 'gr': opts = ['gr', 'kg']
-                    elif u_base == 'lt': opts = ['lt', 'ml', 'cc']
-                    elif u_base == 'ml': opts = ['ml', 'lt']
-                    elif u_base == 'unidades': opts = ['unidades']
+                    opts = unidades.opciones(u_base)
                     
                     with c2:
                         u_compra = st.selectbox("Unidad Compra", opts, key="c_u")
@@ -1026,14 +1239,12 @@ def main_app():
                         total_pago = st.number_input("Total Pagado ($)", min_value=0, value=0, step=1000, key="c_p")
 
                     if st.button("✅ Ingresar Stock"):
-                        cant_norm = normalizar_cantidad(cant_input, u_compra, u_base) if u_compra != u_base else cant_input
+                        cant_norm = convertir_uno(cant_input, u_compra, u_base)
                         if cant_norm:
-                            nuevo_precio_ref = total_pago / cant_norm if cant_norm > 0 else datos['costo_unitario']
-                            supabase.table('insumos').update({
-                                "stock_actual": datos['stock_actual'] + cant_norm,
-                                "costo_unitario": nuevo_precio_ref
-                            }).eq('id', datos['id']).execute()
-                            
+                            # El costo pasa a ser el promedio ponderado con el stock existente
+                            costeo.registrar_compra(supabase, datos_ins['id'], cant_norm, total_pago)
+                            compras.guardar_envase(supabase, datos_ins['id'], cant_norm, total_pago, cant_input, u_compra)
+
                             registrar_gasto(total_pago, f"Compra: {insumo_selec}")
                             st.toast("✅ Stock ingresado.")
                             time.sleep(1)
@@ -1042,7 +1253,7 @@ def main_app():
         # ---------------------------------------------------------
         # TAB 2: CREAR NUEVO INSUMO
         # ---------------------------------------------------------
-        with tab_nuevo:
+        with tab_nuevo, seccion("Crear Nuevo Insumo"):
             st.subheader("Definir Nuevo Insumo")
             c_nom, c_uni = st.columns([2, 1])
             new_nombre = c_nom.text_input("Nombre Genérico", placeholder="Ej: Leche Condensada")
@@ -1051,12 +1262,7 @@ def main_app():
             st.markdown("##### 🏷️ Precio de Referencia Inicial")
             c_form1, c_form2, c_form3 = st.columns(3)
             
-            opts = [new_unidad]
-            if new_unidad == 'kg': opts = ['kg', 'gr']
-            elif new_unidad == 'gr': opts = ['gr', 'kg']
-            elif new_unidad == 'lt': opts = ['lt', 'ml', 'cc']
-            elif new_unidad == 'ml': opts = ['ml', 'lt']
-            elif new_unidad == 'unidades': opts = ['unidades']
+            opts = unidades.opciones(new_unidad)
             
             with c_form2: uni_ref = st.selectbox("Unidad del envase", opts, key="n_u")
             with c_form1: 
@@ -1068,16 +1274,17 @@ def main_app():
             
             if st.button("💾 Crear Ficha"):
                 if new_nombre:
-                    cant_norm = normalizar_cantidad(cant_ref, uni_ref, new_unidad) if uni_ref != new_unidad else cant_ref
+                    cant_norm = convertir_uno(cant_ref, uni_ref, new_unidad)
                     if cant_norm and cant_norm > 0:
                         costo_base_calc = precio_ref / cant_norm
                         try:
-                            supabase.table('insumos').insert({
+                            nuevo = supabase.table('insumos').insert({
                                 "nombre": new_nombre, 
                                 "unidad_medida": new_unidad, 
                                 "stock_actual": 0, 
                                 "costo_unitario": costo_base_calc
-                            }).execute()
+                            }).execute().data
+                            if nuevo: compras.guardar_envase(supabase, nuevo[0]['id'], cant_norm, precio_ref, cant_ref, uni_ref)
                             st.success(f"✅ Creado: {new_nombre}")
                             time.sleep(1.5)
                             st.rerun()
@@ -1086,15 +1293,20 @@ def main_app():
         # ---------------------------------------------------------
         # TAB 3: ACTUALIZAR PRECIOS
         # ---------------------------------------------------------
-        with tab_precios:
+        with tab_precios, seccion("Actualizar Precios"):
             st.subheader("💲 Actualizador de Precios")
             if insumos_existentes:
                 col_sel, col_calc = st.columns([1, 2])
                 with col_sel:
-                    insumo_upd = st.selectbox("Selecciona Producto", insumos_existentes, index=None)
+                    insumo_upd = selector_busqueda("Selecciona Producto", 'insumos', insumos_existentes, key="p_sel_ins")
                     if insumo_upd:
                         d = mapa_insumos[insumo_upd]
                         st.info(f"Unidad: **{d['unidad_medida']}**\nCosto: **${d['costo_unitario']:,.2f}**")
+                        if d.get('ultimo_precio'): st.caption(f"Último precio: ${d['ultimo_precio']:,.2f} / {d['unidad_medida']}")
+                        serie = leer_historial_precios().serie(d['id'])
+                        if len(serie) > 1:
+                            st.caption("📈 Historial de costo")
+                            st.line_chart(serie, x='vigente_desde', y='costo_unitario', height=160)
                 
                 with col_calc:
                     if insumo_upd:
@@ -1102,12 +1314,7 @@ def main_app():
                         c_p1, c_p2, c_p3 = st.columns([1.5, 1, 1.5])
                         
                         u_base = mapa_insumos[insumo_upd]['unidad_medida']
-                        opts_p = [u_base]
-                        if u_base == 'kg': opts_p = ['kg', 'gr']
-                        elif u_base == 'gr': opts_p = ['gr', 'kg']
-                        elif u_base == 'lt': opts_p = ['lt', 'ml', 'cc']
-                        elif u_base == 'ml': opts_p = ['ml', 'lt']
-                        elif u_base == 'unidades': opts_p = ['unidades']
+                        opts_p = unidades.opciones(u_base)
                         
                         with c_p2: uni_envase = st.selectbox("Unidad", opts_p, key="p_u")
                         with c_p1: 
@@ -1117,34 +1324,106 @@ def main_app():
                                 cant_envase = st.number_input("Contenido", min_value=0.0, value=1.0, format="%.2f", step=0.1, key="p_c")
                         with c_p3: precio_envase = st.number_input("Precio Total ($)", min_value=0, value=0, step=1000, key="p_p")
                         
-                        cant_norm_p = normalizar_cantidad(cant_envase, uni_envase, u_base) if uni_envase != u_base else cant_envase
+                        cant_norm_p = convertir_uno(cant_envase, uni_envase, u_base)
                         if cant_norm_p and cant_norm_p > 0 and precio_envase > 0:
                             nuevo_costo_base = precio_envase / cant_norm_p
                             if u_base == 'gr' and cant_envase < 1 and uni_envase == 'gr':
                                 st.warning("⚠️ Cuidado: Pusiste menos de 1 gramo.")
                             st.success(f"💡 El **{u_base}** vale **${nuevo_costo_base:,.2f}**")
+                            # Es el precio de mercado: el costo de las recetas lo mantienen las compras (costeo.py)
                             if st.button("💾 Actualizar Precio Base", type="primary"):
-                                supabase.table('insumos').update({"costo_unitario": nuevo_costo_base}).eq('id', mapa_insumos[insumo_upd]['id']).execute()
+                                supabase.table('insumos').update({"ultimo_precio": nuevo_costo_base}).eq('id', mapa_insumos[insumo_upd]['id']).execute()
+                                compras.guardar_envase(supabase, mapa_insumos[insumo_upd]['id'], cant_norm_p, precio_envase, cant_envase, uni_envase)
                                 st.rerun()
 
+                # --- IMPORTACIÓN MASIVA DESDE LISTA DEL PROVEEDOR ---
+                with st.expander("📥 Importar Lista de Precios del Proveedor"):
+                    st.caption("CSV con columnas: nombre, contenido, unidad, precio (precio del envase completo).")
+                    archivo_lista = st.file_uploader("Lista del proveedor", type=["csv", "txt"], key="lp_archivo")
+                    if archivo_lista:
+                        try:
+                            lista = lista_precios.leer_lista_proveedor(archivo_lista)
+                            preview = lista_precios.vista_previa(lista, list(mapa_insumos.values()))
+                        except Exception as e:
+                            st.error(f"No se pudo leer la lista: {e}")
+                            preview = None
+
+                        if preview is not None:
+                            c_ok, c_sin, c_inc = st.columns(3)
+                            c_ok.metric("Coinciden", int(preview['estado'].eq('OK').sum()))
+                            c_sin.metric("Sin coincidencia", int(preview['estado'].eq('Sin coincidencia').sum()))
+                            c_inc.metric("Con problemas", int((~preview['estado'].isin(['OK', 'Sin coincidencia'])).sum()))
+
+                            editado = st.data_editor(
+                                preview[['aplicar', 'nombre', 'insumo', 'coincidencia', 'contenido', 'unidad', 'precio',
+                                         'unidad_medida', 'costo_unitario', 'precio_actual', 'precio_nuevo', 'variacion_pct', 'estado']],
+                                column_config={
+                                    "aplicar": st.column_config.CheckboxColumn("Aplicar"),
+                                    "nombre": "Proveedor", "insumo": "Insumo ERP",
+                                    "coincidencia": st.column_config.ProgressColumn("Coincidencia", min_value=0, max_value=1),
+                                    "costo_unitario": st.column_config.NumberColumn("Costo", format="$%.2f"),
+                                    "precio_actual": st.column_config.NumberColumn("Precio Actual", format="$%.2f"),
+                                    "precio_nuevo": st.column_config.NumberColumn("Precio Nuevo", format="$%.2f"),
+                                    "variacion_pct": st.column_config.NumberColumn("Variación", format="%.1f%%"),
+                                },
+                                disabled=[c for c in preview.columns if c != 'aplicar'],
+                                hide_index=True, use_container_width=True, key="lp_editor"
+                            )
+                            preview['aplicar'] = editado['aplicar']
+                            filas = lista_precios.filas_actualizacion(preview, list(mapa_insumos.values()))
+
+                            if st.button(f"💾 Aplicar {len(filas)} cambios de precio", type="primary", disabled=not filas):
+                                try:
+                                    supabase.rpc('actualizar_precios', {"p_filas": filas}).execute()
+                                    st.success(f"✅ {len(filas)} precios actualizados.")
+                                    time.sleep(1.5)
+                                    st.rerun()
+                                except Exception as e: st.error(f"Error: {e}")
+
                 st.divider()
-                df_view = pd.DataFrame(list(mapa_insumos.values()))
-                if not df_view.empty:
-                    st.dataframe(df_view[['nombre', 'unidad_medida', 'costo_unitario']], use_container_width=True)
+                grilla_insumos('grilla_precios', ['nombre', 'unidad_medida', 'costo_unitario', 'ultimo_precio'], {
+                    "costo_unitario": st.column_config.NumberColumn("Costo", format="$%.2f"),
+                    "ultimo_precio": st.column_config.NumberColumn("Último precio", format="$%.2f"),
+                })
 
         # ---------------------------------------------------------
         # TAB 4: VER Y AJUSTAR STOCK
         # ---------------------------------------------------------
-        with tab_stock:
+        with tab_stock, seccion("Ver y Ajustar Stock"):
             st.subheader("Control de Bodega")
-            
+
+            with st.expander("🌙 Liquidación de Stock (Fin del Día)"):
+                st.caption("Descuenta de una vez los insumos de todos los pedidos entregados desde la última liquidación "
+                           "y repone los de pedidos ya liquidados que se cancelaron. Se puede repetir sin duplicar.")
+                if supabase:
+                    estado_liq = leer_varios({
+                        'liquidacion.entregas': ('pedidos', liquidacion.consulta_entregas),
+                        'liquidacion.reversos': ('pedidos', liquidacion.consulta_reversos),
+                        'liquidacion.ultima': ('liquidaciones', liquidacion.consulta_ultima),
+                    })
+                    entregas, reversos = estado_liq['liquidacion.entregas'], estado_liq['liquidacion.reversos']
+                    ult = next(iter(estado_liq['liquidacion.ultima']), None)
+                    c_pend, c_ult = st.columns(2)
+                    c_pend.metric("Pendientes", len(entregas), help=f"{len(reversos)} devoluciones por revertir" if reversos else None)
+                    if ult: c_ult.metric("Última liquidación", f"#{ult['id']}", help=f"{str(ult['creada_en'])[:16]} · {ult['pedidos']} pedidos")
+                    if st.button("🌙 Liquidar Ahora", disabled=not (entregas or reversos), use_container_width=True):
+                        try:
+                            res = liquidar_stock()
+                            if res:
+                                st.success(f"✅ Liquidación #{res['id']}: {len(res['pedidos'])} pedidos, "
+                                           f"{len(res['consumo'])} insumos, costo ${res['costo']:,.0f}")
+                                if res['consumo']:
+                                    st.dataframe(pd.DataFrame(res['consumo'])[['nombre', 'cantidad']], hide_index=True)
+                        except Exception as ex:
+                            st.error(f"Error en la liquidación: {ex}")
+
             with st.expander("➕ Agregar / Ajustar Stock Manualmente", expanded=True):
                 st.caption("Usa esto para agregar sobras (ej: 'me quedan 200gr') o corregir el inventario sin registrar gasto.")
                 
                 c_aj_1, c_aj_2 = st.columns([2, 2])
                 
                 with c_aj_1:
-                    item_ajuste = st.selectbox("Producto", insumos_existentes, index=None, key="aj_item")
+                    item_ajuste = selector_busqueda("Producto", 'insumos', insumos_existentes, key="aj_item")
                 
                 if item_ajuste:
                     dat_aj = mapa_insumos[item_ajuste]
@@ -1153,12 +1432,7 @@ def main_app():
                     with c_aj_2:
                         tipo_ajuste = st.radio("Acción", ["➕ Sumar al stock", "📌 Fijar stock total"], horizontal=True, label_visibility="collapsed")
                     
-                    opts_aj = [u_base]
-                    if u_base == 'kg': opts_aj = ['kg', 'gr']
-                    elif u_base == 'gr': opts_aj = ['gr', 'kg']
-                    elif u_base == 'lt': opts_aj = ['lt', 'ml', 'cc']
-                    elif u_base == 'ml': opts_aj = ['ml', 'lt']
-                    elif u_base == 'unidades': opts_aj = ['unidades']
+                    opts_aj = unidades.opciones(u_base)
                     
                     c_aj_3, c_aj_4 = st.columns([1.5, 1.5])
                     
@@ -1171,7 +1445,7 @@ def main_app():
                         else:
                             cant_ajuste = st.number_input("Cantidad", min_value=0.0, value=1.0, format="%.2f", step=0.1, key="aj_cant")
                     
-                    cant_norm_aj = normalizar_cantidad(cant_ajuste, uni_ajuste, u_base) if uni_ajuste != u_base else cant_ajuste
+                    cant_norm_aj = convertir_uno(cant_ajuste, uni_ajuste, u_base)
                     
                     if cant_norm_aj is not None:
                         nuevo_stock = 0
@@ -1187,7 +1461,10 @@ def main_app():
                         stock_display = mostrar_cantidad(nuevo_stock, u_base)
                         
                         if st.button(f"💾 Guardar: Stock quedará en {stock_display} {u_base}", use_container_width=True):
-                            supabase.table('insumos').update({"stock_actual": nuevo_stock}).eq('id', dat_aj['id']).execute()
+                            # La diferencia se calcula en la base sobre el stock vigente y mueve también los lotes
+                            nuevo_stock = costeo.ajustar_stock(supabase, dat_aj['id'], cant_norm_aj,
+                                                               fijar=tipo_ajuste != "➕ Sumar al stock", metodo=METODO_COSTEO)
+                            stock_display = mostrar_cantidad(nuevo_stock, u_base)
                             st.success(f"✅ {msg_accion}. Nuevo total: {stock_display} {u_base}")
                             time.sleep(1.5)
                             st.rerun()
@@ -1195,16 +1472,55 @@ def main_app():
             st.divider()
             
             if insumos_existentes:
-                df = pd.DataFrame(list(mapa_insumos.values()))
-                st.dataframe(df[['nombre', 'stock_actual', 'unidad_medida', 'costo_unitario']], use_container_width=True)
+                valor = st.empty()
+                resumen = grilla_insumos('grilla_stock', ['nombre', 'stock_actual', 'unidad_medida', 'costo_unitario'], {
+                    "costo_unitario": st.column_config.NumberColumn("Costo", format="$%.2f"),
+                })
+                valor.metric("💰 Valor del Inventario", f"${resumen['valor']:,.0f}",
+                             help=f"Stock valorizado a costo {'FIFO' if METODO_COSTEO == 'fifo' else 'promedio ponderado'}, "
+                                  "de los insumos que deja el filtro")
                 
                 with st.popover("🗑️ Borrar Insumo"):
                     to_del = st.selectbox("Eliminar permanentemente:", insumos_existentes, index=None)
                     if to_del:
                         if st.button(f"Confirmar Borrado de {to_del}"):
-                            supabase.table('insumos').delete().eq('nombre', to_del).execute()
-                            st.rerun()
+                            if respaldar_antes(f"antes de borrar insumo {to_del}", ['insumos', 'lotes_insumo', 'envases_insumo', 'precios_insumo']):
+                                supabase.table('insumos').delete().eq('nombre', to_del).execute()
+                                st.rerun()
                             
+        # ---------------------------------------------------------
+        # TAB 5: LISTA DE COMPRAS
+        # ---------------------------------------------------------
+        with tab_lista, seccion("Lista de Compras"):
+            st.subheader("🧾 Lista de Compras")
+            st.caption("Lo que piden los pedidos abiertos (y las entregas aún sin liquidar) menos el stock, "
+                       "comprado con la combinación de envases más barata. Los envases se guardan al registrar "
+                       "compras y actualizar precios.")
+            if supabase and st.button("🧮 Calcular Lista", use_container_width=True):
+                try:
+                    falt = compras.faltantes(supabase)
+                    st.session_state.lista_compras = (falt, *compras.lista_compras(falt, compras.envases(supabase)))
+                except Exception as e:
+                    st.error(f"Error: {e}")
+            if 'lista_compras' in st.session_state:
+                falt, lista, total = st.session_state.lista_compras
+                if falt.empty:
+                    st.success("✅ El stock alcanza para todos los pedidos abiertos.")
+                else:
+                    c_f, c_t = st.columns(2)
+                    c_f.metric("Insumos por comprar", len(falt))
+                    c_t.metric("💰 Gasto Total", f"${total:,.0f}",
+                               help="Incluye estimaciones a costo unitario para insumos sin envases registrados"
+                               if lista['estimado'].any() else None)
+                    st.dataframe(lista, hide_index=True, use_container_width=True, column_config={
+                        "faltante": st.column_config.NumberColumn("Faltante", format="%.3f"),
+                        "comprado": st.column_config.NumberColumn("Comprado", format="%.3f"),
+                        "costo": st.column_config.NumberColumn("Costo", format="$%.0f"),
+                        "estimado": st.column_config.CheckboxColumn("Sin envase"),
+                    })
+                    if lista['estimado'].any():
+                        st.caption("⚠️ Los insumos marcados no tienen envases registrados: van a granel con su costo unitario.")
+
     # ==========================================
     # ⚙️ CONFIGURACIÓN (V3: CORRECCIÓN DE TABLA 'GASTOS')
     # ==========================================
@@ -1214,11 +1530,102 @@ def main_app():
         
         st.divider()
         st.subheader("👥 Usuarios")
+        if supabase:
+            usuarios = leer_vista('config.usuarios')
+            if not usuarios.empty: st.dataframe(usuarios, hide_index=True, use_container_width=True)
+
+        st.divider()
+        st.subheader("👤 Directorio de Clientes")
+        st.caption("Crea los clientes a partir de los pedidos antiguos (un cliente por teléfono) y los enlaza.")
+        if st.button("🔗 Generar Clientes desde Pedidos"):
+            try:
+                n_cli, n_ped = clientes.migrar_clientes(supabase)
+                st.success(f"✅ {n_cli} clientes, {n_ped} pedidos enlazados.")
+            except Exception as e:
+                st.error(f"Error: {e}")
+
+        st.divider()
+        st.subheader("📒 Libro Contable")
+        st.caption("Traspasa el historial de la tabla 'gastos' al libro. Las filas 'Venta Pedido' quedan como ventas, no como compras. Se puede repetir sin duplicar.")
+        if st.button("🔁 Reclasificar Gastos Históricos"):
+            try:
+                n = libro.reclasificar_gastos(supabase)
+                st.success(f"✅ {n} movimientos traspasados al libro.")
+            except Exception as e:
+                st.error(f"Error: {e}")
+
+        st.divider()
+        st.subheader("⏱️ Perfilador")
+        st.caption("Mide cuánto tarda cada sección de la pantalla en los próximos reruns (también con ?perfil=1 o ?perfil=muestreo en la URL).")
+        modos = {None: "Apagado", 'secciones': "Secciones", 'muestreo': "Secciones + muestreo de la pila"}
+        if st.session_state.rol_actual == 'Admin':
+            # El widget se borra al salir de la pantalla: el modo se guarda en otra clave
+            st.selectbox("Modo", list(modos), index=list(modos).index(st.session_state.get('perfil_modo')),
+                         format_func=modos.get, key="perfil_modo_sel",
+                         on_change=lambda: st.session_state.update(perfil_modo=st.session_state.perfil_modo_sel))
+        historial = list(st.session_state.get('perfil_historial', []))
+        if historial:
+            st.caption(f"Últimos {len(historial)} reruns medidos (el actual no se incluye).")
+            df_perfil = pd.DataFrame(perfil.resumen(historial))
+            df_perfil['seccion'] = ["  " * n + s for n, s in zip(df_perfil['nivel'], df_perfil['seccion'].str.split(perfil.SEPARADOR).str[-1])]
+            st.dataframe(df_perfil.drop(columns='nivel'), hide_index=True, use_container_width=True)
+            categorias = perfil.por_categoria(historial)
+            if categorias:
+                st.markdown("**Tiempo muestreado por categoría**")
+                st.dataframe(pd.DataFrame(categorias), hide_index=True, use_container_width=True)
+            c_exp, c_limpiar = st.columns(2)
+            c_exp.download_button("⬇️ Exportar para speedscope", json.dumps(perfil.speedscope(historial)),
+                                  file_name=f"perfil_{datetime.now():%Y%m%d_%H%M}.speedscope.json", mime="application/json")
+            if c_limpiar.button("🧹 Limpiar mediciones"):
+                st.session_state.perfil_historial.clear()
+                st.rerun()
+
+        st.divider()
+        st.subheader("💾 Respaldos")
+        st.caption(f"Copia de todas las tablas en Parquet comprimido, página por página, en '{respaldos.DIR_RESPALDOS}'. "
+                   "Se crea uno automáticamente antes de cada borrado.")
+        if st.button("💾 Crear Respaldo Ahora"):
+            try:
+                carpeta = respaldos.crear(supabase, "manual")
+                st.success(f"✅ Respaldo creado: {carpeta.name}")
+            except Exception as e:
+                st.error(f"Error: {e}")
+        lista_respaldos = respaldos.listar()
+        if lista_respaldos:
+            st.dataframe(pd.DataFrame([{
+                "respaldo": c.name, "creado": m['creado'], "motivo": m['motivo'],
+                "tablas": len(m['tablas']), "filas": sum(t['filas'] for t in m['tablas'].values()),
+            } for c, m in lista_respaldos]), hide_index=True, use_container_width=True)
+            with st.expander("♻️ Restaurar un Respaldo"):
+                st.warning("Reemplaza el contenido de las tablas elegidas por el del respaldo (antes se respalda lo actual).")
+                elegido = st.selectbox("Respaldo", [c for c, _ in lista_respaldos], format_func=lambda c: c.name, key="resp_sel")
+                tablas_resp = list(respaldos.manifiesto(elegido)['tablas'])
+                tablas_sel = st.multiselect("Tablas", tablas_resp, default=tablas_resp, key="resp_tablas")
+                extra = [t for t in respaldos.con_dependientes(tablas_sel) if t not in tablas_sel] if tablas_sel else []
+                if extra: st.caption(f"También se restauran las tablas que dependen de ellas: {', '.join(extra)}")
+                if st.checkbox("Confirmar restauración", key="chk_resp") and st.button("♻️ RESTAURAR"):
+                    try:
+                        restauradas, previo = servicios.restaurar_respaldo(supabase, elegido, tablas_sel)
+                        st.success(f"✅ {sum(restauradas.values())} filas restauradas en {len(restauradas)} tablas "
+                                   f"(respaldo previo: {previo.name}).")
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+
+        st.divider()
+        st.subheader("🗄️ Archivo de Pedidos")
+        st.caption("Mueve los pedidos entregados (ya liquidados) y cancelados con entrega anterior a los días indicados "
+                   "a 'pedidos_historicos'. El tablero y sus consultas quedan livianos; los totales del dashboard no cambian.")
+        c_dias, c_arch = st.columns([1, 2])
+        dias_archivo = c_dias.number_input("Días que quedan activos", min_value=0, value=archivo.DIAS_ARCHIVO, step=1)
         if supabase:
             try:
-                usuarios = supabase.table('usuarios').select("*").execute().data
-                if usuarios: st.dataframe(pd.DataFrame(usuarios)[['nombre', 'username', 'rol']], hide_index=True, use_container_width=True)
-            except: pass
+                n_arch = archivo.archivables(supabase, int(dias_archivo))
+                c_arch.metric("Listos para archivar", n_arch)
+                if n_arch and st.button("🗄️ Archivar Pedidos Cerrados"):
+                    movidos = archivo.archivar(supabase, int(dias_archivo))
+                    st.success(f"✅ {movidos} pedidos archivados.")
+            except Exception as e:
+                st.error(f"Error: {e}")
 
         st.divider()
         
@@ -1231,10 +1638,13 @@ def main_app():
                 st.warning("Borra todos los insumos y stock.")
                 if st.checkbox("Confirmar borrado inventario", key="chk_inv_del"):
                     if st.button("💣 EJECUTAR BORRADO INV"):
-                        supabase.table('insumos').delete().neq('id', 0).execute()
-                        st.success("Inventario Reiniciado")
-                        time.sleep(2)
-                        st.rerun()
+                        try:
+                            carpeta = servicios.borrar_inventario(supabase)
+                            st.success(f"Inventario Reiniciado (respaldo: {carpeta.name})")
+                            time.sleep(2)
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error: {e}")
 
         with c2:
             with st.expander("💰 Borrar Historial Financiero"):
@@ -1242,16 +1652,27 @@ def main_app():
                 if st.checkbox("Confirmar borrado financiero", key="chk_fin_del"):
                     if st.button("💣 EJECUTAR BORRADO FINANZAS"):
                         try:
-                            # CORRECCIÓN AQUÍ: 'gastos' en lugar de 'transacciones'
-                            supabase.table('gastos').delete().neq('id', 0).execute()
-                            st.success("Historial Financiero Reiniciado")
+                            carpeta = servicios.borrar_finanzas(supabase)
+                            st.success(f"Historial Financiero Reiniciado (respaldo: {carpeta.name})")
                             time.sleep(2)
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error: {e}")
 
 # --- ARRANQUE ---
-if not st.session_state.authenticated:
-    login_screen()
-else:
-    main_app()
\ No newline at end of file
+_modo = modo_perfil()
+_perfil = perfil.Perfilador(muestreo=_modo == 'muestreo', raiz=__file__) if _modo else perfil.NULO
+st.session_state._perfilador = _perfil
+try:
+    with _perfil.rerun():
+        if not st.session_state.authenticated:
+            login_screen()
+        else:
+            if supabase:
+                with seccion("BD versiones"):
+                    VERSIONES = CacheVersionada.versiones(supabase)
+            main_app()
+finally:
+    # st.rerun() corta con una excepción: el rerun cuenta igual
+    if _perfil.resultado:
+        st.session_state.setdefault('perfil_historial', deque(maxlen=HISTORIAL_PERFIL)).append(_perfil.resultado)
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""Simulación de precios para todo el catálogo a la vez.
+
+La fórmula de precio del editor de recetas (merma, gastos operacionales, mano de obra,
+maquinaria, ganancia y empaque) se evalúa con NumPy para una grilla de escenarios × todas
+las variaciones en una sola pasada:
+
+    costo_ing[v, s] = recetas[v, :] @ (costos[:] * alzas[s, :])
+    precio[v, s]    = ((costo_ing·(1+merma)·(1+ops) + mano_obra)·(1+maq))·(1+margen) + empaque
+
+Las alzas de insumos ("mantequilla +20%") son un multiplicador por insumo y escenario.
+Mano de obra y empaque son por unidad vendida, salvo en las recetas por lote (rendimiento
+mayor que 1), donde son del lote completo y se reparten entre sus unidades, como en el editor.
+"""
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+
+from unidades import convertir
+
+PARAMETROS = ('merma', 'ops', 'mano_obra', 'maquinaria', 'margen', 'empaque')
+# Los mismos valores por defecto de los sliders del editor
+DEFECTOS = {'merma': 5, 'ops': 15, 'mano_obra': 6400, 'maquinaria': 5, 'margen': 60, 'empaque': 3000}
+MARGEN_OBJETIVO = 30   # % de margen bruto sobre el precio de venta
+
+
+def desglose(costo_insumos, merma, ops, mano_obra, maquinaria, margen, empaque, rendimiento=1):
+    """Precio final y sus componentes. Acepta escalares o arreglos que se puedan combinar (broadcasting).
+
+    `costo_insumos`, `mano_obra` y `empaque` son del lote que rinde `rendimiento` unidades;
+    el precio y los componentes se devuelven por unidad.
+    """
+    val_merma = costo_insumos * (merma / 100)
+    sub1 = costo_insumos + val_merma
+    val_ops = sub1 * (ops / 100)
+    sub3 = sub1 + val_ops + mano_obra
+    val_maq = sub3 * (maquinaria / 100)
+    sub4 = sub3 + val_maq
+    val_ganancia = sub4 * (margen / 100)
+    final = sub4 + val_ganancia + empaque
+    partes = {
+        "insumos": costo_insumos, "merma": val_merma, "ops": val_ops,
+        "mo": mano_obra, "maq": val_maq, "ganancia": val_ganancia, "empaque": empaque,
+    }
+    return final / rendimiento, {k: v / rendimiento for k, v in partes.items()}
+
+
+# --- RECETAS COMO MATRIZ ---
+
+class Recetas:
+    """Catálogo como matriz: cantidad de cada insumo (en su unidad de inventario) por unidad vendida.
+
+    `fijo` es el costo por unidad de las líneas cuyo insumo ya no existe (se usa el costo
+    guardado en la receta, igual que el editor). `rendimientos`: unidades por lote (1 si no es
+    receta por lote).
+    """
+
+    def __init__(self, variaciones, insumos):
+        self.ids = np.array([v['id'] for v in variaciones], dtype=np.int64)
+        self.nombres = [v['nombre'] for v in variaciones]
+        self.precios = np.array([v.get('precio') or 0 for v in variaciones], dtype=float)
+        rendimientos = np.array([v.get('rendimiento') or 1 for v in variaciones], dtype=float)
+        self.rendimientos = np.where(rendimientos > 0, rendimientos, 1.0)
+        self.insumos = [i['nombre'] for i in insumos]
+        self.insumo_ids = np.array([i.get('id') or 0 for i in insumos], dtype=np.int64)
+        self.costos = np.array([i.get('costo_unitario') or 0 for i in insumos], dtype=float)
+        col = {n: k for k, n in enumerate(self.insumos)}
+        unidad = {i['nombre']: i['unidad_medida'] for i in insumos}
+
+        fila, nombre, cant, uni, rend, costo = [], [], [], [], [], []
+        for v_idx, v in enumerate(variaciones):
+            try: ings = json.loads(v.get('ingredientes_json') or '[]')
+            except ValueError: continue
+            for ing in ings:
+                fila.append(v_idx); nombre.append(ing['nombre']); cant.append(ing.get('cantidad') or 0)
+                uni.append(ing.get('unidad')); rend.append(v.get('rendimiento') or 1); costo.append(ing.get('costo') or 0)
+        fila = np.array(fila, dtype=np.int64)
+        k = np.array([col.get(n, -1) for n in nombre], dtype=np.int64)
+        rend = np.array(rend, dtype=float)
+        existe = k >= 0
+
+        # Cantidad por unidad vendida (0 si la unidad no es convertible, como en costeo.costo_lineas)
+        por_unidad = np.nan_to_num(convertir(cant, uni, [unidad.get(n, '') for n in nombre], rend))
+        self.matriz = np.zeros((len(variaciones), len(insumos)))
+        np.add.at(self.matriz, (fila[existe], k[existe]), por_unidad[existe])
+        self.fijo = np.zeros(len(variaciones))
+        np.add.at(self.fijo, fila[~existe], (np.array(costo, dtype=float) / np.where(rend > 0, rend, 1))[~existe])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def costo_ingredientes(self, alzas=None):
+        """Costo de ingredientes por unidad. Con `alzas` (escenarios × insumos) devuelve (variaciones × escenarios)."""
+        if alzas is None: return self.matriz @ self.costos + self.fijo
+        return self.matriz @ (self.costos * alzas).T + self.fijo[:, None]
+
+
+# --- ESCENARIOS ---
+
+def grilla(alzas=None, **valores):
+    """Producto cartesiano de valores por parámetro. Los que no se indican quedan en DEFECTOS.
+
+    `alzas`: lista de {nombre_insumo: multiplicador} (p. ej. [{}, {'Mantequilla': 1.2}]),
+    también es una dimensión de la grilla. Devuelve un DataFrame con una fila por escenario.
+    """
+    desconocidos = set(valores) - set(PARAMETROS)
+    if desconocidos: raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+    ejes = [np.atleast_1d(valores.get(p, DEFECTOS[p])) for p in PARAMETROS] + [list(range(len(alzas or [{}])))]
+    filas = list(itertools.product(*ejes))
+    df = pd.DataFrame(filas, columns=list(PARAMETROS) + ['alza'])
+    df['alza'] = [etiqueta_alza((alzas or [{}])[i]) for i in df['alza']]
+    df.attrs['alzas'] = [(alzas or [{}])[f[-1]] for f in filas]
+    return df
+
+
+def etiqueta_alza(alza):
+    if not alza: return "sin cambios"
+    return ", ".join(f"{n} {(m - 1) * 100:+.0f}%" for n, m in alza.items())
+
+
+def _matriz_alzas(recetas, alzas):
+    """(escenarios × insumos) con los multiplicadores; los insumos que no existen se ignoran."""
+    col = {n: k for k, n in enumerate(recetas.insumos)}
+    unicas = {}
+    idx = np.empty(len(alzas), dtype=np.int64)
+    for s, alza in enumerate(alzas):
+        clave = tuple(sorted(alza.items()))
+        idx[s] = unicas.setdefault(clave, len(unicas))
+    base = np.ones((len(unicas), len(recetas.insumos)))
+    for clave, u in unicas.items():
+        for nombre, mult in clave:
+            if nombre in col: base[u, col[nombre]] = mult
+    return base, idx
+
+
+def evaluar(recetas, escenarios, objetivo=MARGEN_OBJETIVO):
+    """Evalúa todos los escenarios sobre todas las variaciones.
+
+    Devuelve matrices (variaciones × escenarios):
+    - `precio`: precio sugerido por la fórmula del editor
+    - `costo`: costo total por unidad sin ganancia (incluye empaque)
+    - `margen`: margen bruto % si se sigue vendiendo al precio actual
+    - `bajo`: margen menor que `objetivo`
+    """
+    alzas = escenarios.attrs.get('alzas') or [{}] * len(escenarios)
+    base, idx = _matriz_alzas(recetas, alzas)
+    # Solo se multiplica por matriz una vez por alza distinta, no por escenario
+    costo_ing = recetas.costo_ingredientes(base)[:, idx]
+    p = {c: escenarios[c].to_numpy(dtype=float)[None, :] for c in PARAMETROS}
+    # En recetas por lote mano de obra y empaque son del lote: se evalúa el lote y se divide
+    lote = recetas.rendimientos[:, None]
+    precio, partes = desglose(costo_ing * lote, p['merma'], p['ops'], p['mano_obra'], p['maquinaria'], p['margen'],
+                              p['empaque'], lote)
+    costo = precio - partes['ganancia']
+    actual = recetas.precios[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margen = np.where(actual > 0, (actual - costo) / actual * 100, np.nan)
+    return {"precio": precio, "costo": costo, "margen": margen, "bajo": ~(margen >= objetivo)}
+
+
+def resumen(recetas, escenarios, resultado):
+    """Una fila por escenario: variaciones bajo el objetivo, margen medio y alza de precio sugerida media."""
+    df = escenarios.copy()
+    df['bajo_objetivo'] = resultado['bajo'].sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        df['margen_medio'] = np.round(np.nanmean(resultado['margen'], axis=0), 1) if len(recetas) else np.nan
+        actual = recetas.precios[:, None]
+        alza = np.where(actual > 0, (resultado['precio'] / actual - 1) * 100, np.nan)
+        df['alza_precio_media'] = np.round(np.nanmean(alza, axis=0), 1) if len(recetas) else np.nan
+    return df
+
+
+def detalle(recetas, resultado, escenario):
+    """Variaciones de un escenario, con las que quedan bajo el objetivo primero."""
+    return pd.DataFrame({
+        "id": recetas.ids, "variacion": recetas.nombres, "precio_actual": recetas.precios,
+        "costo": np.round(resultado['costo'][:, escenario]), "precio_sugerido": np.round(resultado['precio'][:, escenario]),
+        "margen": np.round(resultado['margen'][:, escenario], 1), "bajo_objetivo": resultado['bajo'][:, escenario],
+    }).sort_values(['bajo_objetivo', 'margen'], ascending=[False, True]).reset_index(drop=True)
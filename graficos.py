@@ -0,0 +1,129 @@
+"""Datos de los gráficos del dashboard: agregados, con pocos puntos y cacheados por versión.
+
+Cada serie se agrega a la granularidad más fina (día, semana, mes, trimestre, año) que deje
+como máximo MAX_PUNTOS puntos en el rango elegido. Con mes o más gruesa se parte de
+`saldos_cuenta`; con día o semana, de `movimientos` del rango. El resultado se guarda en
+memoria con la versión de `saldos_cuenta` como clave (las funciones del libro la actualizan
+en la misma transacción que los movimientos), así que no se recalcula en cada rerun.
+
+Además se publica como JSON en `static/graficos/` con un nombre derivado del contenido: el
+gráfico solo lleva la URL y el navegador lo descarga una vez (necesita
+`server.enableStaticServing`; si no está activo, los datos van dentro del gráfico).
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+import libro
+from conexion import leer_paginado
+
+MAX_PUNTOS = 90
+MAX_ENTRADAS = 64        # series guardadas en memoria (LRU)
+MAX_ARCHIVOS = 200       # archivos en static/graficos
+DIR_PUBLICO = Path(__file__).parent / 'static' / 'graficos'
+URL_PUBLICA = "app/static/graficos"
+
+# nombre -> (regla de pandas para agrupar, días aproximados por punto)
+GRANULARIDADES = {
+    'dia': ('D', 1), 'semana': ('W-MON', 7), 'mes': ('MS', 30.44), 'trimestre': ('QS', 91.3), 'año': ('YS', 365.25),
+}
+TIPOS = {'ventas': 'Venta', 'compras': 'Gasto', 'ajustes': 'Gasto'}
+
+
+def granularidad(desde, hasta, max_puntos=MAX_PUNTOS):
+    """La más fina que no pasa de `max_puntos` puntos entre `desde` y `hasta`."""
+    dias = (hasta - desde).days + 1
+    for nombre, (_, tam) in GRANULARIDADES.items():
+        if dias / tam <= max_puntos: return nombre
+    return 'año'
+
+
+def _movimientos(db, desde, hasta):
+    return list(leer_paginado(db, 'movimientos', "fecha, cuenta, debe, haber", filtro=lambda q: q.in_(
+        'cuenta', list(TIPOS)).gte('fecha', str(desde)).lte('fecha', str(hasta))))
+
+
+def _con_signo(df):
+    ingreso = df['cuenta'].map(libro.CUENTAS).eq('ingreso')
+    debe, haber = df['debe'].astype(float), df['haber'].astype(float)
+    return (debe - haber).where(~ingreso, haber - debe)
+
+
+def agregar(df, gran):
+    """`df` con fecha, cuenta, monto → periodo, tipo, monto con un punto por periodo y tipo."""
+    if df.empty: return pd.DataFrame(columns=['periodo', 'tipo', 'monto'])
+    df = df.assign(tipo=df['cuenta'].map(TIPOS), fecha=pd.to_datetime(df['fecha'])).dropna(subset=['tipo'])
+    regla = GRANULARIDADES[gran][0]
+    out = df.groupby(['tipo', pd.Grouper(key='fecha', freq=regla, label='left', closed='left')])['monto'].sum().reset_index()
+    out = out.rename(columns={'fecha': 'periodo'})
+    out['periodo'] = out['periodo'].dt.strftime('%Y-%m-%d')
+    return out[['periodo', 'tipo', 'monto']].sort_values(['periodo', 'tipo']).reset_index(drop=True)
+
+
+def serie_financiera(db, desde, hasta, gran):
+    """Ventas y gastos por periodo entre `desde` y `hasta`."""
+    if gran in ('dia', 'semana'):
+        df = pd.DataFrame(_movimientos(db, desde, hasta), columns=['fecha', 'cuenta', 'debe', 'haber'])
+    else:
+        filas = db.table('saldos_cuenta').select("cuenta, mes, debe, haber").in_('cuenta', list(TIPOS)) \
+            .gte('mes', f"{desde:%Y-%m}").lte('mes', f"{hasta:%Y-%m}").execute().data
+        df = pd.DataFrame(filas, columns=['cuenta', 'mes', 'debe', 'haber'])
+        df['fecha'] = df['mes'] + '-01'
+    df['monto'] = _con_signo(df) if not df.empty else []
+    return agregar(df, gran)
+
+
+class CacheGraficos:
+    """Series agregadas por (nombre, versión, rango, granularidad), con LRU."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, directorio=DIR_PUBLICO):
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entradas = max_entradas
+        self.dir = Path(directorio)
+
+    def obtener(self, clave, calcular):
+        """Serie guardada para `clave` o `calcular()` si no está. Devuelve (DataFrame, url o None)."""
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                return self._datos[clave]
+        df = calcular()
+        entrada = (df, self.publicar(df))
+        with self._lock:
+            self._datos[clave] = entrada
+            while len(self._datos) > self.max_entradas: self._datos.popitem(last=False)
+        return entrada
+
+    def publicar(self, df):
+        """Escribe la serie como JSON con nombre por contenido y devuelve su URL (None si falla)."""
+        contenido = json.dumps(df.to_dict('records'), separators=(',', ':')).encode()
+        nombre = hashlib.sha1(contenido).hexdigest()[:16] + '.json'
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            ruta = self.dir / nombre
+            if not ruta.exists():
+                tmp = ruta.with_suffix('.tmp')
+                tmp.write_bytes(contenido)
+                tmp.replace(ruta)
+                self._podar()
+        except OSError:
+            return None
+        return f"{URL_PUBLICA}/{nombre}"
+
+    def _podar(self):
+        archivos = sorted(self.dir.glob('*.json'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for viejo in archivos[MAX_ARCHIVOS:]: viejo.unlink(missing_ok=True)
+
+
+def rango(opcion, primero=None, hoy=None):
+    """(desde, hasta) para las opciones del selector del dashboard."""
+    hoy = hoy or date.today()
+    dias = {'3 meses': 91, '12 meses': 365, '3 años': 3 * 365}.get(opcion)
+    if dias: return hoy - timedelta(days=dias - 1), hoy
+    return min(primero or hoy, hoy), hoy
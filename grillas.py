@@ -0,0 +1,53 @@
+"""Grillas de insumos paginadas en el servidor.
+
+El filtro (búsqueda por nombre, unidad, stock bajo), el orden y la página se aplican en la
+consulta: solo viajan las filas visibles. Los totales del filtro (cantidad de insumos,
+valor del inventario, insumos con stock bajo) los calcula `resumen_insumos`
+(sql/grillas.sql) sin traer las filas.
+"""
+TAMANOS = (25, 50, 100)
+# Columnas por las que se puede ordenar (etiqueta -> columna)
+ORDENES = {'Nombre': 'nombre', 'Stock': 'stock_actual', 'Costo': 'costo_unitario', 'Unidad': 'unidad_medida'}
+STOCK_BAJO = 1.0       # umbral por defecto, en la unidad base del insumo
+
+
+class Filtro:
+    """Búsqueda por nombre, unidad y `stock_max` (solo insumos con stock ≤ ese valor)."""
+
+    def __init__(self, buscar='', unidad=None, stock_max=None):
+        self.buscar = (buscar or '').strip()
+        self.unidad = unidad
+        self.stock_max = stock_max
+
+    def aplicar(self, q):
+        if self.buscar: q = q.ilike('nombre', f"%{self.buscar}%")
+        if self.unidad: q = q.eq('unidad_medida', self.unidad)
+        if self.stock_max is not None: q = q.lte('stock_actual', self.stock_max)
+        return q
+
+    def params(self):
+        return {"p_buscar": self.buscar or None, "p_unidad": self.unidad, "p_stock_max": self.stock_max}
+
+
+def consulta(columnas, filtro, orden='nombre', desc=False, pagina=0, tam=TAMANOS[0]):
+    """Función para `ClienteResiliente.leer`: una página de `insumos` ya filtrada y ordenada."""
+    if orden not in ORDENES.values(): raise ValueError(f"No se puede ordenar por '{orden}'")
+    def aplicar(q):
+        q = filtro.aplicar(q.select(", ".join(columnas)))
+        # `id` desempata: sin él, filas con el mismo valor pueden saltar de página
+        return q.order(orden, desc=desc).order('id').range(pagina * tam, (pagina + 1) * tam - 1)
+    return aplicar
+
+
+def clave(nombre, filtro, *extra):
+    """Clave de caché: cambia con cada filtro y con `extra` (orden, página, tamaño)."""
+    return f"{nombre}:" + "|".join(str(x) for x in (filtro.buscar.lower(), filtro.unidad, filtro.stock_max, *extra))
+
+
+def resumen(db, filtro):
+    """{filas, valor, bajo_stock} del filtro completo, calculado en la base."""
+    return db.rpc('resumen_insumos', {**filtro.params(), "p_umbral_bajo": STOCK_BAJO}).execute().data
+
+
+def paginas(filas, tam):
+    return max(1, -(-int(filas or 0) // tam))
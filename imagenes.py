@@ -0,0 +1,178 @@
+"""Caché local de miniaturas: cada imagen se descarga una vez y se guarda reducida.
+
+Los archivos se nombran por el hash del contenido descargado: `<hash>.orig` es la imagen
+original tal como se bajó y `<hash>_<ancho>.webp` cada miniatura, que se genera desde el
+original guardado sin volver a descargarlo. `indice.json` asocia cada origen (URL o ruta)
+con el hash de su última versión y su ETag/Last-Modified; pasado REVALIDAR se pregunta al
+origen si cambió, así una imagen reemplazada en la misma URL se refresca. Todo se borra
+por LRU cuando la carpeta pasa el límite.
+"""
+import base64
+import hashlib
+import io
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from PIL import Image
+
+DIR_CACHE = Path(os.environ.get('ERP_CACHE_DIR', '.cache')) / 'miniaturas'
+LIMITE_BYTES = 100 * 1024 * 1024
+TIMEOUT_DESCARGA = 10
+CALIDAD = 80
+REINTENTO_FALLIDO = 300   # segundos antes de volver a intentar un origen que falló
+REVALIDAR = 6 * 3600      # segundos que se confía en la versión guardada sin consultar el origen
+
+
+class CacheMiniaturas:
+    def __init__(self, directorio=DIR_CACHE, limite_bytes=LIMITE_BYTES):
+        self.dir = Path(directorio)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.limite = limite_bytes
+        self._lock = threading.Lock()
+        self._fallidos = {}      # origen -> momento del último fallo (sin red no se reintenta en cada rerun)
+        self._indice = self._leer_indice()
+        self._total = sum(p.stat().st_size for p in self._archivos())
+
+    def _archivos(self):
+        return itertools.chain(self.dir.glob('*/*.webp'), self.dir.glob('*/*.orig'))
+
+    def _ruta(self, digest, ancho=None):
+        return self.dir / digest[:2] / (f"{digest}.orig" if ancho is None else f"{digest}_{ancho}.webp")
+
+    def _leer_indice(self):
+        try:
+            return json.loads((self.dir / 'indice.json').read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_indice(self):
+        # Con el lock tomado; escritura atómica para no dejar un índice a medias
+        tmp = self.dir / 'indice.tmp'
+        tmp.write_text(json.dumps(self._indice))
+        os.replace(tmp, self.dir / 'indice.json')
+
+    def _escribir(self, ruta, datos):
+        ruta.parent.mkdir(exist_ok=True)
+        tmp = ruta.with_suffix('.tmp')
+        tmp.write_bytes(datos)
+        try:
+            previo = ruta.stat().st_size
+        except OSError:
+            previo = 0
+        os.replace(tmp, ruta)
+        with self._lock:
+            self._total += len(datos) - previo
+
+    def _usar(self, ruta):
+        # Marca de uso para el LRU
+        try:
+            os.utime(ruta)
+            return True
+        except OSError:
+            return False
+
+    def _leer_origen(self, origen, validador=None):
+        """(contenido, validador) del origen; contenido None si no cambió desde `validador`."""
+        if str(origen).startswith(('http://', 'https://')):
+            cabeceras = {'User-Agent': 'tv-reposteria-erp'}
+            if validador and validador.get('etag'): cabeceras['If-None-Match'] = validador['etag']
+            if validador and validador.get('modificado'): cabeceras['If-Modified-Since'] = validador['modificado']
+            req = urllib.request.Request(origen, headers=cabeceras)
+            try:
+                with urllib.request.urlopen(req, timeout=TIMEOUT_DESCARGA) as r:
+                    return r.read(), {'etag': r.headers.get('ETag'), 'modificado': r.headers.get('Last-Modified')}
+            except urllib.error.HTTPError as e:
+                if e.code == 304: return None, validador
+                raise
+        # Archivo local: fecha y tamaño hacen de validador
+        st = Path(origen).stat()
+        actual = {'mtime': st.st_mtime_ns, 'tam': st.st_size}
+        if validador == actual: return None, validador
+        return Path(origen).read_bytes(), actual
+
+    def _reducir(self, contenido, ancho):
+        img = Image.open(io.BytesIO(contenido))
+        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        img.thumbnail((ancho, ancho * 4))
+        buf = io.BytesIO()
+        img.save(buf, 'WEBP', quality=CALIDAD)
+        return buf.getvalue()
+
+    def _desalojar(self):
+        # LRU por fecha de último uso (mtime se actualiza en cada acierto)
+        if self._total <= self.limite: return
+        for p in sorted(self._archivos(), key=lambda p: p.stat().st_mtime):
+            try:
+                tam = p.stat().st_size
+                p.unlink()
+                self._total -= tam
+            except OSError:
+                continue
+            if self._total <= self.limite * 0.9: break
+
+    def _guardada(self, entrada, ancho):
+        # Última versión conocida del origen, si sigue en disco
+        ruta = entrada and self._ruta(entrada['sha'], ancho)
+        return ruta if ruta and ruta.exists() and self._usar(ruta) else None
+
+    def _generar(self, origen, entrada, ancho, revisar):
+        original = entrada and self._ruta(entrada['sha'])
+        guardado = bool(original) and original.exists() and self._usar(original)
+        if guardado and not revisar:
+            contenido, validador = None, entrada['validador']
+        else:
+            # Sin original guardado se pide completo; con él, solo si cambió (304 / misma fecha)
+            contenido, validador = self._leer_origen(origen, entrada['validador'] if guardado else None)
+        if contenido is None:
+            contenido, digest = original.read_bytes(), entrada['sha']
+        else:
+            digest = hashlib.sha256(contenido).hexdigest()
+        ruta = self._ruta(digest, ancho)
+        if not (ruta.exists() and self._usar(ruta)):
+            datos = self._reducir(contenido, ancho)
+            # El original se guarda solo si es una imagen válida
+            if not self._ruta(digest).exists(): self._escribir(self._ruta(digest), contenido)
+            self._escribir(ruta, datos)
+        revisado = time.time() if revisar or not guardado else entrada['revisado']
+        with self._lock:
+            self._indice[origen] = {'sha': digest, 'validador': validador, 'revisado': revisado}
+            self._guardar_indice()
+        return ruta
+
+    def miniatura(self, origen, ancho):
+        """Ruta local de la miniatura de `origen` (URL o archivo) con `ancho` px. None si falla."""
+        if not origen: return None
+        origen = str(origen)
+        with self._lock:
+            entrada = self._indice.get(origen)
+        vigente = bool(entrada) and time.time() - entrada['revisado'] < REVALIDAR
+        if vigente:
+            ruta = self._guardada(entrada, ancho)
+            if ruta: return ruta
+        if time.monotonic() - self._fallidos.get(origen, -REINTENTO_FALLIDO) < REINTENTO_FALLIDO:
+            return self._guardada(entrada, ancho)
+
+        try:
+            # Vigente: un ancho nuevo sale del original guardado sin consultar el origen
+            ruta = self._generar(origen, entrada, ancho, revisar=not vigente)
+        except Exception as e:
+            print(f"Error generando miniatura de {origen}: {e}")
+            self._fallidos[origen] = time.monotonic()
+            # Sin red se sigue mostrando la versión anterior
+            return self._guardada(entrada, ancho)
+
+        with self._lock:
+            self._desalojar()
+        return ruta if ruta.exists() else None
+
+    def data_uri(self, origen, ancho):
+        """La miniatura embebida como `data:` URI, para usar dentro de HTML."""
+        ruta = self.miniatura(origen, ancho)
+        if not ruta: return origen
+        return "data:image/webp;base64," + base64.b64encode(ruta.read_bytes()).decode('ascii')
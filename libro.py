@@ -0,0 +1,73 @@
+"""Libro contable de partida doble con saldos por cuenta y mes mantenidos al escribir.
+
+Reemplaza el uso de `gastos` como libro único: las ventas ya no se suman como egresos.
+Las tablas y la función `registrar_asientos` están en sql/libro.sql.
+"""
+from datetime import datetime
+
+import pandas as pd
+
+from conexion import leer_paginado
+
+# Cuentas y su naturaleza: las de ingreso crecen por el haber, el resto por el debe
+CUENTAS = {
+    'caja': 'activo',
+    'ventas': 'ingreso',
+    'compras': 'gasto',
+    'ajustes': 'gasto',
+}
+LOTE_ASIENTOS = 500
+
+
+def asiento(debe, haber, monto, descripcion, fecha=None, referencia=None):
+    """Arma un asiento simple: `monto` al debe de una cuenta y al haber de otra."""
+    for cuenta in (debe, haber):
+        if cuenta not in CUENTAS: raise ValueError(f"Cuenta desconocida: {cuenta}")
+    return {
+        "fecha": str(fecha or datetime.now().date()),
+        "descripcion": descripcion,
+        "referencia": referencia,
+        "lineas": [{"cuenta": debe, "debe": monto}, {"cuenta": haber, "haber": monto}],
+    }
+
+
+def registrar(db, asientos):
+    """Registra asientos en lotes, cada lote en una transacción. Devuelve cuántos se registraron."""
+    total = 0
+    for i in range(0, len(asientos), LOTE_ASIENTOS):
+        total += db.rpc('registrar_asientos', {"p_asientos": asientos[i:i + LOTE_ASIENTOS]}).execute().data or 0
+    return total
+
+
+def registrar_compra(db, monto, descripcion, fecha=None, referencia=None):
+    return registrar(db, [asiento('compras', 'caja', monto, descripcion, fecha, referencia)])
+
+
+# --- LECTURA DE SALDOS ---
+
+def saldos_mensuales(filas):
+    """Convierte filas de `saldos_cuenta` en un DataFrame `cuenta, mes, saldo` con el signo natural."""
+    df = pd.DataFrame(filas, columns=['cuenta', 'mes', 'debe', 'haber'])
+    if df.empty: return pd.DataFrame(columns=['cuenta', 'mes', 'saldo'])
+    ingreso = df['cuenta'].map(CUENTAS).eq('ingreso')
+    df['saldo'] = (df['debe'].astype(float) - df['haber'].astype(float)).where(~ingreso, df['haber'].astype(float) - df['debe'].astype(float))
+    return df[['cuenta', 'mes', 'saldo']]
+
+
+# --- MIGRACIÓN DESDE `gastos` ---
+
+def reclasificar_gastos(db):
+    """Pasa las filas históricas de `gastos` al libro. Es seguro correrla varias veces.
+
+    Las filas cuya descripción empieza con "Venta Pedido" eran ventas registradas como
+    compras: van a la cuenta de ventas. El resto son compras. La referencia `gastos:<id>`
+    impide registrar dos veces la misma fila.
+    """
+    asientos = []
+    for g in leer_paginado(db, 'gastos', "id, fecha, monto, descripcion"):
+        desc = g.get('descripcion') or ''
+        if desc.startswith('Venta Pedido'):
+            asientos.append(asiento('caja', 'ventas', g['monto'], desc, g['fecha'], f"gastos:{g['id']}"))
+        else:
+            asientos.append(asiento('compras', 'caja', g['monto'], desc, g['fecha'], f"gastos:{g['id']}"))
+    return registrar(db, asientos)
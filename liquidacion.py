@@ -0,0 +1,143 @@
+"""Liquidación de stock de fin de día.
+
+En vez de descontar insumos pedido por pedido, se toman de una vez todos los pedidos
+entregados que aún no se liquidaron, se explotan por sus recetas en una sola pasada
+(pandas), se neta el consumo por insumo y se aplica como un único lote en la base.
+
+La marca de agua es `pedidos.liquidacion_id`: un pedido entregado sin liquidación está
+pendiente; al aplicar el lote queda con el id de la liquidación. Un pedido liquidado que
+después se cancela (devolución) se revierte en la liquidación siguiente. Correrla de nuevo
+no hace nada si no hay pendientes, y dos corridas simultáneas no pueden marcar el mismo
+pedido (la función SQL `aplicar_liquidacion` verifica las marcas dentro de la transacción).
+Aquí solo se calculan las cantidades consumidas: los lotes FIFO y el costo mantenido los
+descuenta esa misma función sobre las filas bloqueadas.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from unidades import convertir
+
+COLUMNAS_PEDIDO = "id, estado, variacion_id, cantidad, detalle_json, liquidacion_id"
+
+
+class UnidadesIncompatibles(ValueError):
+    """Hay líneas de receta cuya unidad no se convierte a la del insumo: el consumo quedaría corto.
+
+    `lineas`: filas distintas (nombre, unidad, unidad_medida) con el problema.
+    """
+
+    def __init__(self, lineas):
+        self.lineas = lineas
+        detalle = ", ".join(f"{l['nombre']} ({l['unidad']} → {l['unidad_medida']})" for l in lineas)
+        super().__init__(f"Recetas con unidades que no se convierten a la del inventario: {detalle}. "
+                         "Corrígelas y vuelve a intentar.")
+
+
+# Consultas para `ClienteResiliente.leer` (la pantalla) o para ejecutar directo
+def consulta_entregas(q):
+    return q.select(COLUMNAS_PEDIDO).eq('estado', 'Entregado').is_('liquidacion_id', 'null')
+
+
+def consulta_reversos(q):
+    return q.select(COLUMNAS_PEDIDO).eq('estado', 'Cancelado').gt('liquidacion_id', 0)
+
+
+def consulta_ultima(q):
+    return q.select("*").order('id', desc=True).limit(1)
+
+
+def pendientes(db):
+    """(entregados sin liquidar, cancelados que ya se habían liquidado)."""
+    return (consulta_entregas(db.table('pedidos')).execute().data,
+            consulta_reversos(db.table('pedidos')).execute().data)
+
+
+def _lineas_receta(filas, prefijo, campo):
+    """Líneas de receta como tabla: receta ('v:<id>' o 'r:<nombre>'), nombre, cantidad, unidad, rendimiento."""
+    lineas = []
+    for f in filas:
+        try: ings = json.loads(f.get('ingredientes_json') or '[]')
+        except ValueError: continue
+        rend = f.get('rendimiento') or 1
+        for ing in ings:
+            lineas.append((f"{prefijo}:{f[campo]}", ing['nombre'], ing.get('cantidad') or 0, ing.get('unidad'), rend))
+    return pd.DataFrame(lineas, columns=['receta', 'nombre', 'cantidad_linea', 'unidad', 'rendimiento'])
+
+
+def _renglones(entregas, reversos):
+    """Un renglón por (pedido, receta, cantidad, signo). Los pedidos antiguos traen `detalle_json`."""
+    renglones = []
+    for signo, pedidos in ((1, entregas), (-1, reversos)):
+        for p in pedidos:
+            if p.get('variacion_id'):
+                renglones.append((p['id'], f"v:{p['variacion_id']}", p.get('cantidad') or 1, signo))
+            elif p.get('detalle_json'):
+                for item in json.loads(p['detalle_json']):
+                    renglones.append((p['id'], f"r:{item['producto']}", item['cantidad'], signo))
+    return pd.DataFrame(renglones, columns=['pedido_id', 'receta', 'cantidad', 'signo'])
+
+
+def consumo_neto(renglones, lineas, insumos):
+    """Consumo neto por insumo (en su unidad de inventario) de todos los renglones juntos.
+
+    `insumos`: DataFrame con id, nombre, unidad_medida. Las líneas cuyo insumo no existe se ignoran;
+    si alguna unidad no se puede convertir lanza UnidadesIncompatibles en vez de contarla como 0.
+    """
+    if renglones.empty or lineas.empty:
+        return pd.DataFrame(columns=['insumo_id', 'nombre', 'cantidad'])
+    df = renglones.merge(lineas, on='receta').merge(
+        insumos[['id', 'nombre', 'unidad_medida']].rename(columns={'id': 'insumo_id'}), on='nombre')
+    # Unidad de receta → unidad de inventario, ya dividido por el rendimiento
+    df['consumo'] = convertir(df['cantidad_linea'] * df['cantidad'] * df['signo'],
+                              df['unidad'], df['unidad_medida'], df['rendimiento'])
+    malas = df[df['consumo'].isna()]
+    if not malas.empty:
+        raise UnidadesIncompatibles(malas[['nombre', 'unidad', 'unidad_medida']].drop_duplicates().to_dict('records'))
+    neto = df.groupby(['insumo_id', 'nombre'], as_index=False)['consumo'].sum()
+    neto = neto.rename(columns={'consumo': 'cantidad'})
+    return neto[~np.isclose(neto['cantidad'], 0)].reset_index(drop=True)
+
+
+def consumo(db, pedidos, reversos=()):
+    """Consumo neto por insumo de `pedidos` menos `reversos`, y la tabla de insumos usada."""
+    renglones = _renglones(pedidos, reversos)
+
+    recetas = set(renglones['receta'])
+    ids_var = [int(r[2:]) for r in recetas if r.startswith('v:')]
+    nombres_rec = [r[2:] for r in recetas if r.startswith('r:')]
+    filas_v = db.table('variaciones').select("id, ingredientes_json, rendimiento").in_('id', ids_var).execute().data if ids_var else []
+    filas_r = db.table('recetas').select("nombre, ingredientes_json").in_('nombre', nombres_rec).execute().data if nombres_rec else []
+    lineas = pd.concat([_lineas_receta(filas_v, 'v', 'id'), _lineas_receta(filas_r, 'r', 'nombre')], ignore_index=True)
+
+    insumos = pd.DataFrame(db.table('insumos').select("id, nombre, unidad_medida, stock_actual, costo_unitario").execute().data,
+                           columns=['id', 'nombre', 'unidad_medida', 'stock_actual', 'costo_unitario'])
+    return consumo_neto(renglones, lineas, insumos), insumos
+
+
+def preparar(db, metodo='promedio'):
+    """Calcula la liquidación sin aplicarla: pedidos y consumo neto. None si no hay nada pendiente."""
+    entregas, reversos = pendientes(db)
+    if not entregas and not reversos: return None
+    neto, _ = consumo(db, entregas, reversos)
+    return {
+        "pedidos": [p['id'] for p in entregas],
+        "reversos": [p['id'] for p in reversos],
+        "consumo": [{"insumo_id": int(r.insumo_id), "nombre": r.nombre, "cantidad": float(r.cantidad)}
+                    for r in neto.itertuples(index=False)],
+        "metodo": metodo,
+    }
+
+
+def liquidar(db, metodo='promedio'):
+    """Liquida todo lo pendiente en un solo lote. Devuelve el resumen aplicado (con `id` y `costo`) o None."""
+    plan = preparar(db, metodo)
+    if plan is None: return None
+    plan.update(db.rpc('aplicar_liquidacion', {"p": plan}).execute().data)
+    return plan
+
+
+def ultima(db):
+    filas = consulta_ultima(db.table('liquidaciones')).execute().data
+    return filas[0] if filas else None
@@ -0,0 +1,120 @@
+"""Importación masiva de listas de precios de proveedores.
+
+Los precios de la lista van a `ultimo_precio` (precio de mercado por unidad base); el
+`costo_unitario` lo mantiene el motor de costeo (costeo.py) con las compras.
+"""
+import difflib
+
+import numpy as np
+import pandas as pd
+
+from busqueda import plegar as normalizar_texto
+from unidades import convertir
+
+# Nombres de columna aceptados en el CSV del proveedor
+ALIAS_COLUMNAS = {
+    'nombre': ['nombre', 'producto', 'insumo', 'descripcion', 'item'],
+    'contenido': ['contenido', 'cantidad', 'tamano', 'formato', 'envase'],
+    'unidad': ['unidad', 'unidad_envase', 'um', 'medida'],
+    'precio': ['precio', 'precio_envase', 'valor', 'total'],
+}
+UMBRAL_COINCIDENCIA = 0.6
+
+
+def _numero(serie, miles=False):
+    s = serie.astype(str).str.replace('$', '', regex=False).str.strip()
+    if miles:
+        # Precios en pesos: "1.990" son mil novecientos noventa y "1.990,50" lleva coma decimal,
+        # pero "1990.50" o "2.5" usan el punto como decimal
+        con_miles = s.str.contains(',', regex=False) | s.str.fullmatch(r'-?\d{1,3}(\.\d{3})+')
+        s = s.where(~con_miles, s.str.replace('.', '', regex=False))
+    return pd.to_numeric(s.str.replace(',', '.', regex=False), errors='coerce')
+
+
+def leer_lista_proveedor(archivo):
+    """Lee el CSV del proveedor y devuelve columnas `nombre, contenido, unidad, precio`."""
+    df = pd.read_csv(archivo, sep=None, engine='python', dtype=str)
+    columnas = {normalizar_texto(c).replace(' ', '_'): c for c in df.columns}
+    renombrar = {}
+    for destino, alias in ALIAS_COLUMNAS.items():
+        origen = next((columnas[a] for a in alias if a in columnas), None)
+        if origen is None:
+            raise ValueError(f"Falta la columna '{destino}' (se aceptan: {', '.join(alias)})")
+        renombrar[origen] = destino
+    df = df.rename(columns=renombrar)[list(ALIAS_COLUMNAS)]
+    df['nombre'] = df['nombre'].fillna('').str.strip()
+    df['unidad'] = df['unidad'].fillna('').str.strip().str.lower()
+    df['contenido'] = _numero(df['contenido'])
+    df['precio'] = _numero(df['precio'], miles=True)
+    return df[df['nombre'] != ''].reset_index(drop=True)
+
+
+def emparejar(nombres, candidatos, umbral=UMBRAL_COINCIDENCIA):
+    """Busca para cada nombre el candidato más parecido. Devuelve (candidato o None, puntaje)."""
+    norm_cand = {}
+    for c in candidatos:
+        norm_cand.setdefault(normalizar_texto(c), c)
+    claves = list(norm_cand)
+    # Igual ignorando orden de palabras: "leche crema" == "crema leche"
+    por_tokens = {' '.join(sorted(k.split())): k for k in claves}
+
+    resultado = []
+    for nombre in nombres:
+        n = normalizar_texto(nombre)
+        if n in norm_cand:
+            resultado.append((norm_cand[n], 1.0))
+            continue
+        t = ' '.join(sorted(n.split()))
+        if t in por_tokens:
+            resultado.append((norm_cand[por_tokens[t]], 0.99))
+            continue
+        mejor = difflib.get_close_matches(n, claves, n=1, cutoff=umbral)
+        if mejor:
+            puntaje = difflib.SequenceMatcher(None, n, mejor[0]).ratio()
+            resultado.append((norm_cand[mejor[0]], round(puntaje, 2)))
+        else:
+            resultado.append((None, 0.0))
+    return resultado
+
+
+def vista_previa(lista, insumos):
+    """Cruza la lista del proveedor con `insumos` y calcula el nuevo precio por unidad base.
+
+    `insumos` es la lista de filas de la tabla. El cálculo de costos es vectorizado sobre
+    toda la lista; la columna `estado` indica qué filas se pueden aplicar.
+    """
+    ref = pd.DataFrame(insumos, columns=['id', 'nombre', 'unidad_medida', 'costo_unitario', 'ultimo_precio'])
+    pares = emparejar(lista['nombre'], ref['nombre'])
+    df = lista.copy()
+    df['insumo'] = [p[0] for p in pares]
+    df['coincidencia'] = [p[1] for p in pares]
+    ref = ref.rename(columns={'nombre': 'insumo', 'ultimo_precio': 'precio_actual'}).drop_duplicates('insumo')
+    df = df.merge(ref, on='insumo', how='left')
+    df['costo_unitario'] = df['costo_unitario'].astype(float)
+    df['precio_actual'] = df['precio_actual'].astype(float)
+
+    cant_norm = convertir(df['contenido'], df['unidad'], df['unidad_medida'].fillna(''))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['precio_nuevo'] = np.where(cant_norm > 0, df['precio'] / cant_norm, np.nan)
+        # Sin precio anterior, la variación se mide contra el costo mantenido
+        df['variacion_pct'] = (df['precio_nuevo'] / df['precio_actual'].fillna(df['costo_unitario']) - 1) * 100
+
+    df['estado'] = 'OK'
+    df.loc[df['precio'].isna() | (df['precio'] <= 0) | df['contenido'].isna(), 'estado'] = 'Datos inválidos'
+    df.loc[df['estado'].eq('OK') & np.isnan(cant_norm), 'estado'] = 'Unidad incompatible'
+    df.loc[df['insumo'].isna(), 'estado'] = 'Sin coincidencia'
+    # Si dos filas apuntan al mismo insumo, solo se aplica la de mayor coincidencia
+    dup = df[df['estado'] == 'OK'].sort_values('coincidencia', ascending=False).duplicated('insumo')
+    df.loc[dup[dup].index, 'estado'] = 'Duplicado'
+    df['aplicar'] = df['estado'].eq('OK') & df['precio_nuevo'].ne(df['precio_actual'])
+    return df
+
+
+def filas_actualizacion(preview, insumos):
+    """`{id, ultimo_precio}` de cada fila a aplicar, para `actualizar_precios` (sql/lista_precios.sql)."""
+    ids = {i['id'] for i in insumos}
+    elegidas = preview[preview['aplicar'] & preview['estado'].eq('OK')]
+    return [
+        {'id': int(fila.id), 'ultimo_precio': float(fila.precio_nuevo)}
+        for fila in elegidas.itertuples() if fila.id in ids
+    ]
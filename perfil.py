@@ -0,0 +1,225 @@
+"""Perfilador opcional de reruns: tiempo por sección de la pantalla y muestreo de la pila.
+
+Las secciones se anidan (Pedidos › Tablero de Cocina › BD pedidos). El muestreo es un hilo
+que mira cada pocos ms la pila del hilo del script, sin dependencias externas. Los
+resultados se resumen en tabla, por categoría (base de datos, pandas, Altair, Streamlit)
+y se exportan al formato de speedscope (https://www.speedscope.app).
+"""
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+INTERVALO_MUESTREO = 0.005   # segundos
+SEPARADOR = " › "
+
+# Primera coincidencia desde la hoja hacia la raíz de la pila
+CATEGORIAS = [
+    ("Base de datos", ('conexion.py', 'backend_local.py', 'postgrest', 'supabase', 'httpx', 'httpcore')),
+    ("Altair", ('altair', 'vega')),
+    ("pandas", ('pandas', 'numpy')),
+    ("Streamlit (widgets)", ('streamlit',)),
+]
+
+
+class _Muestreador(threading.Thread):
+    def __init__(self, hilo, intervalo, raiz=None):
+        super().__init__(daemon=True, name="perfil-muestreo")
+        self.hilo = hilo
+        self.intervalo = intervalo
+        self.raiz = raiz
+        self.muestras = []           # (pila raíz→hoja de (función, archivo, línea), segundos)
+        self._fin = threading.Event()
+
+    def _pila(self, frame):
+        pila = []
+        while frame is not None:
+            co = frame.f_code
+            pila.append((co.co_name, co.co_filename, co.co_firstlineno))
+            if self.raiz and co.co_filename == self.raiz and frame.f_back and frame.f_back.f_code.co_filename != self.raiz:
+                break            # lo que está sobre el script es el runner de Streamlit
+            frame = frame.f_back
+        return tuple(reversed(pila))
+
+    def run(self):
+        anterior = time.perf_counter()
+        while not self._fin.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo)
+            ahora = time.perf_counter()
+            if frame is not None: self.muestras.append((self._pila(frame), ahora - anterior))
+            anterior = ahora
+
+    def detener(self):
+        self._fin.set()
+        self.join()
+        return self.muestras
+
+
+class Perfilador:
+    """Mide un rerun. Uso:
+
+        p = Perfilador(muestreo=True)
+        with p.rerun():
+            with p.seccion("Barra lateral"): ...
+            p.abrir("Pedidos")           # queda abierta hasta el final del rerun
+            with p.seccion("Tablero"): ...
+        p.resultado  # {'inicio', 'duracion', 'eventos', 'muestras'}
+    """
+    activo = True
+
+    def __init__(self, muestreo=False, intervalo=INTERVALO_MUESTREO, raiz=None):
+        self.muestreo = muestreo
+        self.intervalo = intervalo
+        self.raiz = raiz
+        self.resultado = None
+        self._pila = []
+        self._eventos = []           # ('O' | 'C', segundos desde el inicio, ruta)
+        self._t0 = None
+
+    def _t(self):
+        return time.perf_counter() - self._t0
+
+    def _abrir(self, nombre):
+        self._pila.append(nombre)
+        self._eventos.append(('O', self._t(), tuple(self._pila)))
+        return len(self._pila)
+
+    def _cerrar_hasta(self, nivel):
+        while len(self._pila) >= nivel:
+            self._eventos.append(('C', self._t(), tuple(self._pila)))
+            self._pila.pop()
+
+    def abrir(self, nombre):
+        """Sección sin bloque `with`: se cierra al salir de la sección que la contiene o al final del rerun."""
+        if self._t0 is not None: self._abrir(nombre)
+
+    @contextmanager
+    def seccion(self, nombre):
+        if self._t0 is None:
+            yield
+            return
+        nivel = self._abrir(nombre)
+        try:
+            yield
+        finally:
+            self._cerrar_hasta(nivel)
+
+    @contextmanager
+    def rerun(self):
+        muestreador = _Muestreador(threading.get_ident(), self.intervalo, self.raiz) if self.muestreo else None
+        inicio = time.time()
+        self._t0 = time.perf_counter()
+        if muestreador: muestreador.start()
+        try:
+            yield self
+        finally:
+            # También al cortar con st.rerun()/st.stop(), que se implementan con excepciones
+            self._cerrar_hasta(1)
+            self.resultado = {
+                "inicio": inicio, "duracion": self._t(), "eventos": self._eventos,
+                "muestras": muestreador.detener() if muestreador else [],
+            }
+            self._t0 = None
+
+
+class _PerfiladorNulo:
+    activo = False
+    resultado = None
+
+    def abrir(self, nombre): pass
+
+    def seccion(self, nombre): return nullcontext()
+
+    def rerun(self): return nullcontext(self)
+
+
+NULO = _PerfiladorNulo()
+
+
+# --- ANÁLISIS ---
+
+def duraciones(resultado):
+    """[(ruta, segundos)] de cada sección de un rerun."""
+    abiertas, out = {}, []
+    for tipo, t, ruta in resultado['eventos']:
+        if tipo == 'O': abiertas[ruta] = t
+        else: out.append((ruta, t - abiertas.pop(ruta)))
+    return out
+
+
+def resumen(resultados):
+    """Tabla por sección sobre varios reruns: veces, total, promedio, máximo y % del tiempo de rerun."""
+    total_reruns = sum(r['duracion'] for r in resultados) or 1
+    acumulado = defaultdict(list)
+    for r in resultados:
+        acumulado[("rerun",)].append(r['duracion'])
+        for ruta, seg in duraciones(r): acumulado[ruta].append(seg)
+    filas = []
+    for ruta, segs in acumulado.items():
+        filas.append({
+            "seccion": SEPARADOR.join(ruta), "nivel": len(ruta) - 1 if ruta != ("rerun",) else 0,
+            "veces": len(segs), "total_ms": round(sum(segs) * 1000, 1),
+            "promedio_ms": round(sum(segs) / len(segs) * 1000, 1), "max_ms": round(max(segs) * 1000, 1),
+            "pct_rerun": round(sum(segs) / total_reruns * 100, 1),
+        })
+    return sorted(filas, key=lambda f: (f['seccion'] != "rerun", -f['total_ms']))
+
+
+def categoria(pila):
+    for frame in reversed(pila):
+        archivo = frame[1].replace('\\', '/')
+        for nombre, marcas in CATEGORIAS:
+            if any(m in archivo for m in marcas): return nombre
+    return "App"
+
+
+def por_categoria(resultados):
+    """Segundos muestreados por categoría (dónde se va el tiempo: BD, pandas, Altair, Streamlit o la app)."""
+    out = defaultdict(float)
+    for r in resultados:
+        for pila, seg in r['muestras']: out[categoria(pila)] += seg
+    total = sum(out.values()) or 1
+    return [{"categoria": c, "ms": round(s * 1000, 1), "pct": round(s / total * 100, 1)}
+            for c, s in sorted(out.items(), key=lambda x: -x[1])]
+
+
+def speedscope(resultados, nombre="TV Repostería ERP"):
+    """Archivo de speedscope con un perfil por secciones y, si hubo muestreo, uno de la pila.
+
+    Los reruns se ponen uno tras otro en la línea de tiempo.
+    """
+    frames, indice = [], {}
+
+    def frame(nombre_f, archivo=None, linea=None):
+        clave = (nombre_f, archivo, linea)
+        if clave not in indice:
+            indice[clave] = len(frames)
+            f = {"name": nombre_f}
+            if archivo: f.update(file=archivo, line=linea)
+            frames.append(f)
+        return indice[clave]
+
+    eventos, muestras, pesos = [], [], []
+    desplazamiento = 0.0
+    for i, r in enumerate(resultados):
+        raiz = frame(f"rerun {i + 1}")
+        eventos.append({"type": "O", "frame": raiz, "at": desplazamiento})
+        for tipo, t, ruta in r['eventos']:
+            eventos.append({"type": tipo, "frame": frame(ruta[-1]), "at": desplazamiento + t})
+        desplazamiento += r['duracion']
+        eventos.append({"type": "C", "frame": raiz, "at": desplazamiento})
+        for pila, seg in r['muestras']:
+            muestras.append([frame(*f) for f in pila])
+            pesos.append(seg)
+
+    perfiles = [{"type": "evented", "name": "Secciones", "unit": "seconds",
+                 "startValue": 0, "endValue": desplazamiento, "events": eventos}]
+    if muestras:
+        perfiles.append({"type": "sampled", "name": "Muestreo de la pila", "unit": "seconds",
+                         "startValue": 0, "endValue": sum(pesos), "samples": muestras, "weights": pesos})
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": nombre, "exporter": "erp-perfil", "activeProfileIndex": 0,
+        "shared": {"frames": frames}, "profiles": perfiles,
+    }
@@ -0,0 +1,120 @@
+"""Historial de costos de insumos y costeo de recetas a una fecha.
+
+`precios_insumo` (sql/precios.sql) recibe una fila cada vez que cambia el `costo_unitario`
+de un insumo. Aquí se carga completo en arreglos NumPy ordenados por (insumo, vigencia):
+el costo vigente en un instante es el de la última fila con `vigente_desde` ≤ ese instante,
+y se encuentra con búsqueda binaria (`np.searchsorted`), para muchos insumos y fechas a la vez.
+
+Para buscar en todos los insumos con una sola búsqueda, cada fila tiene una llave
+insumo × (cantidad de instantes distintos + 1) + posición de su instante, que crece igual
+que el orden (insumo, vigencia).
+
+Antes del primer registro de un insumo se usa el más antiguo que haya (el historial parte
+con el costo que tenía el insumo al crear la tabla). El costeo a una fecha usa las recetas
+actuales con los costos de esa fecha.
+
+Los instantes se comparan en UTC. `vigente_desde` viene de la base con zona horaria; las
+fechas y horas sin zona (el día elegido en pantalla, `hoy`) son hora local del servidor.
+"""
+import numpy as np
+import pandas as pd
+from dateutil import tz
+
+from conexion import leer_paginado
+
+LOCAL = tz.tzlocal()
+# Fecha y hora terminada en zona horaria: "...T13:00:00Z", "... 13:00:00+00:00", "...-03"
+CON_ZONA = r'\d[T ]\d\d:\d\d.*(?:Z|[+-]\d\d(?::?\d\d)?)$'
+
+
+def _instantes(valores):
+    """Fechas/timestamps (str, date, datetime) a datetime64[us] en UTC sin zona horaria.
+
+    Los valores con zona se convierten a UTC; los que no la tienen se toman como hora local.
+    """
+    s = pd.Series(list(valores), dtype=object)
+    con_zona = s.astype(str).str.strip().str.contains(CON_ZONA)
+    t = pd.Series(pd.NaT, index=s.index, dtype='datetime64[us, UTC]')
+    if con_zona.any():
+        t[con_zona] = pd.to_datetime(s[con_zona], utc=True, format='mixed')
+    if not con_zona.all():
+        local = pd.to_datetime(s[~con_zona], format='mixed')
+        t[~con_zona] = local.dt.tz_localize(LOCAL, ambiguous=False, nonexistent='shift_forward').dt.tz_convert('UTC')
+    return t.dt.tz_localize(None).to_numpy(dtype='datetime64[us]')
+
+
+def leer_historial(db):
+    """Filas de `precios_insumo` ordenadas, página por página."""
+    return list(leer_paginado(db, 'precios_insumo', "id, insumo_id, costo_unitario, vigente_desde"))
+
+
+class HistorialPrecios:
+    """Costos por insumo en arreglos ordenados por (insumo, vigente_desde, id)."""
+
+    def __init__(self, filas):
+        ids = np.array([f['insumo_id'] for f in filas], dtype=np.int64)
+        tiempos = _instantes(f['vigente_desde'] for f in filas) if filas else np.array([], dtype='datetime64[us]')
+        costos = np.array([f['costo_unitario'] for f in filas], dtype=float)
+        orden = np.lexsort((np.array([f.get('id') or 0 for f in filas], dtype=np.int64), tiempos, ids))
+        self.ids, self.tiempos, self.costos = ids[orden], tiempos[orden], costos[orden]
+        self.insumos, self.inicio = np.unique(self.ids, return_index=True)
+        grupo = np.searchsorted(self.insumos, self.ids)
+        self._distintos = np.unique(self.tiempos)
+        self._base = len(self._distintos) + 1
+        self._llaves = grupo * self._base + np.searchsorted(self._distintos, self.tiempos, side='right')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def precios(self, insumo_ids, cuando):
+        """Costo vigente de cada insumo en `cuando` (un instante o uno por insumo). NaN si no tiene historial."""
+        insumo_ids = np.atleast_1d(np.asarray(insumo_ids, dtype=np.int64))
+        cuando = _instantes(np.broadcast_to(np.asarray(cuando, dtype=object), insumo_ids.shape))
+        out = np.full(len(insumo_ids), np.nan)
+        if not len(self.ids): return out
+        grupo = np.searchsorted(self.insumos, insumo_ids)
+        conocido = (grupo < len(self.insumos)) & (self.insumos[np.minimum(grupo, len(self.insumos) - 1)] == insumo_ids)
+        llave = grupo * self._base + np.searchsorted(self._distintos, cuando, side='right')
+        pos = np.searchsorted(self._llaves, llave, side='right') - 1
+        # Antes del primer registro del insumo, su costo más antiguo
+        pos = np.maximum(pos, self.inicio[np.minimum(grupo, len(self.insumos) - 1)])
+        out[conocido] = self.costos[pos[conocido]]
+        return out
+
+    def precio(self, insumo_id, cuando):
+        return float(self.precios([insumo_id], cuando)[0])
+
+    def serie(self, insumo_id):
+        """Cambios de costo de un insumo: DataFrame vigente_desde (hora local), costo_unitario."""
+        sel = self.ids == insumo_id
+        desde = pd.Series(self.tiempos[sel]).dt.tz_localize('UTC').dt.tz_convert(LOCAL).dt.tz_localize(None)
+        return pd.DataFrame({"vigente_desde": desde, "costo_unitario": self.costos[sel]})
+
+
+def costos_al(recetas, historial, fechas):
+    """Costo de ingredientes por unidad de todo el catálogo en cada fecha.
+
+    `recetas` es un `escenarios.Recetas`. Devuelve (variaciones × fechas). Los insumos sin
+    historial quedan con su costo actual.
+    """
+    fechas = list(np.atleast_1d(np.asarray(fechas, dtype=object)))
+    ids = np.repeat(recetas.insumo_ids[None, :], len(fechas), axis=0)
+    cuando = np.repeat(np.array(fechas, dtype=object)[:, None], len(recetas.insumo_ids), axis=1)
+    costos = historial.precios(ids.ravel(), cuando.ravel()).reshape(ids.shape)
+    costos = np.where(np.isnan(costos), recetas.costos[None, :], costos)
+    return recetas.matriz @ costos.T + recetas.fijo[:, None]
+
+
+def deriva(recetas, historial, fecha, hoy=None):
+    """Costo por unidad de cada variación en `fecha` contra hoy, con la variación en %.
+
+    `fecha` sin zona horaria es hora local (p. ej. el fin del día elegido).
+    """
+    hoy = hoy or pd.Timestamp.now(tz='UTC')
+    costos = costos_al(recetas, historial, [fecha, hoy])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cambio = np.where(costos[:, 0] > 0, (costos[:, 1] / costos[:, 0] - 1) * 100, np.nan)
+    return pd.DataFrame({
+        "id": recetas.ids, "variacion": recetas.nombres, "costo_entonces": np.round(costos[:, 0]),
+        "costo_hoy": np.round(costos[:, 1]), "cambio_pct": np.round(cambio, 1),
+    }).sort_values('cambio_pct', ascending=False, na_position='last').reset_index(drop=True)
@@ -0,0 +1,210 @@
+"""Pronóstico de demanda diaria por variación a partir de los pedidos.
+
+Cada variación es una serie diaria de unidades (por fecha de entrega, sin cancelados; se
+leen `pedidos` y `pedidos_historicos`). El modelo es un Holt-Winters aditivo liviano con
+dos estacionalidades:
+
+    esperado = nivel + semanal[día de la semana] + anual[semana del año]
+
+`nivel` y `semanal` se suavizan día a día; `anual` es el desvío de cada semana del año
+respecto del promedio de la serie, acumulado de los años anteriores (Pan de Pascua en
+diciembre, tortas en fechas especiales) y solo entra con más de un año de historia.
+Todas las series avanzan juntas: un paso por día con arreglos de NumPy (series × ...).
+
+El modelo ajustado se guarda y se actualiza de forma incremental: solo se leen los
+pedidos de los días cerrados desde el último ajuste. Cada REAJUSTE_DIAS se reajusta
+completo, para recoger cambios en pedidos de fechas ya procesadas.
+"""
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from conexion import leer_paginado, tabla_inexistente
+
+HISTORIA_DIAS = 3 * 365
+REAJUSTE_DIAS = 28
+ALFA = 0.1          # suavizado del nivel
+GAMMA = 0.05        # suavizado de la estacionalidad semanal
+SEMANAS = 53
+COLUMNAS = "variacion_id, fecha_entrega, cantidad"
+
+
+def _semana(d):
+    return min((d.timetuple().tm_yday - 1) // 7, SEMANAS - 1)
+
+
+def _pedidos(db, tabla, desde, hasta):
+    return list(leer_paginado(db, tabla, COLUMNAS, filtro=lambda q: q.gte('fecha_entrega', str(desde))
+                              .lte('fecha_entrega', str(hasta)).neq('estado', 'Cancelado').gt('variacion_id', 0)))
+
+
+def demanda(db, desde, hasta):
+    """Unidades por (variación, día) entre `desde` y `hasta` inclusive: DataFrame variacion_id, fecha, cantidad."""
+    filas = []
+    for tabla in ('pedidos', 'pedidos_historicos'):
+        try:
+            filas += _pedidos(db, tabla, desde, hasta)
+        except Exception as e:
+            # Sin archivo todavía (ver sql/archivo.sql); cualquier otro error sí se propaga
+            if tabla == 'pedidos' or not tabla_inexistente(e): raise
+    df = pd.DataFrame(filas, columns=['variacion_id', 'fecha_entrega', 'cantidad'])
+    df['fecha'] = pd.to_datetime(df['fecha_entrega']).dt.date
+    df['cantidad'] = pd.to_numeric(df['cantidad']).fillna(1)
+    return df.groupby(['variacion_id', 'fecha'], as_index=False)['cantidad'].sum()
+
+
+class Modelo:
+    """Estado del modelo para un conjunto de series. `hasta` es el último día incorporado."""
+
+    def __init__(self, ids, hasta):
+        n = len(ids)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.hasta = hasta
+        self.nivel = np.zeros(n)
+        self.semanal = np.zeros((n, 7))
+        self.suma_anual = np.zeros((n, SEMANAS))
+        self.dias_anual = np.zeros(SEMANAS)
+        self.suma_total = np.zeros(n)
+        self.dias_total = 0
+
+    def _agregar_series(self, ids):
+        nuevos = np.setdiff1d(np.asarray(ids, dtype=np.int64), self.ids)
+        if not len(nuevos): return
+        k = len(nuevos)
+        self.ids = np.concatenate([self.ids, nuevos])
+        self.nivel = np.concatenate([self.nivel, np.zeros(k)])
+        self.semanal = np.vstack([self.semanal, np.zeros((k, 7))])
+        self.suma_anual = np.vstack([self.suma_anual, np.zeros((k, SEMANAS))])
+        self.suma_total = np.concatenate([self.suma_total, np.zeros(k)])
+
+    def _matriz(self, df, desde, dias):
+        """(series × días) con las unidades de `df` a partir de `desde`."""
+        self._agregar_series(df['variacion_id'].unique())
+        y = np.zeros((len(self.ids), dias))
+        if not df.empty:
+            fila = np.searchsorted(self.ids, df['variacion_id'].to_numpy()) if _ordenado(self.ids) \
+                else pd.Index(self.ids).get_indexer(df['variacion_id'])
+            col = np.array([(f - desde).days for f in df['fecha']])
+            np.add.at(y, (fila, col), df['cantidad'].to_numpy(dtype=float))
+        return y
+
+    def _anual(self, semana):
+        # Semana ± 1: con pocos años, una sola semana tiene demasiado ruido
+        vecinas = [(semana - 1) % SEMANAS, semana, (semana + 1) % SEMANAS]
+        dias = self.dias_anual[vecinas].sum()
+        if self.dias_total <= 365 or not dias: return np.zeros(len(self.ids))
+        peso = min((self.dias_total - 365) / 365, 1.0)
+        media = self.suma_total / self.dias_total
+        return peso * (self.suma_anual[:, vecinas].sum(axis=1) / dias - media)
+
+    def iniciar(self, y, desde):
+        """Nivel y estacionalidad semanal iniciales con las primeras 4 semanas."""
+        ini = y[:, :28]
+        if not ini.shape[1]: return
+        self.nivel = ini.mean(axis=1)
+        for d in range(7):
+            dias = [i for i in range(ini.shape[1]) if (desde + timedelta(days=i)).weekday() == d]
+            if dias: self.semanal[:, d] = ini[:, dias].mean(axis=1) - self.nivel
+
+    def avanzar(self, y, desde):
+        """Incorpora los días de `y` (series × días), el primero es `desde`."""
+        for i in range(y.shape[1]):
+            dia = desde + timedelta(days=i)
+            dow, sem = dia.weekday(), _semana(dia)
+            obs = y[:, i]
+            anual = self._anual(sem)
+            self.nivel += ALFA * (obs - anual - self.semanal[:, dow] - self.nivel)
+            self.semanal[:, dow] += GAMMA * (obs - anual - self.nivel - self.semanal[:, dow])
+            self.suma_anual[:, sem] += obs
+            self.dias_anual[sem] += 1
+            self.suma_total += obs
+            self.dias_total += 1
+        self.hasta = desde + timedelta(days=y.shape[1] - 1)
+
+    def pronosticar(self, dias):
+        """(series × días) de unidades esperadas desde el día siguiente a `hasta`."""
+        out = np.empty((len(self.ids), dias))
+        for h in range(dias):
+            dia = self.hasta + timedelta(days=h + 1)
+            out[:, h] = self.nivel + self.semanal[:, dia.weekday()] + self._anual(_semana(dia))
+        return np.maximum(out, 0)
+
+
+def _ordenado(a):
+    return len(a) < 2 or bool(np.all(a[1:] > a[:-1]))
+
+
+def ajustar(db, hasta, historia=HISTORIA_DIAS):
+    """Modelo nuevo con la historia completa hasta `hasta` (inclusive)."""
+    desde = hasta - timedelta(days=historia - 1)
+    df = demanda(db, desde, hasta)
+    modelo = Modelo(np.sort(df['variacion_id'].unique()), desde - timedelta(days=1))
+    # La historia empieza con el primer pedido: antes no había ventas, no demanda cero
+    if not df.empty: desde = min(df['fecha'])
+    y = modelo._matriz(df, desde, (hasta - desde).days + 1)
+    modelo.iniciar(y, desde)
+    modelo.avanzar(y, desde)
+    return modelo
+
+
+class Pronosticador:
+    """Modelo compartido (se guarda con `st.cache_resource`) que se pone al día en cada consulta."""
+
+    def __init__(self, historia=HISTORIA_DIAS, reajuste=REAJUSTE_DIAS):
+        self.historia = historia
+        self.reajuste = reajuste
+        self.modelo = None
+        self.ajustado_en = None
+        self._lock = threading.Lock()
+
+    def actualizar(self, db, hoy=None):
+        """Deja el modelo al día con los pedidos hasta ayer. Devuelve el modelo."""
+        hoy = hoy or date.today()
+        ayer = hoy - timedelta(days=1)
+        with self._lock:
+            if self.modelo is None or (hoy - self.ajustado_en).days >= self.reajuste:
+                self.modelo, self.ajustado_en = ajustar(db, ayer, self.historia), hoy
+            elif self.modelo.hasta < ayer:
+                desde = self.modelo.hasta + timedelta(days=1)
+                df = demanda(db, desde, ayer)
+                self.modelo.avanzar(self.modelo._matriz(df, desde, (ayer - desde).days + 1), desde)
+            return self.modelo
+
+    def pronostico(self, db, dias=14, hoy=None):
+        """Unidades por día y variación para los próximos `dias` desde hoy.
+
+        DataFrame fecha, variacion_id, esperado (modelo), reservado (pedidos ya tomados)
+        y unidades = el mayor de los dos.
+        """
+        hoy = hoy or date.today()
+        modelo = self.actualizar(db, hoy)
+        fechas = [hoy + timedelta(days=h) for h in range(dias)]
+        esperado = modelo.pronosticar(dias)
+        df = pd.DataFrame({
+            "fecha": np.tile(fechas, len(modelo.ids)),
+            "variacion_id": np.repeat(modelo.ids, dias),
+            "esperado": esperado.ravel(),
+        })
+        reservado = demanda(db, hoy, fechas[-1]).rename(columns={'cantidad': 'reservado'})
+        df = df.merge(reservado, on=['variacion_id', 'fecha'], how='outer').fillna({'esperado': 0.0, 'reservado': 0.0})
+        df['unidades'] = np.maximum(df['esperado'], df['reservado'])
+        return df.sort_values(['fecha', 'variacion_id']).reset_index(drop=True)
+
+
+def necesidades(pronostico, recetas, insumos):
+    """Insumos que requiere el pronóstico, contra el stock actual.
+
+    `recetas` es un `escenarios.Recetas` del catálogo; `insumos` las filas con stock_actual.
+    """
+    total = pronostico.groupby('variacion_id')['unidades'].sum()
+    unidades = total.reindex(recetas.ids, fill_value=0).to_numpy(dtype=float)
+    necesario = recetas.matriz.T @ unidades
+    stock = {i['nombre']: i.get('stock_actual') or 0 for i in insumos}
+    medida = {i['nombre']: i.get('unidad_medida') for i in insumos}
+    df = pd.DataFrame({"insumo": recetas.insumos, "necesario": necesario})
+    df['unidad'] = df['insumo'].map(medida)
+    df['stock'] = df['insumo'].map(stock).astype(float)
+    df['faltante'] = np.maximum(df['necesario'] - df['stock'], 0)
+    return df[df['necesario'] > 0].sort_values('faltante', ascending=False).reset_index(drop=True)
@@ -0,0 +1,187 @@
+"""Respaldos de la base: Parquet (zstd) por páginas, con manifiesto y checksums.
+
+Cada tabla se lee de a una página y cada página se escribe como un archivo Parquet
+aparte (`pedidos/parte-00000.parquet`, ...), así la memoria usada no depende del tamaño
+de la tabla. El manifiesto se escribe al final: un respaldo sin manifest.json está
+incompleto y no se puede restaurar. La restauración verifica los checksums, sube los
+datos por lotes a una tabla de paso y los reemplaza en una sola transacción.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from conexion import PAGINA, paginas, tabla_inexistente
+
+DIR_RESPALDOS = Path(os.environ.get('ERP_RESPALDOS_DIR', '.respaldos'))
+LOTE_RESTAURACION = 500
+FORMATO = "parquet-zstd"
+
+# Orden de restauración: primero las tablas de las que dependen otras
+TABLAS = [
+    'cuentas', 'usuarios', 'clientes', 'insumos', 'lotes_insumo', 'envases_insumo', 'precios_insumo',
+    'productos', 'variaciones', 'recetas', 'liquidaciones', 'pedidos', 'pedidos_historicos', 'gastos',
+    'asientos', 'movimientos', 'saldos_cuenta',
+]
+# Clave primaria cuando no es `id`
+CLAVES = {'cuentas': ('codigo',), 'saldos_cuenta': ('cuenta', 'mes')}
+# Tablas que apuntan a otra (claves foráneas de sql/): vaciar la de la izquierda las borra en
+# cascada o falla, así que se restauran juntas. Los saldos se derivan de los movimientos.
+DEPENDIENTES = {
+    'insumos': ('lotes_insumo', 'envases_insumo', 'precios_insumo'),
+    'clientes': ('pedidos',), 'liquidaciones': ('pedidos',),
+    'cuentas': ('movimientos', 'saldos_cuenta'), 'asientos': ('movimientos',), 'movimientos': ('saldos_cuenta',),
+}
+
+
+class RespaldoFallido(Exception):
+    """Una tabla pedida no se pudo leer: el respaldo quedaría incompleto y se descarta."""
+
+
+def claves(tabla):
+    return CLAVES.get(tabla, ('id',))
+
+
+def con_dependientes(tablas):
+    """`tablas` más todas las que dependen de ellas, en el orden de TABLAS."""
+    todas, pendientes = set(), list(tablas or TABLAS)
+    while pendientes:
+        t = pendientes.pop()
+        if t in todas: continue
+        todas.add(t)
+        pendientes.extend(DEPENDIENTES.get(t, ()))
+    return [t for t in TABLAS if t in todas]
+
+
+def _a_parquet(filas, columnas_json):
+    # Los jsonb (dict/list) se guardan como texto: Parquet necesita un tipo fijo por columna
+    for f in filas:
+        for c, v in f.items():
+            if isinstance(v, (dict, list)): columnas_json.add(c)
+    if columnas_json:
+        filas = [{c: json.dumps(v) if c in columnas_json and v is not None else v for c, v in f.items()} for f in filas]
+    buf = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist(filas), buf, compression='zstd')
+    return buf.getvalue()
+
+
+# --- CREAR ---
+
+def crear(db, motivo="manual", tablas=None, directorio=DIR_RESPALDOS, pagina=PAGINA):
+    """Respalda `tablas` (todas por defecto). Devuelve la carpeta del respaldo.
+
+    Solo se omiten (y se anotan) las tablas que no existen en esta base. Si otra tabla no
+    se puede leer, se borra la carpeta y se lanza `RespaldoFallido`: quien iba a borrar o
+    restaurar no debe seguir sin respaldo.
+    """
+    nombre = f"{datetime.now():%Y%m%d_%H%M%S}_{re.sub(r'[^a-z0-9]+', '-', motivo.lower()).strip('-')}"
+    carpeta = Path(directorio) / nombre
+    carpeta.mkdir(parents=True)
+    manifiesto = {"creado": datetime.now().isoformat(timespec='seconds'), "motivo": motivo,
+                  "formato": FORMATO, "tablas": {}, "omitidas": {}}
+    for tabla in tablas or TABLAS:
+        info = {"filas": 0, "claves": list(claves(tabla)), "partes": [], "columnas_json": set()}
+        try:
+            for i, filas in enumerate(paginas(db, tabla, orden=claves(tabla), pagina=pagina)):
+                datos = _a_parquet(filas, info['columnas_json'])
+                archivo = f"{tabla}/parte-{i:05d}.parquet"
+                (carpeta / tabla).mkdir(exist_ok=True)
+                (carpeta / archivo).write_bytes(datos)
+                info['partes'].append({"archivo": archivo, "filas": len(filas),
+                                       "sha256": hashlib.sha256(datos).hexdigest()})
+                info['filas'] += len(filas)
+        except Exception as e:
+            if not tabla_inexistente(e):
+                shutil.rmtree(carpeta, ignore_errors=True)
+                raise RespaldoFallido(f"No se pudo respaldar '{tabla}': {e}") from e
+            shutil.rmtree(carpeta / tabla, ignore_errors=True)
+            manifiesto['omitidas'][tabla] = str(e)[:200]
+            continue
+        info['columnas_json'] = sorted(info['columnas_json'])
+        manifiesto['tablas'][tabla] = info
+    tmp = carpeta / 'manifest.json.tmp'
+    tmp.write_text(json.dumps(manifiesto, indent=2, ensure_ascii=False))
+    os.replace(tmp, carpeta / 'manifest.json')
+    return carpeta
+
+
+# --- CONSULTAR ---
+
+def manifiesto(carpeta):
+    return json.loads((Path(carpeta) / 'manifest.json').read_text())
+
+
+def listar(directorio=DIR_RESPALDOS):
+    """Respaldos completos, del más nuevo al más antiguo: [(carpeta, manifiesto)]."""
+    out = []
+    for m in sorted(Path(directorio).glob('*/manifest.json'), reverse=True):
+        try: out.append((m.parent, json.loads(m.read_text())))
+        except ValueError: continue
+    return out
+
+
+def verificar(carpeta):
+    """Lista de problemas (archivos faltantes o con checksum distinto). Vacía si está íntegro."""
+    carpeta = Path(carpeta)
+    problemas = []
+    for tabla, info in manifiesto(carpeta)['tablas'].items():
+        for parte in info['partes']:
+            ruta = carpeta / parte['archivo']
+            if not ruta.exists():
+                problemas.append(f"Falta {parte['archivo']}")
+                continue
+            h = hashlib.sha256()
+            with open(ruta, 'rb') as f:
+                for bloque in iter(lambda: f.read(1 << 20), b''): h.update(bloque)
+            if h.hexdigest() != parte['sha256']: problemas.append(f"Checksum distinto en {parte['archivo']}")
+    return problemas
+
+
+# --- RESTAURAR ---
+
+def _filas_parte(ruta, columnas_json):
+    for lote in pq.ParquetFile(ruta).iter_batches(batch_size=LOTE_RESTAURACION):
+        filas = lote.to_pylist()
+        for f in filas:
+            for c in columnas_json:
+                if f.get(c) is not None: f[c] = json.loads(f[c])
+        yield filas
+
+
+def restaurar(db, carpeta, tablas=None):
+    """Restaura un respaldo: verifica checksums, sube las filas por lotes a `restauracion_filas`
+    y las pasa a las tablas en una sola transacción (`restaurar_tablas`, sql/respaldos.sql).
+
+    `tablas` se amplía con sus dependientes; si el respaldo no trae alguna, no se restaura nada.
+    Devuelve {tabla: filas restauradas}. Al final resincroniza las secuencias de `id`.
+    """
+    carpeta = Path(carpeta)
+    problemas = verificar(carpeta)
+    if problemas: raise ValueError("Respaldo dañado: " + "; ".join(problemas[:5]))
+    man = manifiesto(carpeta)
+    orden = [t for t in con_dependientes(tablas or list(man['tablas'])) if t not in man.get('omitidas', {})]
+    faltan = [t for t in orden if t not in man['tablas']]
+    if faltan: raise ValueError(f"El respaldo no incluye {', '.join(faltan)}, que se restauran junto con las tablas elegidas")
+
+    restauracion = f"{carpeta.name}:{datetime.now():%H%M%S%f}"
+    try:
+        for tabla in orden:
+            info = man['tablas'][tabla]
+            for parte in info['partes']:
+                for filas in _filas_parte(carpeta / parte['archivo'], info['columnas_json']):
+                    db.table('restauracion_filas').insert(
+                        [{"restauracion": restauracion, "tabla": tabla, "fila": f} for f in filas]).execute()
+        con_id = [t for t in orden if man['tablas'][t]['claves'] == ['id']]
+        return db.rpc('restaurar_tablas', {"p_restauracion": restauracion, "p_tablas": orden,
+                                           "p_con_id": con_id}).execute().data
+    except Exception:
+        # Las tablas reales quedan como estaban; solo se limpia lo subido
+        db.table('restauracion_filas').delete().eq('restauracion', restauracion).execute()
+        raise
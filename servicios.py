@@ -0,0 +1,213 @@
+"""Operaciones del negocio sin interfaz.
+
+Las usa la app de Streamlit y también `cli.py`, para correrlas como tareas programadas.
+Nada aquí importa Streamlit: los errores se lanzan y los mensajes se devuelven.
+"""
+import csv
+import json
+from datetime import datetime
+
+import numpy as np
+
+import archivo
+import costeo
+import escenarios
+import libro
+import liquidacion
+import precios
+import respaldos
+from conexion import leer_paginado
+
+
+def registrar_gasto(db, monto, descripcion, fecha=None):
+    """Registra una compra de insumos en el libro financiero."""
+    return libro.registrar_compra(db, monto, descripcion, fecha)
+
+
+# --- STOCK ---
+
+def liquidar_stock(db, metodo='promedio'):
+    """Descuenta de una vez el stock de todos los pedidos entregados sin liquidar (ver liquidacion.py)."""
+    return liquidacion.liquidar(db, metodo)
+
+
+# --- PEDIDOS ---
+
+# Movimientos permitidos en el tablero. Entregado → Cancelado es una devolución.
+TRANSICIONES = {
+    'Pendiente': {'En Horno', 'Cancelado'},
+    'En Horno': {'Listo', 'Cancelado'},
+    'Listo': {'Entregado', 'Cancelado'},
+    'Entregado': {'Cancelado'},
+    'Cancelado': set(),
+}
+
+
+class TransicionInvalida(ValueError):
+    pass
+
+
+class ConflictoPedido(Exception):
+    """Otro dispositivo cambió el pedido primero. `actual` es la fila vigente (None si ya no existe)."""
+
+    def __init__(self, id_pedido, actual):
+        self.id_pedido = id_pedido
+        self.actual = actual
+        estado = f"está '{actual['estado']}'" if actual else "ya no existe"
+        super().__init__(f"El pedido #{id_pedido} cambió en otro dispositivo: ahora {estado}.")
+
+
+def obtener_pedido(db, id_pedido):
+    filas = db.table('pedidos').select("*").eq('id', id_pedido).execute().data
+    if filas: return filas[0]
+    viejo = archivo.buscar(db, id_pedido, "estado")
+    if viejo: raise LookupError(f"El pedido #{id_pedido} ({viejo['estado']}) está archivado y ya no se puede modificar")
+    raise LookupError(f"No existe el pedido #{id_pedido}")
+
+
+def transicion(db, pedido, nuevo_estado):
+    """Cambia el estado solo si el pedido sigue en el estado y versión con que se leyó.
+
+    Es un update condicional (id + estado + version) que sube la versión. Si no actualiza
+    ninguna fila, otro dispositivo se adelantó y se lanza `ConflictoPedido` con la fila vigente.
+    Devuelve la fila actualizada.
+    """
+    estado, version = pedido['estado'], pedido.get('version', 1)
+    if nuevo_estado not in TRANSICIONES.get(estado, ()):
+        raise TransicionInvalida(f"Pedido #{pedido['id']}: no se puede pasar de '{estado}' a '{nuevo_estado}'.")
+    filas = (db.table('pedidos').update({'estado': nuevo_estado, 'version': version + 1})
+             .eq('id', pedido['id']).eq('estado', estado).eq('version', version).execute().data)
+    if not filas:
+        actual = db.table('pedidos').select("*").eq('id', pedido['id']).execute().data
+        raise ConflictoPedido(pedido['id'], actual[0] if actual else None)
+    return filas[0]
+
+
+def _cierre(db, funcion, pedido, nuevo_estado):
+    """Entrega o cancelación en una sola llamada (sql/entregas.sql): estado, libro y marca de
+    liquidación en la misma transacción. Mismas reglas y conflictos que `transicion`."""
+    estado = pedido['estado']
+    if nuevo_estado not in TRANSICIONES.get(estado, ()):
+        raise TransicionInvalida(f"Pedido #{pedido['id']}: no se puede pasar de '{estado}' a '{nuevo_estado}'.")
+    res = db.rpc(funcion, {"p_id": pedido['id'], "p_estado": estado, "p_version": pedido.get('version', 1)}).execute().data
+    if res['conflicto']: raise ConflictoPedido(pedido['id'], res['pedido'])
+    return res['pedido']
+
+
+def cambiar_estado_pedido(db, id_pedido, nuevo_estado, datos_pedido=None):
+    """Cambia el estado. El stock no se mueve aquí: lo ajusta la liquidación de fin de día
+    (las entregas descuentan y las devoluciones de pedidos ya liquidados reponen)."""
+    pedido = datos_pedido or obtener_pedido(db, id_pedido)
+    if nuevo_estado == 'Entregado': entregar_pedido(db, pedido)
+    elif nuevo_estado == 'Cancelado': cancelar_pedido(db, pedido)
+    else: transicion(db, pedido, nuevo_estado)
+    if nuevo_estado == "Cancelado" and pedido['estado'] == 'Entregado':
+        return " | 🔄 El stock se repone en la próxima liquidación"
+    if nuevo_estado == "Entregado":
+        return " | 📉 El stock se descuenta en la próxima liquidación"
+    return " | Pedido cerrado" if nuevo_estado == "Cancelado" else ""
+
+
+def entregar_pedido(db, pedido):
+    """Marca el pedido como entregado y registra la venta en el libro. Devuelve la fila actualizada.
+
+    Todo en una transacción: si otro dispositivo se adelantó no cambia nada (ni suma ingresos).
+    """
+    return _cierre(db, 'entregar_pedido', pedido, 'Entregado')
+
+
+def cancelar_pedido(db, pedido):
+    """Cancela el pedido. Si ya estaba entregado es una devolución: reversa la venta en el
+    libro y, si ya se liquidó, la próxima liquidación repone el stock. Devuelve la fila actualizada."""
+    return _cierre(db, 'cancelar_pedido', pedido, 'Cancelado')
+
+
+# --- COSTOS ---
+
+def recostear(db):
+    """Recalcula el costo de todas las recetas con el costo actual de los insumos.
+
+    Actualiza el costo de cada línea en `ingredientes_json` y devuelve, por variación,
+    costo de ingredientes, precio y margen bruto.
+    """
+    insumos = {i['nombre']: i for i in db.table('insumos').select("nombre, unidad_medida, costo_unitario").execute().data}
+    variaciones = db.table('variaciones').select("id, nombre, precio, ingredientes_json, rendimiento").execute().data
+    informe = []
+    for v in variaciones:
+        try: ings = json.loads(v['ingredientes_json'] or '[]')
+        except ValueError: continue
+        costos = costeo.costo_lineas(ings, insumos) if ings else []
+        for ing, costo in zip(ings, costos):
+            if not np.isnan(costo): ing['costo'] = float(costo)
+        total = sum(ing.get('costo') or 0 for ing in ings)
+        db.table('variaciones').update({"ingredientes_json": json.dumps(ings)}).eq('id', v['id']).execute()
+        costo_unidad = total / (v.get('rendimiento') or 1)
+        precio = v.get('precio') or 0
+        informe.append({
+            "id": v['id'], "nombre": v['nombre'], "costo_ingredientes": round(costo_unidad, 2),
+            "precio": precio, "margen_bruto": round((precio - costo_unidad) / precio * 100, 1) if precio else None,
+        })
+    return informe
+
+
+def costos_a_fecha(db, fecha):
+    """Costo de ingredientes por unidad de cada variación con los costos vigentes en `fecha`, contra hoy."""
+    insumos = db.table('insumos').select("id, nombre, unidad_medida, costo_unitario").execute().data
+    variaciones = db.table('variaciones').select("id, nombre, precio, ingredientes_json, rendimiento").execute().data
+    historial = precios.HistorialPrecios(precios.leer_historial(db))
+    return precios.deriva(escenarios.Recetas(variaciones, insumos), historial, fecha)
+
+
+# --- FINANZAS ---
+
+def recalcular_saldos(db):
+    """Reconstruye `saldos_cuenta` desde los movimientos del libro."""
+    return db.rpc('recalcular_saldos', {}).execute().data
+
+
+# --- MANTENIMIENTO (siempre con respaldo previo) ---
+
+TABLAS_FINANZAS = ['gastos', 'movimientos', 'asientos', 'saldos_cuenta']
+
+
+def borrar_inventario(db):
+    """Borra todos los insumos. Antes respalda la base completa (si falla, no borra nada); devuelve la carpeta del respaldo."""
+    carpeta = respaldos.crear(db, "antes de borrar inventario")
+    db.table('insumos').delete().neq('id', 0).execute()
+    return carpeta
+
+
+def borrar_finanzas(db):
+    """Borra gastos y el libro contable. Antes respalda la base completa (si falla, no borra nada); devuelve la carpeta del respaldo."""
+    carpeta = respaldos.crear(db, "antes de borrar finanzas")
+    db.table('gastos').delete().neq('id', 0).execute()
+    db.table('movimientos').delete().neq('id', 0).execute()
+    db.table('asientos').delete().neq('id', 0).execute()
+    db.table('saldos_cuenta').delete().neq('mes', '').execute()
+    return carpeta
+
+
+def restaurar_respaldo(db, carpeta, tablas=None):
+    """Restaura `carpeta`. Como pisa los datos actuales, primero respalda lo que hay (con las dependientes)."""
+    previo = respaldos.crear(db, "antes de restaurar", respaldos.con_dependientes(tablas) if tablas else None)
+    return respaldos.restaurar(db, carpeta, tablas), previo
+
+
+# --- EXPORTACIÓN ---
+
+def exportar(db, tabla, destino, columnas="*"):
+    """Exporta `tabla` a CSV. Devuelve la cantidad de filas escritas."""
+    n = 0
+    with open(destino, 'w', newline='', encoding='utf-8') as f:
+        escritor = None
+        for fila in leer_paginado(db, tabla, columnas):
+            if escritor is None:
+                escritor = csv.DictWriter(f, fieldnames=list(fila.keys()), extrasaction='ignore')
+                escritor.writeheader()
+            escritor.writerow(fila)
+            n += 1
+    return n
+
+
+def nombre_exportacion(tabla):
+    return f"{tabla}_{datetime.now():%Y%m%d_%H%M}.csv"
@@ -0,0 +1,37 @@
+-- Archivo de pedidos cerrados (ver archivo.py). `pedidos` queda con los pedidos abiertos y
+-- los cerrados de los últimos días; el resto vive en `pedidos_historicos`.
+create table if not exists pedidos_historicos (like pedidos including defaults);
+alter table pedidos_historicos add column if not exists archivado_en timestamptz not null default now();
+alter table pedidos_historicos drop constraint if exists pedidos_historicos_pkey;
+alter table pedidos_historicos add primary key (id);
+create index if not exists pedidos_historicos_cliente_idx on pedidos_historicos (cliente_id, id desc);
+create index if not exists pedidos_historicos_fecha_idx on pedidos_historicos (fecha_entrega);
+
+-- El tablero filtra `estado <> 'Cancelado' and estado <> 'Entregado'` en cada rerun:
+-- este índice solo contiene esos pedidos, así que no crece con la historia.
+create index if not exists pedidos_abiertos_idx on pedidos (fecha_entrega)
+    where estado <> 'Cancelado' and estado <> 'Entregado';
+
+-- Mueve en una transacción los pedidos cerrados con entrega anterior a hoy - p_dias.
+-- Quedan fuera los que la liquidación aún debe procesar (entregas sin liquidar y
+-- cancelaciones de pedidos ya liquidados). Si se agrega una columna a `pedidos`,
+-- agregarla también a `pedidos_historicos` antes de archivar.
+create or replace function archivar_pedidos(p_dias integer)
+returns integer language plpgsql as $$
+declare
+    v_filas integer;
+begin
+    -- La misma llave que la liquidación: no se archiva a mitad de una liquidación
+    perform pg_advisory_xact_lock(hashtext('liquidacion_stock'));
+
+    with movidos as (
+        delete from pedidos
+         where fecha_entrega < current_date - p_dias
+           and ((estado = 'Entregado' and liquidacion_id is not null)
+             or (estado = 'Cancelado' and liquidacion_id is null))
+        returning *
+    )
+    insert into pedidos_historicos select m.*, now() from movidos m;
+    get diagnostics v_filas = row_count;
+    return v_filas;
+end $$;
@@ -0,0 +1,12 @@
+-- Directorio de clientes deduplicado por teléfono normalizado (ver clientes.py)
+create table if not exists clientes (
+    id bigint generated by default as identity primary key,
+    nombre text not null,
+    telefono text not null unique,   -- normalizado: +569XXXXXXXX o solo dígitos
+    creado_en timestamptz not null default now()
+);
+
+alter table pedidos add column if not exists cliente_id bigint references clientes(id);
+
+-- "Repetir último pedido": último pedido de un cliente sin recorrer la tabla
+create index if not exists pedidos_cliente_idx on pedidos (cliente_id, id desc);
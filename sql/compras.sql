@@ -0,0 +1,13 @@
+-- Envases de compra por insumo (ver compras.py). Se guarda el último precio de cada tamaño
+-- visto al registrar una compra o actualizar precios; la lista de compras elige entre ellos
+-- la combinación más barata que cubre el faltante.
+create table if not exists envases_insumo (
+    id bigint generated by default as identity primary key,
+    insumo_id bigint not null references insumos (id) on delete cascade,
+    contenido numeric not null check (contenido > 0),     -- en la unidad base del insumo
+    precio numeric not null check (precio > 0),           -- precio del envase completo
+    cantidad_envase numeric,                              -- como se ingresó (p. ej. 397 gr)
+    unidad_envase text,
+    actualizado_en timestamptz not null default now(),
+    unique (insumo_id, contenido)
+);
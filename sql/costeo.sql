@@ -0,0 +1,121 @@
+-- Costeo por promedio ponderado / FIFO (ver costeo.py)
+alter table insumos add column if not exists ultimo_precio numeric;
+
+create table if not exists lotes_insumo (
+    id bigint generated by default as identity primary key,
+    insumo_id bigint not null references insumos(id) on delete cascade,
+    fecha timestamptz not null default now(),
+    cantidad numeric not null,
+    restante numeric not null,
+    costo_unitario numeric not null
+);
+
+-- Solo interesan los lotes con saldo, en orden de llegada
+create index if not exists lotes_insumo_abiertos_idx
+    on lotes_insumo (insumo_id, fecha, id) where restante > 0;
+
+-- Compra: agrega el lote y suma el stock sobre la fila bloqueada, así dos compras (o una
+-- compra y la liquidación) al mismo tiempo no se pisan. El costo mantenido pasa a ser el
+-- valor del stock (al costo anterior) más lo pagado, dividido por la cantidad nueva; igual
+-- en promedio y en FIFO. Devuelve el costo mantenido nuevo.
+create or replace function registrar_compra(p_insumo_id bigint, p_cantidad numeric, p_costo_total numeric,
+                                            p_fecha timestamptz default now())
+returns numeric language plpgsql as $$
+declare
+    v_ins record;
+    v_previo numeric;
+    v_costo numeric;
+begin
+    select stock_actual, coalesce(costo_unitario, 0) as costo_unitario into v_ins
+      from insumos where id = p_insumo_id for update;
+    if not found then raise exception 'Insumo % no existe', p_insumo_id; end if;
+    if p_cantidad <= 0 then return v_ins.costo_unitario; end if;
+
+    insert into lotes_insumo (insumo_id, fecha, cantidad, restante, costo_unitario)
+    values (p_insumo_id, coalesce(p_fecha, now()), p_cantidad, p_cantidad, p_costo_total / p_cantidad);
+
+    v_previo := greatest(coalesce(v_ins.stock_actual, 0), 0);
+    v_costo := (v_previo * v_ins.costo_unitario + p_costo_total) / (v_previo + p_cantidad);
+    update insumos set stock_actual = coalesce(stock_actual, 0) + p_cantidad, costo_unitario = v_costo,
+                       ultimo_precio = p_costo_total / p_cantidad
+     where id = p_insumo_id;
+    return v_costo;
+end $$;
+
+-- Saca `p_cantidad` del stock de un insumo y devuelve su costo. En FIFO sale primero el
+-- stock anterior a los lotes, luego los lotes más antiguos y lo que exceda a los lotes al
+-- costo mantenido, que se recalcula con lo que queda. En promedio los lotes no se tocan.
+-- La usan la liquidación (sql/liquidacion.sql) y los ajustes manuales.
+create or replace function consumir_stock(p_insumo_id bigint, p_cantidad numeric, p_fifo boolean)
+returns numeric language plpgsql as $$
+declare
+    v_ins record;
+    l record;
+    v_pendiente numeric;
+    v_usado numeric;
+    v_costo numeric;
+    v_costo_total numeric := 0;
+    v_en_lotes numeric;
+    v_valor numeric;
+    v_sin_lote numeric;
+begin
+    select stock_actual, coalesce(costo_unitario, 0) as costo_unitario into v_ins
+      from insumos where id = p_insumo_id for update;
+    if not found then return 0; end if;
+
+    if p_cantidad > 0 and p_fifo then
+        select coalesce(sum(restante), 0) into v_en_lotes
+          from lotes_insumo where insumo_id = p_insumo_id and restante > 0;
+        v_usado := least(greatest(v_ins.stock_actual - v_en_lotes, 0), p_cantidad);
+        v_costo_total := v_usado * v_ins.costo_unitario;
+        v_pendiente := p_cantidad - v_usado;
+        for l in select id, restante, costo_unitario from lotes_insumo
+                  where insumo_id = p_insumo_id and restante > 0 order by fecha, id for update loop
+            exit when v_pendiente <= 0;
+            v_usado := least(l.restante, v_pendiente);
+            update lotes_insumo set restante = restante - v_usado where id = l.id;
+            v_costo_total := v_costo_total + v_usado * l.costo_unitario;
+            v_pendiente := v_pendiente - v_usado;
+        end loop;
+        v_costo_total := v_costo_total + v_pendiente * v_ins.costo_unitario;
+
+        -- Costo mantenido: valor de lo que queda (lotes abiertos + stock sin lote) / cantidad
+        select coalesce(sum(restante), 0), coalesce(sum(restante * costo_unitario), 0) into v_en_lotes, v_valor
+          from lotes_insumo where insumo_id = p_insumo_id and restante > 0;
+        v_sin_lote := greatest(v_ins.stock_actual - p_cantidad - v_en_lotes, 0);
+        v_costo := case when v_en_lotes + v_sin_lote > 0
+                        then (v_valor + v_sin_lote * v_ins.costo_unitario) / (v_en_lotes + v_sin_lote)
+                        else v_ins.costo_unitario end;
+        update insumos set stock_actual = stock_actual - p_cantidad, costo_unitario = v_costo where id = p_insumo_id;
+    else
+        if p_cantidad > 0 then v_costo_total := p_cantidad * v_ins.costo_unitario; end if;
+        update insumos set stock_actual = stock_actual - p_cantidad where id = p_insumo_id;
+    end if;
+    return v_costo_total;
+end $$;
+
+-- Ajuste manual de inventario: suma `p_cantidad` o, con `p_fijar`, deja el stock en
+-- `p_cantidad`. La diferencia se calcula aquí sobre la fila bloqueada. Lo que sobra entra
+-- como un lote al costo mantenido (el costo no cambia) y lo que falta sale como un consumo,
+-- así los lotes FIFO siguen cuadrando con el stock. Devuelve el stock nuevo.
+create or replace function ajustar_stock(p_insumo_id bigint, p_cantidad numeric, p_fijar boolean,
+                                         p_metodo text default 'promedio')
+returns numeric language plpgsql as $$
+declare
+    v_ins record;
+    v_delta numeric;
+begin
+    select stock_actual, coalesce(costo_unitario, 0) as costo_unitario into v_ins
+      from insumos where id = p_insumo_id for update;
+    if not found then raise exception 'Insumo % no existe', p_insumo_id; end if;
+    v_delta := case when p_fijar then p_cantidad - coalesce(v_ins.stock_actual, 0) else p_cantidad end;
+
+    if v_delta > 0 then
+        insert into lotes_insumo (insumo_id, cantidad, restante, costo_unitario)
+        values (p_insumo_id, v_delta, v_delta, v_ins.costo_unitario);
+        update insumos set stock_actual = coalesce(stock_actual, 0) + v_delta where id = p_insumo_id;
+    elsif v_delta < 0 then
+        perform consumir_stock(p_insumo_id, -v_delta, p_metodo = 'fifo');
+    end if;
+    return coalesce(v_ins.stock_actual, 0) + v_delta;
+end $$;
@@ -0,0 +1,69 @@
+-- Entrega y cancelación de pedidos en una sola llamada (ver servicios.entregar_pedido / cancelar_pedido).
+-- Cambio de estado, asiento en el libro y marca para la liquidación de stock en la misma
+-- transacción: o se aplica todo o nada.
+--
+-- El stock no se descuenta aquí: lo mueve la liquidación de fin de día (sql/liquidacion.sql)
+-- a partir de `liquidacion_id`, que esta misma transacción deja en el estado correcto
+-- (entrega = pendiente de liquidar; cancelación de un pedido ya liquidado = devolución pendiente).
+--
+-- Devuelven {"conflicto": false, "pedido": fila actualizada} o, si el pedido ya no está en el
+-- estado/versión que vio el cliente, {"conflicto": true, "pedido": fila vigente o null} sin tocar nada.
+
+create or replace function entregar_pedido(p_id bigint, p_estado text, p_version integer)
+returns jsonb language plpgsql as $$
+declare
+    v pedidos;
+    v_existe boolean;
+begin
+    select * into v from pedidos where id = p_id for update;
+    v_existe := found;
+    if not v_existe or v.estado <> p_estado or v.version <> p_version then
+        return jsonb_build_object('conflicto', true, 'pedido', case when v_existe then to_jsonb(v) end);
+    end if;
+    if v.estado <> 'Listo' then
+        raise exception 'Pedido #%: no se puede pasar de ''%'' a ''Entregado''', p_id, v.estado;
+    end if;
+
+    update pedidos set estado = 'Entregado', version = version + 1
+     where id = p_id returning * into v;
+
+    perform registrar_asientos(jsonb_build_array(jsonb_build_object(
+        'fecha', current_date, 'descripcion', format('Venta Pedido #%s - %s', v.id, v.cliente_nombre),
+        'referencia', 'pedido:' || v.id,
+        'lineas', jsonb_build_array(jsonb_build_object('cuenta', 'caja', 'debe', v.total_pedido),
+                                    jsonb_build_object('cuenta', 'ventas', 'haber', v.total_pedido)))));
+
+    return jsonb_build_object('conflicto', false, 'pedido', to_jsonb(v));
+end $$;
+
+create or replace function cancelar_pedido(p_id bigint, p_estado text, p_version integer)
+returns jsonb language plpgsql as $$
+declare
+    v pedidos;
+    v_existe boolean;
+    v_era_entregado boolean;
+begin
+    select * into v from pedidos where id = p_id for update;
+    v_existe := found;
+    if not v_existe or v.estado <> p_estado or v.version <> p_version then
+        return jsonb_build_object('conflicto', true, 'pedido', case when v_existe then to_jsonb(v) end);
+    end if;
+    if v.estado = 'Cancelado' then
+        raise exception 'Pedido #%: ya está cancelado', p_id;
+    end if;
+    v_era_entregado := v.estado = 'Entregado';
+
+    -- liquidacion_id se conserva: si ya se liquidó, la próxima liquidación repone el stock
+    update pedidos set estado = 'Cancelado', version = version + 1
+     where id = p_id returning * into v;
+
+    if v_era_entregado then
+        perform registrar_asientos(jsonb_build_array(jsonb_build_object(
+            'fecha', current_date, 'descripcion', format('Devolución Pedido #%s - %s', v.id, v.cliente_nombre),
+            'referencia', 'devolucion:' || v.id,
+            'lineas', jsonb_build_array(jsonb_build_object('cuenta', 'ventas', 'debe', v.total_pedido),
+                                        jsonb_build_object('cuenta', 'caja', 'haber', v.total_pedido)))));
+    end if;
+
+    return jsonb_build_object('conflicto', false, 'pedido', to_jsonb(v));
+end $$;
@@ -0,0 +1,21 @@
+-- Totales de las grillas de insumos (ver grillas.py) sin traer las filas: cantidad de
+-- insumos del filtro, valor del inventario y cuántos tienen stock bajo. Los parámetros
+-- nulos no filtran.
+create or replace function resumen_insumos(p_buscar text, p_unidad text, p_stock_max numeric, p_umbral_bajo numeric)
+returns jsonb language sql stable as $$
+    select jsonb_build_object(
+        'filas', count(*),
+        'valor', coalesce(sum(greatest(stock_actual, 0) * coalesce(costo_unitario, 0)), 0),
+        'bajo_stock', count(*) filter (where stock_actual <= p_umbral_bajo)
+    )
+      from insumos
+     where (p_buscar is null or nombre ilike '%' || p_buscar || '%')
+       and (p_unidad is null or unidad_medida = p_unidad)
+       and (p_stock_max is null or stock_actual <= p_stock_max);
+$$;
+
+-- Búsqueda por parte del nombre (ilike '%texto%') y orden de las columnas de la grilla
+create extension if not exists pg_trgm;
+create index if not exists insumos_nombre_trgm_idx on insumos using gin (nombre gin_trgm_ops);
+create index if not exists insumos_stock_idx on insumos (stock_actual, id);
+create index if not exists insumos_costo_idx on insumos (costo_unitario, id);
@@ -0,0 +1,100 @@
+-- Libro contable de partida doble con saldos mensuales mantenidos al escribir (ver libro.py)
+
+create table if not exists cuentas (
+    codigo text primary key,
+    nombre text not null,
+    tipo text not null check (tipo in ('activo', 'ingreso', 'gasto'))
+);
+
+insert into cuentas (codigo, nombre, tipo) values
+    ('caja', 'Caja', 'activo'),
+    ('ventas', 'Ventas', 'ingreso'),
+    ('compras', 'Compras de Insumos', 'gasto'),
+    ('ajustes', 'Ajustes', 'gasto')
+on conflict (codigo) do nothing;
+
+create table if not exists asientos (
+    id bigint generated by default as identity primary key,
+    fecha date not null,
+    descripcion text,
+    referencia text unique,          -- evita duplicar el mismo hecho (ej: 'pedido:12', 'gastos:7')
+    creado_en timestamptz not null default now()
+);
+
+create table if not exists movimientos (
+    id bigint generated by default as identity primary key,
+    asiento_id bigint not null references asientos(id) on delete cascade,
+    cuenta text not null references cuentas(codigo),
+    fecha date not null,
+    debe numeric not null default 0,
+    haber numeric not null default 0
+);
+create index if not exists movimientos_cuenta_fecha_idx on movimientos (cuenta, fecha);
+
+create table if not exists saldos_cuenta (
+    cuenta text not null references cuentas(codigo),
+    mes text not null,               -- 'YYYY-MM'
+    debe numeric not null default 0,
+    haber numeric not null default 0,
+    primary key (cuenta, mes)
+);
+
+-- Registra un lote de asientos en una transacción. Cada asiento:
+-- {"fecha": "2025-01-31", "descripcion": "...", "referencia": "...",
+--  "lineas": [{"cuenta": "caja", "debe": 1000}, {"cuenta": "ventas", "haber": 1000}]}
+-- Los asientos cuya referencia ya existe se ignoran. Devuelve cuántos se registraron.
+create or replace function registrar_asientos(p_asientos jsonb)
+returns integer language plpgsql as $$
+declare
+    a jsonb;
+    l jsonb;
+    v_id bigint;
+    v_fecha date;
+    v_total_debe numeric;
+    v_total_haber numeric;
+    v_registrados integer := 0;
+begin
+    for a in select * from jsonb_array_elements(p_asientos) loop
+        v_fecha := (a->>'fecha')::date;
+        select coalesce(sum((x->>'debe')::numeric), 0), coalesce(sum((x->>'haber')::numeric), 0)
+          into v_total_debe, v_total_haber
+          from jsonb_array_elements(a->'lineas') x;
+        if v_total_debe <> v_total_haber then
+            raise exception 'Asiento descuadrado (%): debe % / haber %', a->>'descripcion', v_total_debe, v_total_haber;
+        end if;
+
+        insert into asientos (fecha, descripcion, referencia)
+        values (v_fecha, a->>'descripcion', a->>'referencia')
+        on conflict (referencia) do nothing
+        returning id into v_id;
+        continue when v_id is null;
+
+        for l in select * from jsonb_array_elements(a->'lineas') loop
+            insert into movimientos (asiento_id, cuenta, fecha, debe, haber)
+            values (v_id, l->>'cuenta', v_fecha, coalesce((l->>'debe')::numeric, 0), coalesce((l->>'haber')::numeric, 0));
+
+            insert into saldos_cuenta (cuenta, mes, debe, haber)
+            values (l->>'cuenta', to_char(v_fecha, 'YYYY-MM'), coalesce((l->>'debe')::numeric, 0), coalesce((l->>'haber')::numeric, 0))
+            on conflict (cuenta, mes) do update
+               set debe = saldos_cuenta.debe + excluded.debe,
+                   haber = saldos_cuenta.haber + excluded.haber;
+        end loop;
+        v_registrados := v_registrados + 1;
+    end loop;
+    return v_registrados;
+end $$;
+
+-- Reconstruye los saldos mensuales desde los movimientos (tarea de mantenimiento / cli.py saldos)
+create or replace function recalcular_saldos()
+returns integer language plpgsql as $$
+declare
+    v_filas integer;
+begin
+    delete from saldos_cuenta where true;
+    insert into saldos_cuenta (cuenta, mes, debe, haber)
+    select cuenta, to_char(fecha, 'YYYY-MM'), sum(debe), sum(haber)
+      from movimientos
+     group by cuenta, to_char(fecha, 'YYYY-MM');
+    get diagnostics v_filas = row_count;
+    return v_filas;
+end $$;
@@ -0,0 +1,76 @@
+-- Liquidación de stock de fin de día (ver liquidacion.py). Requiere sql/costeo.sql (consumir_stock).
+create table if not exists liquidaciones (
+    id bigint generated by default as identity primary key,
+    creada_en timestamptz not null default now(),
+    pedidos integer not null default 0,       -- entregas liquidadas
+    reversos integer not null default 0,      -- devoluciones revertidas
+    costo numeric not null default 0,         -- costo de los insumos consumidos
+    detalle jsonb                             -- consumo neto por insumo
+);
+
+-- Marca de agua por pedido: null = entregado y aún sin liquidar
+alter table pedidos add column if not exists liquidacion_id bigint references liquidaciones(id);
+create index if not exists pedidos_sin_liquidar_idx on pedidos (estado) where liquidacion_id is null;
+
+-- Línea base al instalar: las entregas anteriores ya descontaron su stock a mano, así que
+-- quedan marcadas con una liquidación inicial de costo 0 en vez de contarse como pendientes
+-- (la primera corrida las descontaría de nuevo y la lista de compras las pediría).
+-- Los cancelados quedan en null: nunca se liquidaron, no hay nada que revertir.
+-- Solo corre con la tabla vacía, así reinstalar no vuelve a marcar nada.
+do $$
+declare
+    v_id bigint;
+begin
+    if not exists (select 1 from liquidaciones) then
+        insert into liquidaciones (pedidos, detalle) values (0, '[]') returning id into v_id;
+        update pedidos set liquidacion_id = v_id where estado = 'Entregado' and liquidacion_id is null;
+        update liquidaciones set pedidos = (select count(*) from pedidos where liquidacion_id = v_id) where id = v_id;
+    end if;
+end $$;
+
+-- Aplica una liquidación calculada por liquidacion.preparar() en una sola transacción:
+-- {"pedidos": [ids], "reversos": [ids], "consumo": [{"insumo_id", "cantidad"}], "metodo": "promedio"|"fifo"}
+-- El cliente solo manda cantidades consumidas: stock, lotes FIFO y costo mantenido los
+-- calcula consumir_stock (sql/costeo.sql) sobre las filas bloqueadas, así una compra
+-- registrada mientras se preparaba la liquidación no se pisa. Devuelve {"id", "costo"} con el costo de lo consumido.
+-- Si algún pedido ya fue marcado por otra corrida, falla y no aplica nada (se puede reintentar).
+drop function if exists aplicar_liquidacion(jsonb);
+create or replace function aplicar_liquidacion(p jsonb)
+returns jsonb language plpgsql as $$
+declare
+    v_id bigint;
+    v_filas integer;
+    v_fifo boolean := coalesce(p->>'metodo', 'promedio') = 'fifo';
+    c record;
+    v_costo_total numeric := 0;
+begin
+    perform pg_advisory_xact_lock(hashtext('liquidacion_stock'));
+
+    insert into liquidaciones (pedidos, reversos, detalle)
+    values (jsonb_array_length(p->'pedidos'), jsonb_array_length(p->'reversos'), p->'consumo')
+    returning id into v_id;
+
+    update pedidos set liquidacion_id = v_id
+     where id in (select jsonb_array_elements_text(p->'pedidos')::bigint)
+       and estado = 'Entregado' and liquidacion_id is null;
+    get diagnostics v_filas = row_count;
+    if v_filas <> jsonb_array_length(p->'pedidos') then
+        raise exception 'Hay pedidos que ya se liquidaron o cambiaron de estado: vuelve a correr la liquidación';
+    end if;
+
+    update pedidos set liquidacion_id = null
+     where id in (select jsonb_array_elements_text(p->'reversos')::bigint)
+       and estado = 'Cancelado' and liquidacion_id is not null;
+    get diagnostics v_filas = row_count;
+    if v_filas <> jsonb_array_length(p->'reversos') then
+        raise exception 'Hay devoluciones que ya se revirtieron: vuelve a correr la liquidación';
+    end if;
+
+    for c in select (x->>'insumo_id')::bigint as id, (x->>'cantidad')::numeric as cantidad
+               from jsonb_array_elements(p->'consumo') x order by 1 loop
+        v_costo_total := v_costo_total + consumir_stock(c.id, c.cantidad, v_fifo);
+    end loop;
+
+    update liquidaciones set costo = round(v_costo_total, 2) where id = v_id;
+    return jsonb_build_object('id', v_id, 'costo', round(v_costo_total, 2));
+end $$;
@@ -0,0 +1,17 @@
+-- Importación de listas de precios (ver lista_precios.py). Solo viajan {id, ultimo_precio}
+-- y se actualiza esa columna en un único update: el resto de la fila no se toca, así que no
+-- pisa stock ni otros cambios hechos mientras se revisaba la vista previa. El costo
+-- mantenido (`costo_unitario`) no cambia: lo calcula el motor de costeo con las compras.
+-- Requiere sql/costeo.sql (columna ultimo_precio).
+create or replace function actualizar_precios(p_filas jsonb)
+returns integer language plpgsql as $$
+declare
+    v_filas integer;
+begin
+    update insumos i
+       set ultimo_precio = f.ultimo_precio
+      from jsonb_to_recordset(p_filas) as f(id bigint, ultimo_precio numeric)
+     where i.id = f.id;
+    get diagnostics v_filas = row_count;
+    return v_filas;
+end $$;
@@ -0,0 +1,4 @@
+-- Concurrencia optimista en los estados de pedidos (ver servicios.transicion / TRANSICIONES).
+-- Cada cambio de estado es: update ... set estado = nuevo, version = version + 1
+--                          where id = ? and estado = <visto> and version = <vista>
+alter table pedidos add column if not exists version integer not null default 1;
@@ -0,0 +1,39 @@
+-- Historial de costos por insumo (ver precios.py). Cada vez que cambia `costo_unitario`
+-- (compra, ficha nueva, liquidación FIFO o la consola) el trigger agrega una fila. Al
+-- restaurar un respaldo no: el historial viene en el respaldo (restaurar_tablas marca
+-- `erp.restaurando` para la transacción). Las filas no se modifican: un
+-- costo equivocado se corrige con otro cambio, que queda como una fila más.
+-- Requiere sql/versiones.sql (la caché del historial se invalida con su versión).
+create table if not exists precios_insumo (
+    id bigint generated by default as identity primary key,
+    insumo_id bigint not null references insumos (id) on delete cascade,
+    costo_unitario numeric not null,
+    vigente_desde timestamptz not null default now()
+);
+create index if not exists precios_insumo_vigencia_idx on precios_insumo (insumo_id, vigente_desde, id);
+
+create or replace function registrar_precio_insumo()
+returns trigger language plpgsql as $$
+begin
+    if current_setting('erp.restaurando', true) = 'on' then return null; end if;
+    if new.costo_unitario is not null
+       and (tg_op = 'INSERT' or new.costo_unitario is distinct from old.costo_unitario) then
+        insert into precios_insumo (insumo_id, costo_unitario) values (new.id, new.costo_unitario);
+    end if;
+    return null;
+end $$;
+
+drop trigger if exists insumos_precio on insumos;
+create trigger insumos_precio after insert or update of costo_unitario on insumos
+    for each row execute function registrar_precio_insumo();
+
+-- Punto de partida: el costo actual de cada insumo sin historial
+insert into precios_insumo (insumo_id, costo_unitario)
+select i.id, i.costo_unitario from insumos i
+ where i.costo_unitario is not null
+   and not exists (select 1 from precios_insumo p where p.insumo_id = i.id);
+
+insert into versiones_tabla (tabla) values ('precios_insumo') on conflict do nothing;
+drop trigger if exists precios_insumo_version on precios_insumo;
+create trigger precios_insumo_version after insert or update or delete or truncate on precios_insumo
+    for each statement execute function subir_version_tabla();
@@ -0,0 +1,67 @@
+-- Después de restaurar un respaldo con ids explícitos (ver respaldos.py), las secuencias
+-- de identidad quedan atrás y el próximo insert chocaría. Las deja en max(id) + 1.
+create or replace function sincronizar_secuencias(p_tablas text[])
+returns integer language plpgsql as $$
+declare
+    t text;
+    n integer := 0;
+begin
+    foreach t in array p_tablas loop
+        execute format('select setval(pg_get_serial_sequence(%L, ''id''), coalesce((select max(id) from %I), 0) + 1, false)', t, t);
+        n := n + 1;
+    end loop;
+    return n;
+end $$;
+
+-- Filas de un respaldo en camino (ver respaldos.restaurar): se suben por lotes aquí y
+-- restaurar_tablas las pasa a las tablas de verdad en una sola transacción. Si la subida
+-- se corta, las tablas reales no se tocaron.
+create table if not exists restauracion_filas (
+    id bigint generated by default as identity primary key,
+    restauracion text not null,
+    tabla text not null,
+    fila jsonb not null
+);
+create index if not exists restauracion_filas_idx on restauracion_filas (restauracion, tabla, id);
+
+-- Vacía `p_tablas` (hijas primero) y las carga con las filas subidas para `p_restauracion`,
+-- todo o nada: si una clave foránea falla no queda ninguna tabla a medio vaciar. Las columnas
+-- que el respaldo no trae toman su valor por defecto. Las filas de insumos no pasan por el
+-- historial de precios: precios_insumo se restaura tal como estaba.
+-- Devuelve {tabla: filas restauradas}.
+create or replace function restaurar_tablas(p_restauracion text, p_tablas text[], p_con_id text[])
+returns jsonb language plpgsql as $$
+declare
+    t text;
+    v_cols text;
+    v_sel text;
+    n integer;
+    v_res jsonb := '{}';
+begin
+    -- Solo para esta transacción: el trigger insumos_precio no agrega historial con fecha de hoy
+    perform set_config('erp.restaurando', 'on', true);
+    foreach t in array array(select x from unnest(p_tablas) with ordinality u(x, i) order by i desc) loop
+        execute format('delete from %I', t);
+    end loop;
+
+    foreach t in array p_tablas loop
+        select string_agg(format('%I', c.column_name), ', ' order by c.ordinal_position),
+               string_agg(format('r.%I', c.column_name), ', ' order by c.ordinal_position) into v_cols, v_sel
+          from information_schema.columns c
+         where c.table_schema = 'public' and c.table_name = t
+           and exists (select 1 from restauracion_filas s
+                        where s.restauracion = p_restauracion and s.tabla = t and s.fila ? c.column_name);
+        n := 0;
+        if v_cols is not null then
+            execute format('insert into %I (%s) select %s from restauracion_filas s, jsonb_populate_record(null::%I, s.fila) r '
+                           'where s.restauracion = $1 and s.tabla = $2 order by s.id', t, v_cols, v_sel, t)
+              using p_restauracion, t;
+            get diagnostics n = row_count;
+        end if;
+        v_res := v_res || jsonb_build_object(t, n);
+    end loop;
+
+    delete from restauracion_filas where restauracion = p_restauracion;
+    perform sincronizar_secuencias(p_con_id);
+    return v_res;
+end $$;
@@ -0,0 +1,29 @@
+-- Versión por tabla para la caché de lecturas (ver versiones.py). Cada sentencia que
+-- escribe en una tabla versionada (desde la app, otra réplica o la consola de Supabase)
+-- sube su versión; cada proceso consulta esta tabla una vez por rerun y solo vuelve a
+-- leer las tablas cuya versión cambió.
+create table if not exists versiones_tabla (
+    tabla text primary key,
+    version bigint not null default 0
+);
+
+create or replace function subir_version_tabla()
+returns trigger language plpgsql as $$
+begin
+    insert into versiones_tabla (tabla, version) values (TG_TABLE_NAME, 1)
+    on conflict (tabla) do update set version = versiones_tabla.version + 1;
+    return null;
+end $$;
+
+-- Un trigger por sentencia (no por fila): un upsert de 500 filas sube la versión una vez
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['insumos', 'productos', 'variaciones', 'pedidos', 'clientes', 'usuarios', 'saldos_cuenta'] loop
+        insert into versiones_tabla (tabla) values (t) on conflict do nothing;
+        execute format('drop trigger if exists %I on %I', t || '_version', t);
+        execute format('create trigger %I after insert or update or delete or truncate on %I '
+                       'for each statement execute function subir_version_tabla()', t || '_version', t);
+    end loop;
+end $$;
@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import imagenes
+from imagenes import CacheMiniaturas
+
+
+def _imagen(ruta, semilla, tam=(400, 300)):
+    # Ruido: el PNG no se comprime y pesa bastante más que sus miniaturas
+    pixeles = np.random.default_rng(semilla).integers(0, 256, (tam[1], tam[0], 3), dtype=np.uint8)
+    Image.fromarray(pixeles).save(ruta)
+    return str(ruta)
+
+
+def _contar_lecturas(cache):
+    lecturas = []
+    leer = cache._leer_origen
+    def contando(origen, validador=None):
+        lecturas.append(origen)
+        return leer(origen, validador)
+    cache._leer_origen = contando
+    return lecturas
+
+
+def _peso(directorio):
+    return sum(p.stat().st_size for p in directorio.glob('*/*') if p.suffix in ('.webp', '.orig'))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheMiniaturas(tmp_path / 'cache')
+
+
+def test_acierto_y_anchos_desde_el_original(cache, tmp_path):
+    origen = _imagen(tmp_path / 'torta.png', 1)
+    lecturas = _contar_lecturas(cache)
+
+    ruta = cache.miniatura(origen, 100)
+    assert Image.open(ruta).size == (100, 75)
+    assert cache.miniatura(origen, 100) == ruta
+    chica = cache.miniatura(origen, 50)
+    assert Image.open(chica).size[0] == 50
+    # Un solo acceso al origen: el segundo ancho sale del original guardado
+    assert lecturas == [origen]
+    assert len(list(cache.dir.glob('*/*.orig'))) == 1
+
+
+def test_desalojo_lru_por_tamano(cache, tmp_path):
+    a, b, c = (_imagen(tmp_path / f"{n}.png", i) for i, n in enumerate('abc'))
+    usada = cache.miniatura(a, 100)
+    cache.miniatura(b, 100)
+    # a y b quedan como usados hace rato; luego se vuelve a pedir la miniatura de a
+    for p in cache.dir.glob('*/*'):
+        t = 1000 if p.stem.startswith(usada.stem.split('_')[0]) else 2000
+        os.utime(p, (t, t))
+    assert cache.miniatura(a, 100) == usada
+    antes = {p: p.stat().st_mtime for p in cache.dir.glob('*/*') if p.suffix in ('.webp', '.orig')}
+
+    cache.limite = _peso(cache.dir)
+    cache.miniatura(c, 100)
+
+    quedan = {p for p in cache.dir.glob('*/*') if p.suffix in ('.webp', '.orig')}
+    borrados = set(antes) - quedan
+    assert borrados
+    assert max(antes[p] for p in borrados) <= min(antes[p] for p in set(antes) & quedan)
+    assert usada in quedan
+    assert _peso(cache.dir) <= cache.limite * 0.9
+    assert cache._total == _peso(cache.dir)
+
+
+def test_origen_fallido_espera_antes_de_reintentar(cache, tmp_path, monkeypatch):
+    origen = str(tmp_path / 'falta.png')
+    assert cache.miniatura(origen, 100) is None
+    _imagen(origen, 2)
+    # Dentro del plazo no se vuelve a intentar aunque el origen ya exista
+    assert cache.miniatura(origen, 100) is None
+    monkeypatch.setattr(imagenes, 'REINTENTO_FALLIDO', 0)
+    assert cache.miniatura(origen, 100).exists()
+
+
+def test_origen_que_no_es_imagen_no_se_guarda(cache, tmp_path):
+    origen = tmp_path / 'nota.png'
+    origen.write_text("no es una imagen")
+    assert cache.miniatura(str(origen), 100) is None
+    assert not list(cache.dir.glob('*/*'))
+
+
+def test_origen_reemplazado_se_refresca(cache, tmp_path, monkeypatch):
+    origen = _imagen(tmp_path / 'torta.png', 1)
+    vieja = cache.miniatura(origen, 100)
+    _imagen(origen, 3)
+    # Dentro del plazo se sirve la versión guardada sin consultar el origen
+    assert cache.miniatura(origen, 100) == vieja
+    monkeypatch.setattr(imagenes, 'REVALIDAR', 0)
+    nueva = cache.miniatura(origen, 100)
+    assert nueva != vieja and nueva.read_bytes() != vieja.read_bytes()
+    # Sin cambios en el origen no se vuelve a leer su contenido
+    lecturas = _contar_lecturas(cache)
+    assert cache.miniatura(origen, 100) == nueva
+    assert lecturas == [origen]
+    assert len(list(cache.dir.glob('*/*.orig'))) == 2
+    # El índice sobrevive a reiniciar la caché
+    assert CacheMiniaturas(cache.dir)._indice[origen]['sha'] == nueva.stem.split('_')[0]
+
+
+def test_sobrescribir_no_descuadra_el_total(cache, tmp_path):
+    ruta = cache.dir / 'ab' / 'ab_100.webp'
+    cache._escribir(ruta, b'x' * 500)
+    cache._escribir(ruta, b'x' * 200)
+    assert cache._total == _peso(cache.dir) == 200
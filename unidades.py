@@ -0,0 +1,75 @@
+"""Reglas de conversión de unidades, en una sola tabla precalculada.
+
+Cada unidad tiene una dimensión (masa, volumen, cuchara, conteo) y su tamaño en la unidad
+mínima de la dimensión. Las cucharas (cdta = 5, cda = 15) se pueden pasar a masa (gr) o a
+volumen (ml). `convertir` trabaja con arreglos y divide por el rendimiento de la receta.
+"""
+import numpy as np
+
+# unidad -> (dimensión, tamaño en gr o ml; las cucharas en su equivalente)
+_DEFINICION = {
+    'kg': ('masa', 1000.0), 'gr': ('masa', 1.0),
+    'lt': ('volumen', 1000.0), 'ml': ('volumen', 1.0), 'cc': ('volumen', 1.0),
+    'cdta': ('cuchara', 5.0), 'cda': ('cuchara', 15.0),
+    'unidades': ('conteo', 1.0),
+}
+UNIDADES = list(_DEFINICION)
+_IDX = {u: i for i, u in enumerate(UNIDADES)}
+
+# Orden en que se ofrecen las unidades en las recetas (lo chico primero)
+_ORDEN_RECETA = ['gr', 'kg', 'ml', 'lt', 'cc', 'cdta', 'cda', 'unidades']
+
+
+def _compatibles(a, b):
+    da, db = _DEFINICION[a][0], _DEFINICION[b][0]
+    return da == db or ('cuchara' in (da, db) and {da, db} <= {'cuchara', 'masa', 'volumen'})
+
+
+# Factor para pasar de la unidad de la fila a la de la columna (NaN = no convertible)
+_FACTOR = np.full((len(UNIDADES), len(UNIDADES)), np.nan)
+for _o in UNIDADES:
+    for _d in UNIDADES:
+        if _compatibles(_o, _d): _FACTOR[_IDX[_o], _IDX[_d]] = _DEFINICION[_o][1] / _DEFINICION[_d][1]
+
+
+def _indices(unidades):
+    return np.array([_IDX.get(str(u).strip().lower(), -1) for u in unidades], dtype=np.int64)
+
+
+def factores(unidades_origen, unidades_destino):
+    """Vector de factores origen→destino (NaN cuando la unidad no existe o no es compatible)."""
+    io = _indices(unidades_origen)
+    idst = _indices(unidades_destino)
+    validos = (io >= 0) & (idst >= 0)
+    out = np.full(len(io), np.nan)
+    out[validos] = _FACTOR[io[validos], idst[validos]]
+    return out
+
+
+def convertir(cantidades, unidades_origen, unidades_destino, rendimiento=1):
+    """Cantidades expresadas en la unidad destino y divididas por el rendimiento (escalar o arreglo).
+
+    NaN donde la conversión no existe. Es la única regla de unidades de la app: recetas,
+    consumo de stock, costeo y compras pasan por aquí.
+    """
+    rend = np.asarray(rendimiento, dtype=float)
+    rend = np.where(np.isnan(rend) | (rend <= 0), 1.0, rend)
+    return np.asarray(cantidades, dtype=float) * factores(unidades_origen, unidades_destino) / rend
+
+
+def convertir_uno(cantidad, unidad_origen, unidad_destino, rendimiento=1):
+    """`convertir` para un solo valor. None si las unidades no son compatibles."""
+    v = convertir([cantidad], [unidad_origen], [unidad_destino], rendimiento)[0]
+    return None if np.isnan(v) else float(v)
+
+
+def opciones(unidad_base, uso='compra'):
+    """Unidades que se pueden elegir para un insumo medido en `unidad_base`.
+
+    En compras, la base primero y sin cucharas; en recetas, todas las compatibles.
+    """
+    if unidad_base not in _IDX: return [unidad_base]
+    if uso == 'receta':
+        return [u for u in _ORDEN_RECETA if _compatibles(u, unidad_base)]
+    return [unidad_base] + [u for u in UNIDADES
+                            if u != unidad_base and _DEFINICION[u][0] == _DEFINICION[unidad_base][0]]
@@ -0,0 +1,58 @@
+"""Caché de lecturas coherente entre réplicas, con una versión por tabla.
+
+`versiones_tabla` (sql/versiones.sql) guarda un contador por tabla que suben los triggers
+en cada escritura, venga de esta app, de otra réplica o de la consola de Supabase. Cada
+rerun consulta esa tabla una vez (una fila por tabla) y las lecturas cacheadas se sirven
+solo si la versión de su tabla no se movió; si cambió, se vuelve a leer esa tabla y nada más.
+
+Solo se cachean las tablas que aparecen en `versiones_tabla` (las que tienen trigger).
+Si la consulta de versiones falla, no se usa la caché: se lee siempre de la base.
+Las claves (una por consulta: filtros, páginas) se descartan por LRU pasado MAX_ENTRADAS.
+"""
+import threading
+from collections import OrderedDict
+
+MAX_ENTRADAS = 256
+
+
+class CacheVersionada:
+    def __init__(self, max_entradas=MAX_ENTRADAS):
+        self._datos = OrderedDict()         # clave -> (tabla, version, filas)
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.lecturas = 0
+
+    @staticmethod
+    def versiones(db):
+        """{tabla: version} en una consulta. None si no se pudo leer (sin tabla o sin conexión)."""
+        try:
+            filas = db.table('versiones_tabla').select("tabla, version").execute().data
+        except Exception:
+            return None
+        return {f['tabla']: f['version'] for f in filas}
+
+    def obtener(self, clave, tabla, versiones):
+        """Filas guardadas para `clave` si siguen vigentes según `versiones`; si no, None."""
+        if not versiones or tabla not in versiones: return None
+        with self._lock:
+            guardado = self._datos.get(clave)
+            if guardado and guardado[0] == tabla and guardado[1] == versiones[tabla]:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return guardado[2]
+            self.lecturas += 1
+        return None
+
+    def guardar(self, clave, tabla, versiones, filas):
+        """Guarda con la versión vista antes de leer: si alguien escribió mientras tanto,
+        la versión ya es otra y el próximo rerun vuelve a leer."""
+        if not versiones or tabla not in versiones: return
+        with self._lock:
+            self._datos[clave] = (tabla, versiones[tabla], filas)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas: self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()